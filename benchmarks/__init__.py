@@ -0,0 +1,5 @@
+"""
+Micro-benchmarks of pyramid_blacksmith.
+
+Every module is runnable using ``python -m benchmarks.<module>``.
+"""
@@ -0,0 +1,100 @@
+"""
+Compare the ``request.blacksmith`` binding modes on attribute-access-heavy views.
+
+::
+
+    python -m benchmarks.binding
+
+"""
+
+import argparse
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import blacksmith
+from blacksmith import HTTPRequest, HTTPResponse, HTTPTimeout, SyncAbstractTransport
+from blacksmith.typing import ClientName, Path
+from pyramid import testing
+from pyramid.interfaces import IRequestExtensions
+from pyramid.request import apply_request_extensions
+
+from pyramid_blacksmith import includeme
+
+
+class NoopTransport(SyncAbstractTransport):
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        return HTTPResponse(200, headers={}, json={})
+
+
+blacksmith.register(
+    "api",
+    "bench",
+    "bench",
+    None,
+    path="/bench/{name}",
+    contract={"GET": (blacksmith.Request, blacksmith.Response)},
+)
+
+
+def build_request(reify: bool) -> Any:
+    config = testing.setUp(
+        settings={
+            "blacksmith.reify": str(reify),
+            "blacksmith.client.service_discovery": "static",
+            "blacksmith.client.static_sd_config": ["bench http://bench.localhost"],
+            "blacksmith.client.transport": NoopTransport(),
+            "blacksmith.client.middleware_factories": ["forward_header"],
+            "blacksmith.client.middleware_factory.forward_header": ["Authorization"],
+        }
+    )
+    config.include(includeme)
+    req = testing.DummyRequest(headers={"Authorization": "Bearer bench"})
+    apply_request_extensions(req, config.registry.queryUtility(IRequestExtensions))
+    return req
+
+
+def getter_view(request: Any, calls: int) -> None:
+    for _ in range(calls):
+        request.blacksmith.client  # noqa: B018
+
+
+def client_view(request: Any, calls: int) -> None:
+    for _ in range(calls):
+        request.blacksmith.client("api")
+
+
+def run(
+    name: str,
+    view: Callable[[Any, int], None],
+    reify: bool,
+    calls: int,
+    number: int,
+) -> float:
+    request = build_request(reify)
+    duration = min(timeit.repeat(lambda: view(request, calls), number=number, repeat=5))
+    testing.tearDown()
+    usec = duration / number * 1_000_000
+    mode = "reify" if reify else "property"
+    print(f"{name:<10} {mode:<10} {calls:>4} calls/view {usec:>10.2f} usec/view")
+    return usec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--number", type=int, default=10_000)
+    args = parser.parse_args()
+    for name, view in (("getter", getter_view), ("client", client_view)):
+        for reify in (False, True):
+            run(name, view, reify, args.calls, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Measure the overhead of pyramid_blacksmith on the requests of a pyramid app.
+
+A WSGI stand-in of the upstream service is called in-process, using the
+WSGI transport of httpx, or, using ``--network``, served in a thread on
+a local port. Pyramid apps configured with ``includeme`` are driven through
+their WSGI pipeline, their view fetches a resource of the upstream using
+``request.blacksmith``.
+
+Every configuration is compared to a ``direct`` app, that fetches the same
+resource using httpx, without pyramid_blacksmith:
+
+* the latency of a request, its median, p90 and p99, and the overhead,
+  the difference of the median with the median of the ``direct`` app;
+* the throughput, using concurrent requests;
+* the memory allocated during a request, its peak traced by ``tracemalloc``.
+
+The results can be saved, and compared with the results of another release:
+
+::
+
+    python -m benchmarks.overhead --json before.json
+    python -m benchmarks.overhead --compare before.json
+
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from importlib import metadata
+from socketserver import ThreadingMixIn
+from typing import Any
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import blacksmith
+import httpx
+from pyramid.config import Configurator
+from webob import Request
+
+from pyramid_blacksmith import includeme
+from pyramid_blacksmith.middleware import HTTPCacheBuilder
+from pyramid_blacksmith.transport import PooledHttpxTransport
+
+WSGIApp = Callable[..., Any]
+
+IN_PROCESS_URL = "http://upstream.localhost"
+
+PAYLOAD = json.dumps(
+    {"id": 1, "name": "item", "tags": ["a", "b", "c"], "price": 42.0}
+).encode()
+
+
+class GetItem(blacksmith.Request):
+    item_id: int = blacksmith.PathInfoField()
+
+
+class Item(blacksmith.Response):
+    id: int
+    name: str
+    tags: list[str]
+    price: float
+
+
+blacksmith.register(
+    "upstream",
+    "item",
+    "upstream",
+    None,
+    path="/items/{item_id}",
+    contract={"GET": (GetItem, Item)},
+)
+
+
+def upstream_app(environ: dict[str, Any], start_response: Callable[..., Any]) -> Any:
+    """The WSGI stand-in of the upstream service."""
+    start_response(
+        "200 OK",
+        [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(PAYLOAD))),
+            ("Cache-Control", "max-age=60"),
+        ],
+    )
+    return [PAYLOAD]
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+@contextmanager
+def serve(app: WSGIApp) -> Iterator[str]:
+    """Serve a WSGI app on a local port, in a thread, and yield its url."""
+    server = make_server(
+        "127.0.0.1", 0, app, ThreadingWSGIServer, handler_class=QuietHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class InProcessTransport(PooledHttpxTransport):
+    """Call the WSGI stand-in of the upstream, without a socket."""
+
+    def build_client(self) -> httpx.Client:
+        return httpx.Client(transport=httpx.WSGITransport(app=upstream_app))
+
+
+class FakeRedisHTTPCacheBuilder(HTTPCacheBuilder):
+    """The ``http_cache`` middleware, using fakeredis instead of a server."""
+
+    def build_cache(self, redis_url: str) -> Any:
+        import fakeredis
+
+        return fakeredis.FakeRedis()
+
+
+def item_view(request: Any) -> Any:
+    api = request.blacksmith.client("upstream")
+    return api.item.get({"item_id": 1}).unwrap().model_dump()
+
+
+def build_app(name: str, upstream_url: str) -> WSGIApp:
+    """Build the pyramid app of a configuration."""
+    settings: dict[str, Any] = {
+        "blacksmith.reify": "true",
+        "blacksmith.client.service_discovery": "static",
+        "blacksmith.client.static_sd_config": [f"upstream {upstream_url}"],
+    }
+    if upstream_url == IN_PROCESS_URL:
+        settings["blacksmith.client.transport"] = InProcessTransport()
+    else:
+        settings["blacksmith.client.transport_pool"] = ""
+    if name == "prometheus":
+        settings["blacksmith.client.middlewares"] = ["prometheus"]
+    elif name == "circuitbreaker":
+        settings["blacksmith.client.middlewares"] = ["circuitbreaker"]
+    elif name == "http_cache":
+        settings["blacksmith.client.middlewares"] = [
+            "http_cache benchmarks.overhead:FakeRedisHTTPCacheBuilder"
+        ]
+        settings["blacksmith.client.middleware.http_cache"] = ["redis redis://fake/0"]
+    elif name == "forward_header":
+        settings["blacksmith.client.middleware_factories"] = ["forward_header"]
+        settings["blacksmith.client.middleware_factory.forward_header"] = [
+            "Authorization"
+        ]
+
+    config = Configurator(settings=settings)
+    config.add_route("item", "/items/{item_id}")
+    if name == "direct":
+        client = (
+            InProcessTransport().client
+            if upstream_url == IN_PROCESS_URL
+            else httpx.Client()
+        )
+
+        def direct_view(request: Any) -> Any:
+            return client.get(f"{upstream_url}/items/1").json()
+
+        config.add_view(direct_view, route_name="item", renderer="json")
+    else:
+        config.include(includeme)
+        config.add_view(item_view, route_name="item", renderer="json")
+    return config.make_wsgi_app()
+
+
+def call(app: WSGIApp) -> None:
+    req = Request.blank("/items/1", headers={"Authorization": "Bearer bench"})
+    resp = req.get_response(app)
+    assert resp.status_code == 200, resp.text
+
+
+def measure_latency(app: WSGIApp, requests: int) -> dict[str, float]:
+    durations: list[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        call(app)
+        durations.append((time.perf_counter() - start) * 1_000_000)
+    quantiles = statistics.quantiles(durations, n=100)
+    return {
+        "median": statistics.median(durations),
+        "p90": quantiles[89],
+        "p99": quantiles[98],
+    }
+
+
+def measure_throughput(app: WSGIApp, requests: int, concurrency: int) -> float:
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        for _ in executor.map(lambda _: call(app), range(requests)):
+            pass
+        return requests / (time.perf_counter() - start)
+
+
+def measure_allocations(app: WSGIApp, requests: int) -> float:
+    peaks: list[int] = []
+    tracemalloc.start()
+    try:
+        for _ in range(requests):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call(app)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks) / 1024
+
+
+def run(
+    name: str, upstream_url: str, requests: int, concurrency: int
+) -> dict[str, Any]:
+    app = build_app(name, upstream_url)
+    for _ in range(min(requests, 100)):
+        call(app)
+    return {
+        "latency_usec": measure_latency(app, requests),
+        "throughput_rps": measure_throughput(app, requests, concurrency),
+        "peak_alloc_kib": measure_allocations(app, min(requests, 200)),
+    }
+
+
+def get_meta(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "pyramid_blacksmith": metadata.version("pyramid_blacksmith"),
+        "blacksmith": metadata.version("blacksmith"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "network": args.network,
+    }
+
+
+def print_results(results: dict[str, Any], previous: dict[str, Any] | None) -> None:
+    print(
+        f"{'config':<16} {'median':>10} {'p99':>10} {'overhead':>10} "
+        f"{'req/s':>10} {'alloc KiB':>10}"
+    )
+    for name, result in results.items():
+        latency = result["latency_usec"]
+        line = (
+            f"{name:<16} {latency['median']:>10.1f} {latency['p99']:>10.1f} "
+            f"{result['overhead_usec']:>10.1f} {result['throughput_rps']:>10.0f} "
+            f"{result['peak_alloc_kib']:>10.1f}"
+        )
+        if previous and name in previous:
+            before = previous[name]
+            median = latency["median"] / before["latency_usec"]["median"] - 1
+            rps = result["throughput_rps"] / before["throughput_rps"] - 1
+            line += f"   median {median:+.1%} req/s {rps:+.1%}"
+        print(line)
+
+
+CONFIGS = [
+    "direct",
+    "none",
+    "prometheus",
+    "circuitbreaker",
+    "http_cache",
+    "forward_header",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--config", action="append", choices=CONFIGS, help="default to all"
+    )
+    parser.add_argument(
+        "--network", action="store_true", help="serve the upstream on a local port"
+    )
+    parser.add_argument("--json", help="save the results in a json file")
+    parser.add_argument("--compare", help="compare with the results of a json file")
+    args = parser.parse_args()
+
+    configs = args.config or CONFIGS
+    if "direct" not in configs:
+        configs.insert(0, "direct")
+    results: dict[str, Any] = {}
+    if args.network:
+        with serve(upstream_app) as upstream_url:
+            for name in configs:
+                results[name] = run(name, upstream_url, args.requests, args.concurrency)
+    else:
+        for name in configs:
+            results[name] = run(name, IN_PROCESS_URL, args.requests, args.concurrency)
+
+    direct = results["direct"]["latency_usec"]["median"]
+    for result in results.values():
+        result["overhead_usec"] = result["latency_usec"]["median"] - direct
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+    print_results(results, previous)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": get_meta(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
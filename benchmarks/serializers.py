@@ -0,0 +1,114 @@
+"""
+Compare the serializers of the http_cache middleware on a cached collection.
+
+Measure the latency of a cache hit, loading the payload, and its size.
+With ``--redis``, the payload is read from redis, and the size is the memory
+used by the key in redis.
+
+::
+
+    python -m benchmarks.serializers --redis redis://localhost/0
+
+"""
+
+import argparse
+import random
+import string
+import timeit
+from dataclasses import asdict
+from typing import Any
+
+from blacksmith import HTTPResponse
+from pyramid.exceptions import ConfigurationError
+
+from pyramid_blacksmith.serializers import resolve_serializer
+
+SERIALIZERS = [
+    "json",
+    "json+zlib",
+    "json+lz4",
+    "orjson",
+    "orjson+zlib",
+    "orjson+lz4",
+    "msgpack",
+    "msgpack+zlib",
+    "msgpack+lz4",
+]
+
+
+def word(rand: random.Random, size: int) -> str:
+    return "".join(rand.choice(string.ascii_lowercase) for _ in range(size))
+
+
+def build_payload(items: int) -> dict[str, Any]:
+    rand = random.Random(42)
+    collection = [
+        {
+            "id": idx,
+            "name": word(rand, 12),
+            "description": " ".join(word(rand, 8) for _ in range(20)),
+            "price": round(rand.uniform(0, 1000), 2),
+            "active": rand.random() > 0.5,
+            "tags": [word(rand, 5) for _ in range(4)],
+            "owner": {"id": rand.randint(1, 10_000), "email": f"{word(rand, 8)}@x.io"},
+        }
+        for idx in range(items)
+    ]
+    resp = HTTPResponse(
+        200,
+        headers={"content-type": "application/json", "cache-control": "max-age=60"},
+        json=collection,
+    )
+    return asdict(resp)
+
+
+def run(name: str, payload: dict[str, Any], redis: Any, number: int) -> None:
+    try:
+        serializer = resolve_serializer(name)
+    except ConfigurationError as exc:
+        print(f"{name:<14} skipped: {exc}")
+        return
+    data = serializer.dumps(payload)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    size = len(data)
+    if redis is not None:
+        key = f"bench:serializer:{name}"
+        redis.set(key, data)
+        size = redis.memory_usage(key)
+
+        def hit() -> Any:
+            return serializer.loads(redis.get(key))
+
+    else:
+
+        def hit() -> Any:
+            return serializer.loads(data)
+
+    assert hit() == payload
+    dumps = min(timeit.repeat(lambda: serializer.dumps(payload), number=number))
+    loads = min(timeit.repeat(hit, number=number))
+    print(
+        f"{name:<14} {loads / number * 1_000_000:>10.1f} usec/hit "
+        f"{dumps / number * 1_000_000:>10.1f} usec/dumps {size:>10} bytes"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--redis", help="redis url, to include the round trip")
+    args = parser.parse_args()
+    redis = None
+    if args.redis:
+        import redis as redis_mod
+
+        redis = redis_mod.from_url(args.redis)
+    payload = build_payload(args.items)
+    for name in SERIALIZERS:
+        run(name, payload, redis, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,28 @@
 from importlib import metadata
 
-from .binding import PyramidBlacksmith, includeme
-from .middleware import AbstractMiddlewareBuilder
-from .middleware_factory import AbstractMiddlewareFactoryBuilder
+from .binding import (
+    AsyncPyramidBlacksmith,
+    ClientCache,
+    PyramidBlacksmith,
+    includeme,
+    warmup,
+)
+from .middleware import AbstractAsyncMiddlewareBuilder, AbstractMiddlewareBuilder
+from .middleware_factory import (
+    AbstractAsyncMiddlewareFactoryBuilder,
+    AbstractMiddlewareFactoryBuilder,
+)
 
 __version__ = metadata.version("pyramid_blacksmith")
 
 __all__ = [
+    "AbstractAsyncMiddlewareBuilder",
+    "AbstractAsyncMiddlewareFactoryBuilder",
     "AbstractMiddlewareBuilder",
     "AbstractMiddlewareFactoryBuilder",
+    "AsyncPyramidBlacksmith",
+    "ClientCache",
     "PyramidBlacksmith",
     "includeme",
+    "warmup",
 ]
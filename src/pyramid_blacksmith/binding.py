@@ -1,8 +1,24 @@
-from collections.abc import Callable, Iterator
-from typing import Any, ClassVar, cast
+import asyncio
+import logging
+import signal
+import threading
+import time
+from collections.abc import Callable, Coroutine, Generator, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, ClassVar, Generic, TypeVar, cast
 
 import blacksmith
 from blacksmith import (
+    AsyncAbstractServiceDiscovery,
+    AsyncAbstractTransport,
+    AsyncClient,
+    AsyncClientFactory,
+    AsyncConsulDiscovery,
+    AsyncHTTPMiddleware,
+    AsyncNomadDiscovery,
+    AsyncRouterDiscovery,
+    AsyncStaticDiscovery,
     CollectionParser,
     HTTPTimeout,
     PrometheusMetrics,
@@ -19,15 +35,46 @@ from blacksmith import (
 from blacksmith.domain.error import AbstractErrorParser, default_error_parser
 from blacksmith.typing import Proxies, Service, Url
 from pyramid.config import Configurator
+from pyramid.events import NewRequest
 from pyramid.exceptions import ConfigurationError
+from pyramid.registry import Registry
 from pyramid.request import Request
 from pyramid.settings import asbool, aslist
 
-from pyramid_blacksmith.middleware_factory import AbstractMiddlewareFactoryBuilder
+from pyramid_blacksmith.middleware import (
+    AbstractAsyncMiddlewareBuilder,
+    AbstractMiddlewareBuilder,
+    PrecompiledMiddleware,
+    SyncHedgingMiddleware,
+    SyncSingleFlightMiddleware,
+)
+from pyramid_blacksmith.middleware_factory import (
+    AbstractAsyncMiddlewareFactoryBuilder,
+    AbstractMiddlewareFactoryBuilder,
+    set_start_time,
+)
 
+from . import fork
+from .collection import CollectionStreamer
+from .loader import BatchLoader, DataLoader
+from .metrics import BlacksmithMetrics, is_multiprocess, metrics_view
+from .parallel import EventLoopThread, ParallelExecutor
+from .sd import (
+    SyncAbstractInstancesDiscovery,
+    SyncCachedServiceDiscovery,
+    SyncConsulInstancesDiscovery,
+    SyncLoadBalancedDiscovery,
+    SyncLoadBalancerMiddleware,
+    SyncNomadInstancesDiscovery,
+)
+from .transport import PooledHttpxTransport
 from .typing import Settings
 from .utils import list_to_dict, resolve_entrypoint
 
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 class SettingsBuilder:
     def __init__(
@@ -47,6 +94,16 @@ class BlacksmithPrometheusMetricsBuilder:
     called with different settings.
 
     This simplify tests, and it is not supposed to be a use case.
+
+    Using many worker processes, the metrics of every processes are aggregated
+    by the multiprocess mode of prometheus_client, which is enabled by the
+    environment variable ``PROMETHEUS_MULTIPROC_DIR``, before the metrics are
+    created. The setting below ensure it is enabled:
+
+    ::
+
+        blacksmith.prometheus_multiprocess = true
+
     """
 
     _instance: ClassVar[PrometheusMetrics | None] = None
@@ -57,80 +114,49 @@ class BlacksmithPrometheusMetricsBuilder:
 
     def build(self) -> PrometheusMetrics:
         """Return the first PrometheusMetrics object build from the settings passed."""
+        multiprocess = self.settings.get("blacksmith.prometheus_multiprocess")
+        if asbool(multiprocess) and not is_multiprocess():
+            raise ConfigurationError(
+                "blacksmith.prometheus_multiprocess requires the environment "
+                "variable PROMETHEUS_MULTIPROC_DIR"
+            )
         if self.__class__._instance is None:
             buckets_list = list_to_dict(self.settings, self.prefix)
             buckets: dict[str, list[float]] = {}
             for key, vals in buckets_list.items():
                 buckets[key] = [float(val) for val in vals.split()]
-            self.__class__._instance = PrometheusMetrics(registry=None, **buckets)
+            self.__class__._instance = BlacksmithMetrics(registry=None, **buckets)
         return self.__class__._instance
 
 
-class BlacksmithClientSettingsBuilder(SettingsBuilder):
-    def build(self) -> SyncClientFactory[Any]:
-        sd = self.build_sd_strategy()
-        timeout = self.get_timeout()
-        proxies = self.get_proxies()
-        verify = self.get_verify_certificate()
-        transport = self.build_transport()
-        collection_parser = self.build_collection_parser()
-        error_parser = self.build_error_parser()
-        ret: SyncClientFactory[Any] = SyncClientFactory(
-            sd,
-            timeout=timeout,
-            proxies=proxies,
-            verify_certificate=verify,
-            transport=transport,
-            collection_parser=collection_parser,
-            error_parser=error_parser,
-        )
-        for mw in self.build_middlewares(self.metrics):
-            ret.add_middleware(mw)
-        return ret
-
-    def build_sd_static(self) -> SyncStaticDiscovery:
-        key = f"{self.prefix}.static_sd_config"
-        services_endpoints = list_to_dict(self.settings, key)
-        services: dict[Service, Url] = {}
-        for api_v, url in services_endpoints.items():
-            api, version = api_v.split("/", 1) if "/" in api_v else (api_v, None)
-            services[(api or "", version)] = url
-        return SyncStaticDiscovery(services)
-
-    def build_sd_consul(self) -> SyncConsulDiscovery:
-        key = f"{self.prefix}.consul_sd_config"
-        kwargs = list_to_dict(self.settings, key)
-        return SyncConsulDiscovery(**kwargs)  # type: ignore
-
-    def build_sd_nomad(self) -> SyncNomadDiscovery:
-        key = f"{self.prefix}.nomad_sd_config"
-        kwargs = list_to_dict(self.settings, key)
-        return SyncNomadDiscovery(**kwargs)  # type: ignore
+class ClientSettingsBuilder(SettingsBuilder):
+    """Parse the settings shared by the sync and the async client factories."""
 
-    def build_sd_router(self) -> SyncRouterDiscovery:
-        key = f"{self.prefix}.router_sd_config"
-        kwargs = list_to_dict(self.settings, key)
-        return SyncRouterDiscovery(**kwargs)
+    middleware_classes: ClassVar[dict[str, str]] = {}
 
-    def build_sd_strategy(self) -> SyncAbstractServiceDiscovery:
-        sd_classes: dict[str, Callable[[], SyncAbstractServiceDiscovery]] = {
-            "static": self.build_sd_static,
-            "consul": self.build_sd_consul,
-            "nomad": self.build_sd_nomad,
-            "router": self.build_sd_router,
-        }
+    def get_sd_name(self, choices: Iterable[str]) -> str:
         key = f"{self.prefix}.service_discovery"
         sd_name = self.settings.get(key)
         if not sd_name:
             raise ConfigurationError(f"Missing setting {key}")
 
-        if sd_name not in sd_classes:
+        choices = list(choices)
+        if sd_name not in choices:
             raise ConfigurationError(
-                f"Invalid value {sd_name} for {key}: "
-                f"not in {', '.join(sd_classes.keys())}"
+                f"Invalid value {sd_name} for {key}: not in {', '.join(choices)}"
             )
+        return sd_name
 
-        return sd_classes[sd_name]()
+    def get_sd_config(self, sd_name: str) -> Settings:
+        return list_to_dict(self.settings, f"{self.prefix}.{sd_name}_sd_config")
+
+    def get_static_sd_endpoints(self) -> dict[Service, Url]:
+        services_endpoints = self.get_sd_config("static")
+        services: dict[Service, Url] = {}
+        for api_v, url in services_endpoints.items():
+            api, version = api_v.split("/", 1) if "/" in api_v else (api_v, None)
+            services[(api or "", version)] = url
+        return services
 
     def get_timeout(self) -> HTTPTimeout:
         kwargs = {}
@@ -151,15 +177,6 @@ class BlacksmithClientSettingsBuilder(SettingsBuilder):
     def get_verify_certificate(self) -> bool:
         return asbool(self.settings.get(f"{self.prefix}.verify_certificate", True))
 
-    def build_transport(self) -> SyncAbstractTransport | None:
-        value = self.settings.get(f"{self.prefix}.transport")
-        if not value:
-            return None
-        if isinstance(value, SyncAbstractTransport):
-            return value
-        cls = resolve_entrypoint(value)
-        return cls()
-
     def build_collection_parser(self) -> type[CollectionParser]:
         value = self.settings.get(f"{self.prefix}.collection_parser")
         if not value:
@@ -181,30 +198,270 @@ class BlacksmithClientSettingsBuilder(SettingsBuilder):
             cls = resolve_entrypoint(value)
         return cls()
 
-    def build_middlewares(
+    def build_middleware_builders(
         self, metrics: PrometheusMetrics
-    ) -> Iterator[SyncHTTPMiddleware]:
+    ) -> Iterator[AbstractMiddlewareBuilder]:
         value = aslist(
             self.settings.get(f"{self.prefix}.middlewares", []), flatten=False
         )
-        classes = {
-            "prometheus": "pyramid_blacksmith.middleware:PrometheusMetricsBuilder",
-            "circuitbreaker": "pyramid_blacksmith.middleware:CircuitBreakerBuilder",
-            "http_cache": "pyramid_blacksmith.middleware:HTTPCacheBuilder",
-            "static_headers": "pyramid_blacksmith.middleware:HTTPStaticHeadersBuilder",
-        }
         for middleware in value:
             try:
                 middleware, cls = middleware.split(maxsplit=1)
             except ValueError:
-                cls = classes.get(middleware, middleware)
+                cls = self.get_middleware_class(middleware)
             cls = resolve_entrypoint(cls)
-            instance = cls(
+            yield cls(
                 self.settings,
                 f"{self.prefix}.middleware.{middleware}",
                 metrics,
-            ).build()
-            yield instance
+            )
+
+    def get_middleware_class(self, middleware: str) -> str:
+        return self.middleware_classes.get(middleware, middleware)
+
+
+class BlacksmithClientSettingsBuilder(ClientSettingsBuilder):
+    middleware_classes: ClassVar[dict[str, str]] = {
+        "prometheus": "pyramid_blacksmith.middleware:PrometheusMetricsBuilder",
+        "circuitbreaker": "pyramid_blacksmith.middleware:CircuitBreakerBuilder",
+        "http_cache": "pyramid_blacksmith.middleware:HTTPCacheBuilder",
+        "static_headers": "pyramid_blacksmith.middleware:HTTPStaticHeadersBuilder",
+        "single_flight": "pyramid_blacksmith.middleware:SingleFlightBuilder",
+        "concurrency_limit": "pyramid_blacksmith.middleware:ConcurrencyLimitBuilder",
+        "retry": "pyramid_blacksmith.middleware:RetryBuilder",
+        "hedging": "pyramid_blacksmith.middleware:HedgingBuilder",
+    }
+
+    def build(self) -> SyncClientFactory[Any]:
+        sd = self.build_sd_cache(self.build_sd_strategy())
+        sd = self.build_sd_load_balancer(sd)
+        timeout = self.get_timeout()
+        proxies = self.get_proxies()
+        verify = self.get_verify_certificate()
+        transport = self.build_transport()
+        collection_parser = self.build_collection_parser()
+        error_parser = self.build_error_parser()
+        middlewares = list(self.build_middlewares(self.metrics))
+        if isinstance(sd, SyncLoadBalancedDiscovery):
+            middlewares.append(SyncLoadBalancerMiddleware(sd))
+        if middlewares and self.get_precompile_middlewares():
+            middlewares = self.precompile_middlewares(middlewares)
+        ret: SyncClientFactory[Any] = SyncClientFactory(
+            sd,
+            timeout=timeout,
+            proxies=proxies,
+            verify_certificate=verify,
+            transport=transport,
+            collection_parser=collection_parser,
+            error_parser=error_parser,
+        )
+        for mw in middlewares:
+            ret.add_middleware(mw)
+        return ret
+
+    def build_sd_static(self) -> SyncStaticDiscovery:
+        return SyncStaticDiscovery(self.get_static_sd_endpoints())
+
+    def build_sd_consul(self) -> SyncConsulDiscovery:
+        settings = self.get_sd_config("consul")
+        return SyncConsulInstancesDiscovery(**settings)  # type: ignore
+
+    def build_sd_nomad(self) -> SyncNomadDiscovery:
+        settings = self.get_sd_config("nomad")
+        return SyncNomadInstancesDiscovery(**settings)  # type: ignore
+
+    def build_sd_router(self) -> SyncRouterDiscovery:
+        return SyncRouterDiscovery(**self.get_sd_config("router"))
+
+    def build_sd_strategy(self) -> SyncAbstractServiceDiscovery:
+        sd_classes: dict[str, Callable[[], SyncAbstractServiceDiscovery]] = {
+            "static": self.build_sd_static,
+            "consul": self.build_sd_consul,
+            "nomad": self.build_sd_nomad,
+            "router": self.build_sd_router,
+        }
+        return sd_classes[self.get_sd_name(sd_classes)]()
+
+    def build_sd_cache(
+        self, sd: SyncAbstractServiceDiscovery
+    ) -> SyncAbstractServiceDiscovery:
+        key = f"{self.prefix}.sd_cache"
+        if key not in self.settings:
+            return sd
+        settings = list_to_dict(self.settings, key)
+        kwargs: dict[str, Any] = {}
+        for name, cast_ in (
+            ("ttl", float),
+            ("max_entries", int),
+            ("stale_ttl", float),
+        ):
+            if name in settings:
+                kwargs[name] = cast_(settings[name])
+        return SyncCachedServiceDiscovery(sd, **kwargs)
+
+    def build_sd_load_balancer(
+        self, sd: SyncAbstractServiceDiscovery
+    ) -> SyncAbstractServiceDiscovery:
+        key = f"{self.prefix}.load_balancer"
+        strategy = self.settings.get(key)
+        if not strategy:
+            return sd
+        if strategy not in SyncLoadBalancedDiscovery.strategies:
+            raise ConfigurationError(
+                f"Invalid value {strategy} for {key}: "
+                f"not in {', '.join(SyncLoadBalancedDiscovery.strategies)}"
+            )
+        inner = sd.sd if isinstance(sd, SyncCachedServiceDiscovery) else sd
+        if not isinstance(inner, SyncAbstractInstancesDiscovery):
+            raise ConfigurationError(
+                f"{key} requires a service discovery that list instances: "
+                "consul or nomad"
+            )
+        if not isinstance(sd, SyncCachedServiceDiscovery):
+            # the instances are listed on every request
+            sd = SyncCachedServiceDiscovery(sd)
+        return SyncLoadBalancedDiscovery(sd, strategy)
+
+    def precompile_middlewares(
+        self, middlewares: list[SyncHTTPMiddleware]
+    ) -> list[SyncHTTPMiddleware]:
+        """
+        Precompile the middlewares around the single_flight middlewares.
+
+        The middleware factories are inserted before the single_flight
+        middleware of each request, it can't be part of a precompiled chain.
+        """
+        ret: list[SyncHTTPMiddleware] = []
+        chain: list[SyncHTTPMiddleware] = []
+        for middleware in middlewares:
+            if isinstance(middleware, SyncSingleFlightMiddleware):
+                if chain:
+                    ret.append(PrecompiledMiddleware(chain))
+                    chain = []
+                ret.append(middleware)
+            else:
+                chain.append(middleware)
+        if chain:
+            ret.append(PrecompiledMiddleware(chain))
+        return ret
+
+    def get_precompile_middlewares(self) -> bool:
+        return asbool(self.settings.get(f"{self.prefix}.precompile_middlewares", False))
+
+    def build_transport(self) -> SyncAbstractTransport | None:
+        value = self.settings.get(f"{self.prefix}.transport")
+        if not value:
+            return self.build_transport_pool()
+        if isinstance(value, SyncAbstractTransport):
+            return value
+        cls = resolve_entrypoint(value)
+        return cls()
+
+    def build_transport_pool(self) -> PooledHttpxTransport | None:
+        key = f"{self.prefix}.transport_pool"
+        if key not in self.settings:
+            return None
+        settings = list_to_dict(self.settings, key)
+        kwargs: dict[str, Any] = {}
+        for name, cast_ in (
+            ("max_connections", int),
+            ("max_keepalive_connections", int),
+            ("keepalive_expiry", float),
+            ("http2", asbool),
+            ("max_connections_per_host", int),
+        ):
+            if name in settings:
+                kwargs[name] = cast_(settings[name])
+        return PooledHttpxTransport(
+            verify_certificate=self.get_verify_certificate(),
+            proxies=self.get_proxies(),
+            **kwargs,
+        )
+
+    def build_middlewares(
+        self, metrics: PrometheusMetrics
+    ) -> Iterator[SyncHTTPMiddleware]:
+        for builder in self.build_middleware_builders(metrics):
+            yield builder.build()
+
+
+class AsyncBlacksmithClientSettingsBuilder(ClientSettingsBuilder):
+    """Build the client factories of ``request.blacksmith_async``."""
+
+    middleware_classes: ClassVar[dict[str, str]] = {
+        "prometheus": "pyramid_blacksmith.middleware:AsyncPrometheusMetricsBuilder",
+        "circuitbreaker": "pyramid_blacksmith.middleware:AsyncCircuitBreakerBuilder",
+        "http_cache": "pyramid_blacksmith.middleware:AsyncHTTPCacheBuilder",
+        "static_headers": (
+            "pyramid_blacksmith.middleware:AsyncHTTPStaticHeadersBuilder"
+        ),
+    }
+
+    def build(self) -> AsyncClientFactory[Any]:
+        ret: AsyncClientFactory[Any] = AsyncClientFactory(
+            self.build_sd_strategy(),
+            timeout=self.get_timeout(),
+            proxies=self.get_proxies(),
+            verify_certificate=self.get_verify_certificate(),
+            transport=self.build_transport(),
+            collection_parser=self.build_collection_parser(),
+            error_parser=self.build_error_parser(),
+        )
+        for mw in self.build_middlewares(self.metrics):
+            ret.add_middleware(mw)
+        return ret
+
+    def build_sd_static(self) -> AsyncStaticDiscovery:
+        return AsyncStaticDiscovery(self.get_static_sd_endpoints())
+
+    def build_sd_consul(self) -> AsyncConsulDiscovery:
+        return AsyncConsulDiscovery(**self.get_sd_config("consul"))  # type: ignore
+
+    def build_sd_nomad(self) -> AsyncNomadDiscovery:
+        return AsyncNomadDiscovery(**self.get_sd_config("nomad"))  # type: ignore
+
+    def build_sd_router(self) -> AsyncRouterDiscovery:
+        return AsyncRouterDiscovery(**self.get_sd_config("router"))
+
+    def build_sd_strategy(self) -> AsyncAbstractServiceDiscovery:
+        sd_classes: dict[str, Callable[[], AsyncAbstractServiceDiscovery]] = {
+            "static": self.build_sd_static,
+            "consul": self.build_sd_consul,
+            "nomad": self.build_sd_nomad,
+            "router": self.build_sd_router,
+        }
+        return sd_classes[self.get_sd_name(sd_classes)]()
+
+    def build_transport(self) -> AsyncAbstractTransport | None:
+        value = self.settings.get(f"{self.prefix}.async_transport")
+        if not value:
+            return None
+        if isinstance(value, AsyncAbstractTransport):
+            return value
+        cls = resolve_entrypoint(value)
+        return cls()
+
+    def get_middleware_class(self, middleware: str) -> str:
+        if (
+            middleware not in self.middleware_classes
+            and middleware in BlacksmithClientSettingsBuilder.middleware_classes
+        ):
+            raise ConfigurationError(
+                f"Middleware {middleware} of {self.prefix} is not available "
+                "for the async clients"
+            )
+        return super().get_middleware_class(middleware)
+
+    def build_middlewares(
+        self, metrics: PrometheusMetrics
+    ) -> Iterator[AsyncHTTPMiddleware]:
+        for builder in self.build_middleware_builders(metrics):
+            if not isinstance(builder, AbstractAsyncMiddlewareBuilder):
+                raise ConfigurationError(
+                    f"Middleware {builder.prefix} of the async clients must be "
+                    "built by an AbstractAsyncMiddlewareBuilder"
+                )
+            yield builder.build()
 
 
 class BlacksmithMiddlewareFactoryBuilder(SettingsBuilder):
@@ -221,15 +478,20 @@ class BlacksmithMiddlewareFactoryBuilder(SettingsBuilder):
 
     """
 
+    classes: ClassVar[dict[str, str]] = {
+        "forward_header": (
+            "pyramid_blacksmith.middleware_factory:ForwardHeaderFactoryBuilder"
+        ),
+        "lazy_forward_header": (
+            "pyramid_blacksmith.middleware_factory:LazyForwardHeaderFactoryBuilder"
+        ),
+        "accept_language": (
+            "pyramid_blacksmith.middleware_factory:AcceptLanguageFactoryBuilder"
+        ),
+        "deadline": "pyramid_blacksmith.middleware_factory:DeadlineFactoryBuilder",
+    }
+
     def build(self) -> Iterator[AbstractMiddlewareFactoryBuilder]:
-        classes = {
-            "forward_header": (
-                "pyramid_blacksmith.middleware_factory:ForwardHeaderFactoryBuilder"
-            ),
-            "accept_language": (
-                "pyramid_blacksmith.middleware_factory:AcceptLanguageFactoryBuilder"
-            ),
-        }
         value = aslist(
             self.settings.get(f"{self.prefix}.middleware_factories", []), flatten=False
         )
@@ -237,12 +499,296 @@ class BlacksmithMiddlewareFactoryBuilder(SettingsBuilder):
             try:
                 middleware, cls = middleware.split(maxsplit=1)
             except ValueError:
-                cls = classes.get(middleware, middleware)
+                cls = self.get_class(middleware)
 
             key = f"{self.prefix}.middleware_factory.{middleware}"
             kwargs = list_to_dict(self.settings, key, with_flag=True)
             cls = resolve_entrypoint(cls)
-            yield cls(**kwargs)
+            yield self.check(key, cls(**kwargs))
+
+    def get_class(self, middleware: str) -> str:
+        return self.classes.get(middleware, middleware)
+
+    def check(
+        self, key: str, builder: AbstractMiddlewareFactoryBuilder
+    ) -> AbstractMiddlewareFactoryBuilder:
+        return builder
+
+
+class BlacksmithParallelExecutorBuilder(SettingsBuilder):
+    """
+    Parse the settings like:
+
+    ::
+
+        blacksmith.client.parallel =
+            max_workers 8
+            timeout     10
+
+    """
+
+    def build(self) -> ParallelExecutor:
+        settings = list_to_dict(self.settings, f"{self.prefix}.parallel")
+        kwargs: dict[str, Any] = {}
+        if "max_workers" in settings:
+            kwargs["max_workers"] = int(settings["max_workers"])
+        if "timeout" in settings:
+            kwargs["timeout"] = float(settings["timeout"])
+        return ParallelExecutor(**kwargs)
+
+
+class BlacksmithCollectionStreamBuilder(SettingsBuilder):
+    """
+    Parse the settings like:
+
+    ::
+
+        blacksmith.client.collection_stream =
+            page_size       100
+            prefetch        2
+            page_param      page
+            size_param      per_page
+
+    """
+
+    def build(self) -> CollectionStreamer:
+        settings = list_to_dict(self.settings, f"{self.prefix}.collection_stream")
+        kwargs: dict[str, Any] = {}
+        for key in ("page_size", "prefetch", "first_page"):
+            if key in settings:
+                kwargs[key] = int(settings[key])
+        for key in ("page_param", "size_param", "offset_param"):
+            if key in settings:
+                kwargs[key] = settings[key]
+        return CollectionStreamer(**kwargs)
+
+
+class BlacksmithDataLoaderBuilder(SettingsBuilder):
+    """
+    Parse the data loaders of the resources, keyed by ``client_name.resource``:
+
+    ::
+
+        blacksmith.client.dataloader.api_user.users =
+            key_param       username
+            batch_param     usernames
+            batch_resource  users
+            max_batch_size  50
+
+    """
+
+    def build(self) -> dict[str, BatchLoader]:
+        prefix = f"{self.prefix}.dataloader."
+        loaders: dict[str, BatchLoader] = {}
+        for setting in self.settings:
+            if not setting.startswith(prefix):
+                continue
+            settings = list_to_dict(self.settings, setting)
+            kwargs: dict[str, Any] = {}
+            if "max_batch_size" in settings:
+                kwargs["max_batch_size"] = int(settings["max_batch_size"])
+            for key in ("key_param", "key_field", "batch_resource", "batch_param"):
+                if key in settings:
+                    kwargs[key] = settings[key]
+            loaders[setting[len(prefix) :]] = BatchLoader(**kwargs)
+        return loaders
+
+
+class AsyncBlacksmithMiddlewareFactoryBuilder(BlacksmithMiddlewareFactoryBuilder):
+    """Parse the middleware factories of ``request.blacksmith_async``."""
+
+    classes: ClassVar[dict[str, str]] = {
+        "forward_header": (
+            "pyramid_blacksmith.middleware_factory:AsyncForwardHeaderFactoryBuilder"
+        ),
+        "accept_language": (
+            "pyramid_blacksmith.middleware_factory:AsyncAcceptLanguageFactoryBuilder"
+        ),
+        "deadline": (
+            "pyramid_blacksmith.middleware_factory:AsyncDeadlineFactoryBuilder"
+        ),
+    }
+
+    def get_class(self, middleware: str) -> str:
+        if (
+            middleware not in self.classes
+            and middleware in BlacksmithMiddlewareFactoryBuilder.classes
+        ):
+            raise ConfigurationError(
+                f"Middleware factory {middleware} of {self.prefix} is not "
+                "available for the async clients"
+            )
+        return super().get_class(middleware)
+
+    def check(
+        self, key: str, builder: AbstractMiddlewareFactoryBuilder
+    ) -> AbstractMiddlewareFactoryBuilder:
+        if not isinstance(builder, AbstractAsyncMiddlewareFactoryBuilder):
+            raise ConfigurationError(
+                f"Middleware factory {key} of the async clients must be "
+                "an AbstractAsyncMiddlewareFactoryBuilder"
+            )
+        return builder
+
+
+class LazyBuilds(Mapping[str, T], Generic[T]):
+    """
+    Objects of the client keys, built on their first access.
+
+    The build of a key is protected by a lock, it is done once even if many
+    threads access it concurrently. The duration of the build of every key,
+    including the import of its entrypoints, is logged and stored in
+    ``timings``, in seconds.
+
+    :param name: what is built, for the logs.
+    :param keys: the client keys.
+    :param build: build the object of a client key.
+    :param lazy: if false, every keys are built immediately.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        keys: Iterable[str],
+        build: Callable[[str], T],
+        lazy: bool = True,
+    ):
+        self.name = name
+        self.build = build
+        self.timings: dict[str, float] = {}
+        self._keys = list(keys)
+        self._values: dict[str, T] = {}
+        self._lock = threading.Lock()
+        fork.register(self)
+        if not lazy:
+            self.warmup()
+
+    def after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> T:
+        try:
+            return self._values[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        with self._lock:
+            if key not in self._values:
+                start = time.perf_counter()
+                self._values[key] = self.build(key)
+                self.timings[key] = time.perf_counter() - start
+                log.info(
+                    "Blacksmith %s of %s built in %.1fms",
+                    self.name,
+                    key,
+                    self.timings[key] * 1000,
+                )
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def built(self, key: str) -> T | None:
+        """Get the object of a client key, if it has been built."""
+        return self._values.get(key)
+
+    def reuse(self, other: "LazyBuilds[T]", keys: Iterable[str]) -> None:
+        """Reuse the objects of other client keys, if they have been built."""
+        for key in keys:
+            if key in other._values:
+                self._values[key] = other._values[key]
+                self.timings[key] = other.timings[key]
+
+    def warmup(self) -> None:
+        """Build every client keys that have not been built yet."""
+        for key in self._keys:
+            self[key]
+
+
+def get_lazy_builds(registry: Registry) -> list[LazyBuilds[Any]]:
+    """Get the objects of the client keys of the pyramid registry."""
+    if not hasattr(registry, "blacksmith_builds"):
+        registry.blacksmith_builds = []  # type: ignore[attr-defined]
+    return registry.blacksmith_builds  # type: ignore[attr-defined]
+
+
+def warmup(registry: Registry) -> dict[str, dict[str, float]]:
+    """
+    Build the client keys that have not been used yet.
+
+    Using ``blacksmith.lazy = true``, it can be called once the worker is
+    ready to serve, such as in the ``post_fork`` hook of gunicorn, to avoid
+    the build of the clients during the first requests.
+
+    Return the duration of the build of every objects of every client keys.
+    """
+    timings: dict[str, dict[str, float]] = {}
+    for builds in get_lazy_builds(registry):
+        builds.warmup()
+        for key, duration in builds.timings.items():
+            timings.setdefault(key, {})[builds.name] = duration
+    return timings
+
+
+def is_lazy(settings: Settings) -> bool:
+    """
+    Return True if the client keys are built on their first use.
+
+    ::
+
+        blacksmith.lazy = true
+
+    """
+    return asbool(settings.get("blacksmith.lazy", False))
+
+
+class ClientCache:
+    """
+    Type of the ``request.blacksmith_client_cache`` property.
+
+    Store the clients built during a pyramid request, keyed by
+    ``(client key, client name)``. The ``hits`` and ``misses`` counters
+    report how many lookups have been served from the cache.
+
+    The data loaders of the request are stored in ``loaders``, keyed by
+    ``(client key, client name, resource)``.
+    """
+
+    def __init__(self) -> None:
+        self.clients: dict[tuple[str, str], SyncClient[Any]] = {}
+        self.loaders: dict[tuple[str, str, str], DataLoader] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> SyncClient[Any] | None:
+        cli = self.clients.get(key)
+        if cli is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cli
+
+    def set(self, key: tuple[str, str], cli: SyncClient[Any]) -> None:
+        self.clients[key] = cli
+
+
+def add_request_middleware(
+    cli: SyncClient[Any], middleware: SyncHTTPMiddleware
+) -> None:
+    """
+    Add the middleware built by a middleware factory to a client.
+
+    It is called before the single_flight middlewares, the headers it adds
+    are part of their key, otherwise, it is the innermost middleware.
+    """
+    pos = 0
+    for idx, mw in enumerate(cli.middlewares):
+        if isinstance(mw, SyncSingleFlightMiddleware):
+            pos = idx + 1
+    cli.middlewares.insert(pos, middleware)
 
 
 class PyramidBlacksmith:
@@ -270,53 +816,628 @@ class PyramidBlacksmith:
     def __init__(
         self,
         request: Request,
-        clients: dict[str, SyncClientFactory[Any]],
-        middleware_factories: dict[str, list[AbstractMiddlewareFactoryBuilder]],
+        clients: Mapping[str, SyncClientFactory[Any]],
+        middleware_factories: Mapping[str, list[AbstractMiddlewareFactoryBuilder]],
+        client_cache: ClientCache | None = None,
+        uncached_clients: frozenset[str] = frozenset(),
+        executors: Mapping[str, ParallelExecutor] | None = None,
+        streamers: Mapping[str, CollectionStreamer] | None = None,
+        loaders: Mapping[str, Mapping[str, BatchLoader]] | None = None,
     ):
         self.request = request
         self.clients = clients
         self.middleware_factories = middleware_factories
+        self.client_cache = client_cache
+        self.uncached_clients = uncached_clients
+        self.executors = executors or {}
+        self.streamers = streamers or {}
+        self.loaders = loaders or {}
+        self.data_loaders: dict[tuple[str, str, str], DataLoader] = (
+            client_cache.loaders if client_cache is not None else {}
+        )
+
+    def parallel(
+        self,
+        name: str,
+        *calls: Callable[[Callable[..., SyncClient[Any]]], Any],
+        timeout: float | None = None,
+    ) -> list[Any]:
+        """
+        Run the calls concurrently in the thread pool of the client key ``name``.
+
+        Every call receives the client getter, ``request.blacksmith.<name>``,
+        the results are returned in order.
 
-    def __getattr__(self, name: str) -> Callable[[str], SyncClient[Any]]:
+        .. code-block::
+
+            user, notifs = request.blacksmith.parallel(
+                "client",
+                lambda client: client("api_user").users.get({"username": "jo"}),
+                lambda client: client("api_notif").notifs.collection_get({}),
+            )
+
+        :param timeout: override the timeout of the batch, in seconds.
+        """
+        try:
+            executor = self.executors[name]
+        except KeyError as k:
+            raise AttributeError(f"Client {k} is not registered") from k
+        get_client = getattr(self, name)
+        return executor.map(
+            self.request, [partial(call, get_client) for call in calls], timeout
+        )
+
+    def stream(
+        self,
+        name: str,
+        client_name: str,
+        resource: str,
+        params: Any = None,
+    ) -> Generator[Any, None, None]:
+        """
+        Iterate over every items of a paginated collection of a resource.
+
+        The items are yielded while they are parsed, the next pages are
+        fetched in the thread pool of the client key ``name``, configured by
+        :class:`BlacksmithCollectionStreamBuilder`.
+
+        .. code-block::
+
+            for user in request.blacksmith.stream(
+                "client", "api_user", "users", {"active": True}
+            ):
+                ...
+
+        The HTTP errors are raised while iterating.
+        """
+        try:
+            streamer = self.streamers[name]
+            executor = self.executors[name]
+        except KeyError as k:
+            raise AttributeError(f"Client {k} is not registered") from k
+        api = getattr(self, name)(client_name)
+        proxy = getattr(api, resource)
+
+        def fetch(page_params: Any) -> Any:
+            return proxy.collection_get(page_params).unwrap()
+
+        return streamer.stream(self.request, executor, fetch, params or {})
+
+    def loader(self, name: str, client_name: str, resource: str) -> DataLoader:
+        """
+        Get the data loader of a resource, for the lifetime of the request.
+
+        The keys loaded while rendering the request are fetched together,
+        using the batch route of the resource, configured by
+        :class:`BlacksmithDataLoaderBuilder`, or using concurrent calls of
+        ``get``, in the thread pool of the client key ``name``.
+
+        .. code-block::
+
+            users = request.blacksmith.loader("client", "api_user", "users")
+            results = [users.load(item.user_id) for item in items]
+            for item, user in zip(items, results):
+                item.user = user.result()
+
+        The results are unwrapped, the HTTP errors are raised while getting
+        the results, by ``unwrap``.
+        """
+        key = (name, client_name, resource)
+        data_loader = self.data_loaders.get(key)
+        if data_loader is not None:
+            return data_loader
+        try:
+            executor = self.executors[name]
+            loaders = self.loaders[name]
+        except KeyError as k:
+            raise AttributeError(f"Client {k} is not registered") from k
+        loader = loaders.get(f"{client_name}.{resource}") or BatchLoader()
+        get_client = getattr(self, name)
+
+        def fetch_one(key: Any) -> Any:
+            proxy = getattr(get_client(client_name), resource)
+            return proxy.get({loader.key_param: key}).unwrap()
+
+        fetch_batch = None
+        if loader.batch_param:
+            batch_param = loader.batch_param
+            batch_resource = loader.batch_resource or resource
+
+            def fetch_batch(keys: list[Any]) -> Any:
+                proxy = getattr(get_client(client_name), batch_resource)
+                return proxy.collection_get({batch_param: keys}).unwrap()
+
+        data_loader = DataLoader(self.request, executor, loader, fetch_one, fetch_batch)
+        self.data_loaders[key] = data_loader
+        return data_loader
+
+    def __getattr__(self, name: str) -> Callable[..., SyncClient[Any]]:
         """
         Return the blacksmith client factory named in the configuration.
+
+        The bound getter is memoized on the instance, so, while the binding
+        is reified, ``request.blacksmith.client`` is created once per request.
+
+        Clients are reused for the whole pyramid request, the parameter
+        ``cache=False`` build a new client, for code that mutates it.
         """
 
-        def get_client(client_name: str) -> SyncClient[Any]:
+        def get_client(client_name: str, cache: bool = True) -> SyncClient[Any]:
             try:
                 client_factory = self.clients[name]
             except KeyError as k:
                 raise AttributeError(f"Client {k} is not registered") from k
 
+            client_cache = self.client_cache
+            if not cache or name in self.uncached_clients:
+                client_cache = None
+            if client_cache is not None:
+                cli = client_cache.get((name, client_name))
+                if cli is not None:
+                    return cli
+
             cli = client_factory(client_name)
             for middleware_factory in self.middleware_factories.get(name, []):
-                cli.add_middleware(middleware_factory(self.request))
+                middleware = middleware_factory(self.request)
+                if middleware is not None:
+                    add_request_middleware(cli, middleware)
+            if client_cache is not None:
+                client_cache.set((name, client_name), cli)
             return cli
 
+        self.__dict__[name] = get_client
         return get_client
 
 
+class InitializedClients(dict[str, asyncio.AbstractEventLoop]):
+    """The event loops of the async client keys that have been initialized."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.locks: dict[str, asyncio.Lock] = {}
+        fork.register(self)
+
+    def lock(self, name: str) -> asyncio.Lock:
+        """The lock held during the initialization of the client key."""
+        return self.locks.setdefault(name, asyncio.Lock())
+
+    def after_fork(self) -> None:
+        """The event loops of the parent process do not run in the child."""
+        self.clear()
+        self.locks.clear()
+
+
+class AsyncPyramidBlacksmith:
+    """
+    Type of the `request.blacksmith_async` property.
+
+    Clients are built by the blacksmith ``AsyncClientFactory``, in order
+    to consume many services concurrently:
+
+    .. code-block::
+
+        async def fetch(request):
+            user, notif = await asyncio.gather(
+                request.blacksmith_async.client("api_user"),
+                request.blacksmith_async.client("api_notif"),
+            )
+            ...
+
+
+        def my_view(request):
+            user, notif = request.blacksmith_async.run(fetch(request))
+
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        clients: Mapping[str, AsyncClientFactory[Any]],
+        middleware_factories: Mapping[str, list[AbstractAsyncMiddlewareFactoryBuilder]],
+        initialized: InitializedClients,
+        event_loop: EventLoopThread | None = None,
+    ):
+        self.request = request
+        self.clients = clients
+        self.middleware_factories = middleware_factories
+        self.initialized = initialized
+        self.event_loop = event_loop or EventLoopThread()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """
+        Run a coroutine from a synchronous view, and return its result.
+
+        The coroutines of every requests run in the same event loop, started
+        in a thread, the one the async clients are bound to.
+
+        :param timeout: maximum time, in seconds, to wait for the result.
+        """
+        return self.event_loop.run(coro, timeout)
+
+    def __getattr__(
+        self, name: str
+    ) -> Callable[[str], Coroutine[Any, Any, AsyncClient[Any]]]:
+        """
+        Return the blacksmith async client factory named in the configuration.
+
+        The middlewares of the factory are initialized on its first use, the
+        concurrent coroutines wait for the end of the initialization, and the
+        key is initialized again on the next use if it fails. They are bound to
+        its event loop, a ``RuntimeError`` is raised if the client key is used
+        from another event loop.
+        """
+
+        async def get_client(client_name: str) -> AsyncClient[Any]:
+            try:
+                client_factory = self.clients[name]
+            except KeyError as k:
+                raise AttributeError(f"Client {k} is not registered") from k
+
+            loop = asyncio.get_running_loop()
+            if name not in self.initialized:
+                async with self.initialized.lock(name):
+                    if name not in self.initialized:
+                        await client_factory.initialize()
+                        self.initialized[name] = loop
+            if self.initialized[name] is not loop:
+                raise RuntimeError(
+                    f"Client {name!r} is bound to another event loop, "
+                    "use request.blacksmith_async.run()"
+                )
+
+            cli = await client_factory(client_name)
+            for middleware_factory in self.middleware_factories.get(name, []):
+                middleware = middleware_factory(self.request)
+                if middleware is not None:
+                    cli.add_middleware(middleware)
+            return cli
+
+        self.__dict__[name] = get_client
+        return get_client
+
+
+@dataclass
+class BindingState:
+    """The objects of every client keys of ``request.blacksmith``."""
+
+    settings: dict[str, Any]
+    clients: LazyBuilds[SyncClientFactory[Any]]
+    middleware_factories: LazyBuilds[list[AbstractMiddlewareFactoryBuilder]]
+    executors: LazyBuilds[ParallelExecutor]
+    streamers: LazyBuilds[CollectionStreamer]
+    loaders: LazyBuilds[dict[str, BatchLoader]]
+    uncached_clients: frozenset[str]
+
+    @property
+    def builds(self) -> list[LazyBuilds[Any]]:
+        return [
+            self.clients,
+            self.middleware_factories,
+            self.executors,
+            self.streamers,
+            self.loaders,
+        ]
+
+
+def get_client_settings(settings: Settings, key: str) -> dict[str, Any]:
+    """Get the settings of a client key."""
+    prefix = f"blacksmith.{key}."
+    return {k: v for k, v in settings.items() if k.startswith(prefix)}
+
+
+def close_client_factory(
+    client_factory: SyncClientFactory[Any], close_transport: bool = True
+) -> None:
+    """
+    Close the connection pool of the transport of a client factory,
+    and the thread pools of its middlewares.
+
+    :param close_transport: False to keep the transport open, if it has been
+        passed in the settings instead of being built, it may be shared.
+    """
+    transport: Any = client_factory.transport
+    if close_transport and hasattr(transport, "close"):
+        transport.close()
+    for middleware in client_factory.middlewares:
+        middlewares = [middleware]
+        if isinstance(middleware, PrecompiledMiddleware):
+            middlewares = middleware.middlewares
+        for mw in middlewares:
+            if isinstance(mw, SyncHedgingMiddleware):
+                mw.pool.shutdown()
+
+
+class BlacksmithBinding:
+    """
+    Build ``request.blacksmith``, using the client keys of the settings.
+
+    The client keys can be reloaded while serving requests, see :meth:`reload`.
+
+    :param registry: the pyramid registry.
+    :param settings: the settings of the application.
+    """
+
+    def __init__(self, registry: Registry, settings: Settings):
+        self.registry = registry
+        self.metrics = BlacksmithPrometheusMetricsBuilder(settings).build()
+        self.lazy = is_lazy(settings)
+        self.drain_timeout = float(settings.get("blacksmith.reload_drain_timeout", 30))
+        self._lock = threading.Lock()
+        self.state = self.build_state(settings)
+        get_lazy_builds(registry).extend(self.state.builds)
+
+    def build_state(self, settings: Settings, lazy: bool | None = None) -> BindingState:
+        settings = dict(settings)
+        metrics = self.metrics
+        clients_key = aslist(settings.get("blacksmith.clients", ["client"]))
+        if lazy is None:
+            lazy = self.lazy
+
+        clients_dict = LazyBuilds(
+            "client factory",
+            clients_key,
+            lambda key: BlacksmithClientSettingsBuilder(settings, metrics, key).build(),
+            lazy,
+        )
+
+        middleware_factories = LazyBuilds(
+            "middleware factories",
+            clients_key,
+            lambda key: list(
+                BlacksmithMiddlewareFactoryBuilder(settings, metrics, key).build()
+            ),
+            lazy,
+        )
+
+        uncached_clients = frozenset(
+            key
+            for key in clients_key
+            if not asbool(settings.get(f"blacksmith.{key}.client_cache", True))
+        )
+
+        executors = LazyBuilds(
+            "parallel executor",
+            clients_key,
+            lambda key: BlacksmithParallelExecutorBuilder(
+                settings, metrics, key
+            ).build(),
+            lazy,
+        )
+        streamers = LazyBuilds(
+            "collection streamer",
+            clients_key,
+            lambda key: BlacksmithCollectionStreamBuilder(
+                settings, metrics, key
+            ).build(),
+            lazy,
+        )
+        loaders = LazyBuilds(
+            "data loaders",
+            clients_key,
+            lambda key: BlacksmithDataLoaderBuilder(settings, metrics, key).build(),
+            lazy,
+        )
+        return BindingState(
+            settings,
+            clients_dict,
+            middleware_factories,
+            executors,
+            streamers,
+            loaders,
+            uncached_clients,
+        )
+
+    def reload(self, settings: Settings) -> list[str]:
+        """
+        Reload the client keys from the ``blacksmith.*`` settings.
+
+        The client keys that have new settings are built before being swapped,
+        if their settings are invalid, the exception is raised and the current
+        client keys are kept. The client keys that have the same settings keep
+        their client factory, with its connections and caches.
+
+        The requests being processed use the previous client factories,
+        their connection pools are closed after ``blacksmith.reload_drain_timeout``
+        seconds, 30 by default.
+
+        Return the client keys that have been reloaded.
+        """
+        with self._lock:
+            old = self.state
+            state = self.build_state(settings, lazy=True)
+            unchanged = [
+                key
+                for key in state.clients
+                if key in old.clients
+                and get_client_settings(old.settings, key)
+                == get_client_settings(state.settings, key)
+            ]
+            for builds, old_builds in zip(state.builds, old.builds, strict=True):
+                builds.reuse(old_builds, unchanged)
+            changed = [key for key in state.clients if key not in unchanged]
+            for builds in state.builds:
+                for key in changed:
+                    builds[key]
+
+            self.state = state
+            lazy_builds = get_lazy_builds(self.registry)
+            for builds, old_builds in zip(state.builds, old.builds, strict=True):
+                if old_builds in lazy_builds:
+                    lazy_builds.remove(old_builds)
+                lazy_builds.append(builds)
+
+        drained = [key for key in old.clients if key not in unchanged]
+        if drained:
+            timer = threading.Timer(self.drain_timeout, self.drain, (old, drained))
+            timer.daemon = True
+            timer.start()
+        log.info("Blacksmith client keys reloaded: %r", changed)
+        return changed
+
+    def drain(self, state: BindingState, keys: Iterable[str]) -> None:
+        """Close the connection pools and the thread pools of client keys."""
+        for key in keys:
+            client_factory = state.clients.built(key)
+            if client_factory is not None:
+                transport = state.settings.get(f"blacksmith.{key}.transport")
+                close_client_factory(
+                    client_factory, not isinstance(transport, SyncAbstractTransport)
+                )
+            executor = state.executors.built(key)
+            if executor is not None:
+                executor.shutdown()
+
+    def __call__(self, request: Request) -> PyramidBlacksmith:
+        state = self.state
+        return PyramidBlacksmith(
+            request,
+            state.clients,
+            state.middleware_factories,
+            client_cache=request.blacksmith_client_cache,  # type: ignore
+            uncached_clients=state.uncached_clients,
+            executors=state.executors,
+            streamers=state.streamers,
+            loaders=state.loaders,
+        )
+
+
+def reload(registry: Registry, settings: Settings) -> list[str]:
+    """
+    Reload the client keys of ``request.blacksmith`` from new settings.
+
+    See :meth:`BlacksmithBinding.reload`.
+    """
+    binding: BlacksmithBinding = registry.blacksmith_binding  # type: ignore
+    return binding.reload(settings)
+
+
+def install_reload_signal(registry: Registry, signame: str, config_uri: str) -> None:
+    """
+    Reload the client keys when the process receive a signal.
+
+    The settings are read from the ``config_uri``, the path of the ini file,
+    optionally followed by ``#`` and the name of the app.
+    """
+    from pyramid.paster import get_appsettings
+
+    def reload_settings() -> None:
+        try:
+            reload(registry, get_appsettings(config_uri))
+        except Exception:
+            log.exception("Failed to reload the blacksmith client keys")
+
+    def handler(signum: int, frame: Any) -> None:
+        # the signal handler interrupts the main thread, reload in another one
+        threading.Thread(
+            target=reload_settings, name="blacksmith-reload", daemon=True
+        ).start()
+
+    try:
+        signum = signal.Signals[signame.upper()]
+    except KeyError as exc:
+        raise ConfigurationError(
+            f"Invalid signal {signame} for blacksmith.reload_signal"
+        ) from exc
+    signal.signal(signum, handler)
+
+
 def blacksmith_binding_factory(
     config: Configurator,
 ) -> Callable[[Request], PyramidBlacksmith]:
     settings: Settings = config.registry.settings  # type: ignore
-    clients_key = aslist(settings.get("blacksmith.clients", ["client"]))
+    binding = BlacksmithBinding(config.registry, settings)
+    config.registry.blacksmith_binding = binding  # type: ignore[attr-defined]
+    return binding
+
+
+def blacksmith_async_binding_factory(
+    config: Configurator,
+) -> Callable[[Request], AsyncPyramidBlacksmith] | None:
+    """
+    Build the ``request.blacksmith_async`` property from the settings like:
+
+    ::
+
+        blacksmith.async_clients =
+            client
+
+    Return None if there is no async clients.
+    """
+    settings: Settings = config.registry.settings  # type: ignore
+    clients_key = aslist(settings.get("blacksmith.async_clients", []))
+    if not clients_key:
+        return None
     metrics = BlacksmithPrometheusMetricsBuilder(settings).build()
+    lazy = is_lazy(settings)
+
+    clients_dict = LazyBuilds(
+        "async client factory",
+        clients_key,
+        lambda key: AsyncBlacksmithClientSettingsBuilder(
+            settings, metrics, key
+        ).build(),
+        lazy,
+    )
 
-    clients_dict = {
-        key: BlacksmithClientSettingsBuilder(settings, metrics, key).build()
-        for key in clients_key
-    }
+    middleware_factories = LazyBuilds(
+        "async middleware factories",
+        clients_key,
+        lambda key: cast(
+            list[AbstractAsyncMiddlewareFactoryBuilder],
+            list(
+                AsyncBlacksmithMiddlewareFactoryBuilder(settings, metrics, key).build()
+            ),
+        ),
+        lazy,
+    )
+    get_lazy_builds(config.registry).extend([clients_dict, middleware_factories])
+    initialized = InitializedClients()
+    event_loop = EventLoopThread()
 
-    middleware_factories = {
-        key: list(BlacksmithMiddlewareFactoryBuilder(settings, metrics, key).build())
-        for key in clients_key
-    }
+    def blacksmith_async_binding(request: Request) -> AsyncPyramidBlacksmith:
+        return AsyncPyramidBlacksmith(
+            request, clients_dict, middleware_factories, initialized, event_loop
+        )
+
+    return blacksmith_async_binding
+
+
+def is_binding_reified(settings: Settings) -> bool:
+    """
+    Return True if ``request.blacksmith`` is cached for the request lifetime.
+
+    ::
+
+        blacksmith.reify = true
+
+    """
+    return asbool(settings.get("blacksmith.reify", False))
 
-    def blacksmith_binding(request: Request) -> PyramidBlacksmith:
-        return PyramidBlacksmith(request, clients_dict, middleware_factories)
 
-    return blacksmith_binding
+def has_deadline(settings: Settings) -> bool:
+    """
+    Return True if a client key use the ``deadline`` middleware factory.
+
+    ::
+
+        blacksmith.client.middleware_factories =
+            deadline
+
+    """
+    clients_key = aslist(settings.get("blacksmith.clients", ["client"])) + aslist(
+        settings.get("blacksmith.async_clients", [])
+    )
+    for key in clients_key:
+        factories = aslist(
+            settings.get(f"blacksmith.{key}.middleware_factories", []), flatten=False
+        )
+        if any(factory.split(maxsplit=1)[0] == "deadline" for factory in factories):
+            return True
+    return False
+
+
+def blacksmith_client_cache(request: Request) -> ClientCache:
+    return ClientCache()
 
 
 def includeme(config: Configurator):
@@ -338,14 +1459,71 @@ def includeme(config: Configurator):
             api = request.blacksmith.client("api")
             ...
 
+    By default, the property is rebuilt on every access, set
+    ``blacksmith.reify = true`` to build it once per request.
+
+    Clients are cached per request in ``request.blacksmith_client_cache``.
+
+    The client keys listed in ``blacksmith.async_clients`` are also exposed
+    using async clients in ``request.blacksmith_async``.
+
+    Set ``blacksmith.lazy = true`` to build the client keys on their first
+    use, see :func:`warmup`.
+
+    Set ``blacksmith.reload_signal`` to reload the client keys on a signal,
+    see :func:`reload`.
+
+    Set ``blacksmith.prometheus_metrics_path = /metrics`` to expose the
+    prometheus metrics in a view.
     """
     settings = config.registry.settings  # type: ignore
     resources = aslist(settings.get("blacksmith.scan", []))
+    start = time.perf_counter()
     blacksmith.scan(*resources)
+    log.info(
+        "Blacksmith resources scanned in %.1fms", (time.perf_counter() - start) * 1000
+    )
 
+    if has_deadline(settings):
+        config.add_subscriber(set_start_time, NewRequest)
+    config.add_request_method(
+        callable=blacksmith_client_cache,
+        name="blacksmith_client_cache",
+        reify=True,
+    )
     config.add_request_method(
         callable=blacksmith_binding_factory(config),
         name="blacksmith",
         property=True,
-        reify=False,
+        reify=is_binding_reified(settings),
     )
+    async_binding = blacksmith_async_binding_factory(config)
+    if async_binding:
+        config.add_request_method(
+            callable=async_binding,
+            name="blacksmith_async",
+            property=True,
+            reify=is_binding_reified(settings),
+        )
+
+    reload_signal = settings.get("blacksmith.reload_signal")
+    if reload_signal:
+        config_uri = settings.get("blacksmith.reload_config_uri")
+        if not config_uri:
+            raise ConfigurationError(
+                "blacksmith.reload_signal requires blacksmith.reload_config_uri"
+            )
+        install_reload_signal(
+            config.registry,  # type: ignore[arg-type]
+            reload_signal,
+            config_uri,
+        )
+
+    metrics_path = settings.get("blacksmith.prometheus_metrics_path")
+    if metrics_path:
+        registry: Any = config.registry
+        registry.blacksmith_metrics = BlacksmithPrometheusMetricsBuilder(
+            settings
+        ).build()
+        config.add_route("blacksmith_metrics", metrics_path)
+        config.add_view(metrics_view, route_name="blacksmith_metrics")
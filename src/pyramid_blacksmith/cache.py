@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any
+
+from blacksmith import AsyncAbstractCache
+from blacksmith.middleware._sync.http_cache import SyncAbstractCache
+
+from . import fork
+
+CacheValue = str | bytes
+
+
+def _value_size(val: CacheValue) -> int:
+    """The number of bytes of a value, the str are utf-8 encoded."""
+    return len(val.encode()) if isinstance(val, str) else len(val)
+
+
+class LRUCache:
+    """
+    In-process cache, bounded by a number of entries and a number of bytes.
+
+    The least recently used entries are evicted first.
+
+    :param max_entries: maximum number of entries, unbounded if None.
+    :param max_bytes: maximum size of the values, in bytes, unbounded if None.
+    """
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[CacheValue, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> CacheValue | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            val, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return val
+
+    def set(self, key: str, val: CacheValue, ttl: float) -> None:
+        size = _value_size(val)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if ttl <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+                return
+            self._entries[key] = (val, time.monotonic() + ttl, size)
+            self.size += size
+            while (
+                self.max_entries is not None and len(self._entries) > self.max_entries
+            ) or (self.max_bytes is not None and self.size > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+
+def _ttl(pttl: int) -> float:
+    # redis returns a negative pttl for keys without expiration
+    return pttl / 1000 if pttl > 0 else 0
+
+
+class SyncTwoTierCache(SyncAbstractCache):
+    """
+    Cache of the http cache middleware, an :class:`LRUCache` in front of redis.
+
+    The values are kept in the process with the time to live computed by the
+    cache policy. A value read from redis is kept for its remaining time to
+    live in redis.
+
+    :param backend: the redis client.
+    :param l1: the in-process cache.
+    """
+
+    def __init__(self, backend: Any, l1: LRUCache):
+        self.backend = backend
+        self.l1 = l1
+
+    def initialize(self) -> None:
+        if hasattr(self.backend, "initialize"):
+            self.backend.initialize()
+
+    def get(self, key: str) -> Any:
+        val = self.l1.get(key)
+        if val is not None:
+            return val
+        with self.backend.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            val, pttl = pipe.execute()
+        if val is not None:
+            self.l1.set(key, val, _ttl(pttl))
+        return val
+
+    def set(self, key: str, val: str, ex: timedelta) -> None:
+        self.backend.set(key, val, ex)
+        self.l1.set(key, val, ex.total_seconds())
+
+
+class AsyncTwoTierCache(AsyncAbstractCache):
+    """
+    Cache of the async http cache middleware, the :class:`SyncTwoTierCache`
+    for the ``redis.asyncio`` client.
+    """
+
+    def __init__(self, backend: Any, l1: LRUCache):
+        self.backend = backend
+        self.l1 = l1
+
+    async def initialize(self) -> None:
+        if hasattr(self.backend, "initialize"):
+            await self.backend.initialize()
+
+    async def get(self, key: str) -> Any:
+        val = self.l1.get(key)
+        if val is not None:
+            return val
+        async with self.backend.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            val, pttl = await pipe.execute()
+        if val is not None:
+            self.l1.set(key, val, _ttl(pttl))
+        return val
+
+    async def set(self, key: str, val: str, ex: timedelta) -> None:
+        await self.backend.set(key, val, ex)
+        self.l1.set(key, val, ex.total_seconds())
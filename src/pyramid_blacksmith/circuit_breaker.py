@@ -0,0 +1,249 @@
+"""
+Circuit breaker states shared by the processes of a host.
+
+The states are stored in a memory mapped file, every process that maps the
+same file shares the same circuit breakers, without a network round trip.
+
+.. code-block:: ini
+
+    blacksmith.client.middleware.circuitbreaker =
+        uow     pyramid_blacksmith.circuit_breaker:SyncMmapUnitOfWork
+
+    blacksmith.client.middleware.circuitbreaker.uow =
+        path    /dev/shm/blacksmith-circuitbreaker
+        slots   256
+
+"""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, cast
+
+from purgatory import (
+    AsyncAbstractUnitOfWork,
+    SyncAbstractUnitOfWork,
+)
+from purgatory.domain.messages.base import Message
+from purgatory.domain.model import Context
+from purgatory.service._async.repository import AsyncAbstractRepository
+from purgatory.service._sync.repository import SyncAbstractRepository
+from purgatory.typing import CircuitName, StateName
+
+from . import fork
+
+STATES: list[StateName] = ["closed", "opened", "half-opened"]
+
+# key, state, threshold, ttl, failure count, opened at, name
+SLOT = struct.Struct("<QBIdId64s")
+
+
+def circuit_key(name: CircuitName) -> int:
+    # 0 is reserved for the empty slots
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class MmapStore:
+    """
+    Fixed size hash table of circuit breaker states in a memory mapped file.
+
+    The file is locked using POSIX record locks between processes,
+    and a lock between threads. An existing file must have been created
+    with the same number of slots, the circuits are hashed by slot.
+
+    :param path: the path of the file shared by the processes.
+    :param slots: maximum number of circuit breakers.
+    """
+
+    def __init__(self, path: str, slots: int | str = 256):
+        self.path = path
+        self.slots = int(slots)
+        self.size = SLOT.size * self.slots
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            with self.locked():
+                size = os.fstat(self._fd).st_size
+                if size == 0:
+                    os.ftruncate(self._fd, self.size)
+                elif size != self.size:
+                    raise ValueError(
+                        f"{path} has been created with {size // SLOT.size} "
+                        f"slots, not {self.slots}"
+                    )
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._mmap = mmap.mmap(self._fd, self.size)
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        # the mapping is shared, the record locks are not inherited by a fork
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def find(self, name: CircuitName) -> tuple[int, tuple[Any, ...] | None]:
+        """Find the offset of the slot of a circuit, and its value if any."""
+        key = circuit_key(name)
+        for probe in range(self.slots):
+            offset = ((key + probe) % self.slots) * SLOT.size
+            value = SLOT.unpack_from(self._mmap, offset)
+            if value[0] == key:
+                return offset, value
+            if value[0] == 0:
+                return offset, None
+        raise RuntimeError(f"No slot left for the circuit {name} in {self.path}")
+
+    def get(self, name: CircuitName) -> Context | None:
+        with self.locked():
+            _, value = self.find(name)
+        if value is None:
+            return None
+        _, state, threshold, ttl, failure_count, opened_at, _ = value
+        return Context(
+            name,
+            threshold,
+            ttl,
+            state=STATES[int(state)],
+            failure_count=failure_count,
+            opened_at=None if math.isnan(opened_at) else opened_at,
+        )
+
+    def register(self, context: Context) -> None:
+        with self.locked():
+            offset, value = self.find(context.name)
+            if value is not None:
+                # registered by another process since the circuit was read
+                return
+            SLOT.pack_into(
+                self._mmap,
+                offset,
+                circuit_key(context.name),
+                STATES.index(context.state),
+                context.threshold,
+                context.ttl,
+                context.failure_count or 0,
+                math.nan if context.opened_at is None else context.opened_at,
+                context.name.encode()[:64],
+            )
+
+    def update(
+        self,
+        name: CircuitName,
+        state: str | None = None,
+        opened_at: float | None = None,
+        failure_count: int | None = None,
+        inc_failures: bool = False,
+    ) -> None:
+        with self.locked():
+            offset, value = self.find(name)
+            if value is None:
+                return
+            fields = list(value)
+            if state is not None:
+                fields[1] = STATES.index(cast(StateName, state))
+                fields[5] = math.nan if opened_at is None else opened_at
+            if failure_count is not None:
+                fields[4] = failure_count
+            if inc_failures:
+                fields[4] += 1
+            SLOT.pack_into(self._mmap, offset, *fields)
+
+    def clear(self) -> None:
+        """Reset every circuit breakers."""
+        with self.locked():
+            self._mmap[:] = bytes(self.size)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+
+class SyncMmapRepository(SyncAbstractRepository):
+    def __init__(self, path: str, slots: int | str = 256):
+        self.store = MmapStore(path, slots)
+        self.messages: list[Message] = []
+
+    def get(self, name: CircuitName) -> Context | None:
+        return self.store.get(name)
+
+    def register(self, context: Context) -> None:
+        self.store.register(context)
+
+    def update_state(self, name: str, state: str, opened_at: float | None) -> None:
+        self.store.update(name, state=state, opened_at=opened_at)
+
+    def inc_failures(self, name: str, failure_count: int) -> None:
+        self.store.update(name, inc_failures=True)
+
+    def reset_failure(self, name: str) -> None:
+        self.store.update(name, failure_count=0)
+
+
+class AsyncMmapRepository(AsyncAbstractRepository):
+    def __init__(self, path: str, slots: int | str = 256):
+        self.store = MmapStore(path, slots)
+        self.messages: list[Message] = []
+
+    async def get(self, name: CircuitName) -> Context | None:
+        return self.store.get(name)
+
+    async def register(self, context: Context) -> None:
+        self.store.register(context)
+
+    async def update_state(
+        self, name: str, state: str, opened_at: float | None
+    ) -> None:
+        self.store.update(name, state=state, opened_at=opened_at)
+
+    async def inc_failures(self, name: str, failure_count: int) -> None:
+        self.store.update(name, inc_failures=True)
+
+    async def reset_failure(self, name: str) -> None:
+        self.store.update(name, failure_count=0)
+
+
+class SyncMmapUnitOfWork(SyncAbstractUnitOfWork):
+    """
+    Unit of work of purgatory that share the circuit breakers of a host.
+
+    :param path: the path of the file shared by the processes.
+    :param slots: maximum number of circuit breakers.
+    """
+
+    def __init__(self, path: str, slots: int | str = 256):
+        self.contexts = SyncMmapRepository(path, slots)
+
+    def commit(self) -> None:
+        """Do nothing."""
+
+    def rollback(self) -> None:
+        """Do nothing."""
+
+
+class AsyncMmapUnitOfWork(AsyncAbstractUnitOfWork):
+    """The :class:`SyncMmapUnitOfWork` for the async clients."""
+
+    def __init__(self, path: str, slots: int | str = 256):
+        self.contexts = AsyncMmapRepository(path, slots)
+
+    async def commit(self) -> None:
+        """Do nothing."""
+
+    async def rollback(self) -> None:
+        """Do nothing."""
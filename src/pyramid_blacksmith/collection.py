@@ -0,0 +1,121 @@
+"""
+Stream the items of a paginated collection, prefetching the next pages.
+"""
+
+import math
+from collections import deque
+from collections.abc import Callable, Generator
+from concurrent.futures import Future
+from functools import partial
+from typing import Any
+
+from blacksmith.domain.model.params import CollectionIterator
+from pyramid.request import Request
+
+from .parallel import ParallelExecutor
+
+FetchPage = Callable[[Any], CollectionIterator[Any]]
+
+
+class CollectionStreamer:
+    """
+    Iterate over the items of a paginated collection, page by page.
+
+    The pages are fetched using ``collection_get``, the items are parsed by
+    the ``collection_parser`` of the client, one by one, while the next pages
+    are fetched in the thread pool of the client key. At most ``prefetch + 1``
+    pages are kept in memory.
+
+    The last page is the first page that has less than ``page_size`` items,
+    or the page that contains the ``total_count`` of the metadata, if the
+    collection parser provides it.
+
+    :param page_size: number of items per page.
+    :param prefetch: number of pages fetched in advance.
+    :param page_param: the parameter of the page number.
+    :param size_param: the parameter of the page size.
+    :param offset_param: the parameter of the offset of the first item of the
+        page, if the collection is paginated by offset instead of by page number.
+    :param first_page: the number of the first page.
+    """
+
+    def __init__(
+        self,
+        page_size: int = 100,
+        prefetch: int = 1,
+        page_param: str = "page",
+        size_param: str = "per_page",
+        offset_param: str | None = None,
+        first_page: int = 1,
+    ):
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.page_param = page_param
+        self.size_param = size_param
+        self.offset_param = offset_param
+        self.first_page = first_page
+
+    def get_params(self, params: Any, index: int) -> Any:
+        """Get the parameters of the request of the page at the given index."""
+        update: dict[str, int] = {self.size_param: self.page_size}
+        if self.offset_param:
+            update[self.offset_param] = index * self.page_size
+        else:
+            update[self.page_param] = self.first_page + index
+        if isinstance(params, dict):
+            return {**params, **update}
+        return params.model_copy(update=update)
+
+    def stream(
+        self,
+        request: Request,
+        executor: ParallelExecutor,
+        fetch: FetchPage,
+        params: Any,
+    ) -> Generator[Any, None, None]:
+        """
+        Yield the items of every pages.
+
+        :param request: the pyramid request, for the thread pool.
+        :param executor: the thread pool that fetch the pages.
+        :param fetch: fetch a page of the collection, using its parameters.
+        :param params: the parameters of the collection.
+        """
+        pending: deque[tuple[int, Future[CollectionIterator[Any]]]] = deque()
+        next_index = 0
+        last_index: int | None = None
+
+        def submit() -> None:
+            nonlocal next_index
+            call = partial(fetch, self.get_params(params, next_index))
+            pending.append((next_index, executor.submit(request, call)))
+            next_index += 1
+
+        def has_next() -> bool:
+            return last_index is None or next_index <= last_index
+
+        try:
+            submit()
+            while pending:
+                index, future = pending.popleft()
+                page = future.result()
+                meta = page.meta
+                if meta.count < self.page_size:
+                    last_index = index
+                elif last_index is None and meta.total_count is not None:
+                    last_index = max(
+                        index, math.ceil(meta.total_count / self.page_size) - 1
+                    )
+                if last_index is not None:
+                    # the pages after the last one are not consumed
+                    while pending and pending[-1][0] > last_index:
+                        pending.pop()[1].cancel()
+                    next_index = min(next_index, last_index + 1)
+                while len(pending) < self.prefetch and has_next():
+                    submit()
+                yield from page
+                if not pending and has_next():
+                    submit()
+        finally:
+            for _, future in pending:
+                future.cancel()
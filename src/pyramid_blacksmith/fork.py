@@ -0,0 +1,52 @@
+"""
+Reset the resources of pyramid_blacksmith in the child process of a fork.
+
+Using ``gunicorn --preload``, the clients are built once in the master process,
+the workers inherit its connection pools, its locks and its thread pools.
+The sockets of a pool must not be shared by processes, and the locks held or
+the threads started by the master are not usable in a worker.
+
+The pooled resources register themselves in this module, and are reset in the
+child process by a hook registered with :func:`os.register_at_fork`.
+The configuration parsed and the classes imported are kept.
+
+Servers that fork without calling :func:`os.fork`, such as uWSGI, have to call
+:func:`reset_after_fork` in their own post fork hook.
+"""
+
+import os
+import weakref
+from collections.abc import Callable
+from typing import Any
+
+# keyed by id, the resources may not be hashable
+_resources: "weakref.WeakValueDictionary[int, Any]" = weakref.WeakValueDictionary()
+_hooks: list[Callable[[], None]] = []
+
+
+def register(resource: Any) -> None:
+    """
+    Register a resource to reset after a fork.
+
+    :param resource: an object with an ``after_fork`` method, called in the
+        child process. The resource is not kept alive by the registration.
+    """
+    _resources[id(resource)] = resource
+
+
+def add_hook(hook: Callable[[], None]) -> Callable[[], None]:
+    """Register a function called in the child process, after a fork."""
+    _hooks.append(hook)
+    return hook
+
+
+def reset_after_fork() -> None:
+    """Reset every registered resources, in the child process of a fork."""
+    for hook in _hooks:
+        hook()
+    for resource in list(_resources.values()):
+        resource.after_fork()
+
+
+if hasattr(os, "register_at_fork"):  # coverage: ignore
+    os.register_at_fork(after_in_child=reset_after_fork)
@@ -0,0 +1,167 @@
+"""
+Batch the lookups of resources by key, made while rendering a pyramid request.
+"""
+
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from concurrent.futures import Future
+from functools import partial
+from typing import Any
+
+from pyramid.request import Request
+
+from .parallel import ParallelExecutor
+
+FetchOne = Callable[[Any], Any]
+FetchBatch = Callable[[list[Any]], Iterable[Any]]
+
+
+class BatchLoader:
+    """
+    Process-wide configuration of the data loaders of a resource.
+
+    Without ``batch_param``, the resource does not have a batch route, every
+    key is fetched using ``get``, concurrently.
+
+    :param key_param: the parameter of the key, while getting a single item.
+    :param key_field: the field of the items that contains their key,
+        default to ``key_param``.
+    :param batch_resource: the resource of the batch route, its
+        ``collection_get`` is called, default to the loaded resource.
+    :param batch_param: the parameter of the list of keys of the batch route.
+    :param max_batch_size: maximum number of keys per call of the batch route.
+    """
+
+    def __init__(
+        self,
+        key_param: str = "id",
+        key_field: str | None = None,
+        batch_resource: str | None = None,
+        batch_param: str | None = None,
+        max_batch_size: int = 100,
+    ):
+        self.key_param = key_param
+        self.key_field = key_field or key_param
+        self.batch_resource = batch_resource
+        self.batch_param = batch_param
+        self.max_batch_size = max_batch_size
+
+
+class LoadResult:
+    """
+    The result of :meth:`DataLoader.load`.
+
+    Getting the result dispatches the keys that are waiting to be loaded.
+    """
+
+    def __init__(self, loader: "DataLoader", future: "Future[Any]"):
+        self.loader = loader
+        self.future = future
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float | None = None) -> Any:
+        if not self.future.done():
+            self.loader.dispatch()
+        return self.future.result(timeout)
+
+
+class DataLoader:
+    """
+    Load the items of a resource by key, for the lifetime of a pyramid request.
+
+    The keys are collected by :meth:`load`, then fetched together, when a
+    result is needed, using a single call of the batch route per
+    ``max_batch_size`` keys, or concurrent calls of ``get`` if there is no
+    batch route. The keys are fetched once, their results, and their errors,
+    are reused for the rest of the request.
+
+    :param request: the pyramid request, for the thread pool.
+    :param executor: the thread pool that fetch the items.
+    :param loader: the configuration of the loaded resource.
+    :param fetch_one: fetch the item of a key.
+    :param fetch_batch: fetch the items of many keys, if there is a batch route.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        executor: ParallelExecutor,
+        loader: BatchLoader,
+        fetch_one: FetchOne,
+        fetch_batch: FetchBatch | None = None,
+    ):
+        self.request = request
+        self.executor = executor
+        self.loader = loader
+        self.fetch_one = fetch_one
+        self.fetch_batch = fetch_batch
+        self._results: dict[Hashable, Future[Any]] = {}
+        self._queue: list[Hashable] = []
+
+    def load(self, key: Hashable) -> LoadResult:
+        """Schedule the load of a key, its item is fetched on the next dispatch."""
+        if key not in self._results:
+            self._results[key] = Future()
+            self._queue.append(key)
+        return LoadResult(self, self._results[key])
+
+    def load_many(self, keys: Sequence[Hashable]) -> list[Any]:
+        """Load the items of many keys, in order."""
+        results = [self.load(key) for key in keys]
+        return [result.result() for result in results]
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Store the item of a key that has been fetched by another call."""
+        if key not in self._results or self._results[key].done():
+            future: Future[Any] = Future()
+            future.set_result(value)
+            self._results[key] = future
+
+    def clear(self, key: Hashable) -> None:
+        """Forget the item of a key, it will be fetched again."""
+        future = self._results.get(key)
+        if future is not None and future.done():
+            del self._results[key]
+
+    def dispatch(self) -> None:
+        """Fetch the keys that are waiting to be loaded."""
+        keys, self._queue = self._queue, []
+        if not keys:
+            return
+        if self.fetch_batch is None:
+            for key in keys:
+                self._submit(partial(self.fetch_one, key), [key])
+        else:
+            size = self.loader.max_batch_size
+            for idx in range(0, len(keys), size):
+                chunk = keys[idx : idx + size]
+                self._submit(partial(self.fetch_batch, chunk), chunk)
+
+    def _submit(self, call: Callable[[], Any], keys: list[Hashable]) -> None:
+        results = [self._results[key] for key in keys]
+        future = self.executor.submit(self.request, call)
+        future.add_done_callback(partial(self._resolve, keys, results))
+
+    def _resolve(
+        self,
+        keys: list[Hashable],
+        results: list["Future[Any]"],
+        future: "Future[Any]",
+    ) -> None:
+        try:
+            value = future.result()
+        except BaseException as exc:
+            for result in results:
+                result.set_exception(exc)
+            return
+        if self.fetch_batch is None:
+            results[0].set_result(value)
+            return
+        field = self.loader.key_field
+        items = {getattr(item, field): item for item in value}
+        for key, result in zip(keys, results, strict=True):
+            if key in items:
+                result.set_result(items[key])
+            else:
+                result.set_exception(KeyError(f"{field} {key!r} not found"))
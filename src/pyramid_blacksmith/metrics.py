@@ -0,0 +1,129 @@
+"""
+Prometheus metrics of pyramid_blacksmith.
+
+Using many worker processes, such as gunicorn workers, the metrics can be
+aggregated using the multiprocess mode of prometheus_client, enabled by the
+environment variable ``PROMETHEUS_MULTIPROC_DIR``.
+"""
+
+import os
+from typing import Any
+
+from blacksmith import PrometheusMetrics
+from blacksmith.domain.model.middleware.prometheus import Registry
+from pyramid.request import Request
+from pyramid.response import Response
+
+
+def is_multiprocess() -> bool:
+    """Return True if the multiprocess mode of prometheus_client is enabled."""
+    return bool(
+        os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        or os.environ.get("prometheus_multiproc_dir")
+    )
+
+
+class BlacksmithMetrics(PrometheusMetrics):
+    """
+    Prometheus metrics of blacksmith, and of the pyramid_blacksmith middlewares.
+
+    The middlewares of pyramid_blacksmith also work with the
+    :class:`blacksmith.PrometheusMetrics`, without collecting their own metrics.
+    """
+
+    def __init__(
+        self,
+        buckets: list[float] | None = None,
+        hit_cache_buckets: list[float] | None = None,
+        registry: Registry = None,
+    ) -> None:
+        from prometheus_client import REGISTRY, Counter, Gauge
+
+        super().__init__(buckets, hit_cache_buckets, registry)
+        if registry is None:
+            registry = REGISTRY
+        self.registry = registry
+
+        self.blacksmith_concurrency_limit = Gauge(
+            "blacksmith_concurrency_limit",
+            "Maximum number of requests in flight to a service.",
+            registry=registry,
+            labelnames=["service", "version"],
+            multiprocess_mode="livesum",
+        )
+        self.blacksmith_concurrency_in_flight = Gauge(
+            "blacksmith_concurrency_in_flight",
+            "Number of requests in flight to a service.",
+            registry=registry,
+            labelnames=["service", "version"],
+            multiprocess_mode="livesum",
+        )
+        self.blacksmith_concurrency_rejected = Counter(
+            "blacksmith_concurrency_rejected",
+            "Requests rejected because the concurrency limit has been reached.",
+            registry=registry,
+            labelnames=["service", "version"],
+        )
+        self.blacksmith_retry = Counter(
+            "blacksmith_retry",
+            "Requests sent again by the retry middleware.",
+            registry=registry,
+            labelnames=["client_name"],
+        )
+        self.blacksmith_retry_budget_exhausted = Counter(
+            "blacksmith_retry_budget_exhausted",
+            "Retries not sent because the retry budget is exhausted.",
+            registry=registry,
+            labelnames=["client_name"],
+        )
+        self.blacksmith_hedge = Counter(
+            "blacksmith_hedge",
+            "Hedged requests sent by the hedging middleware.",
+            registry=registry,
+            labelnames=["client_name"],
+        )
+        self.blacksmith_hedge_won = Counter(
+            "blacksmith_hedge_won",
+            "Hedged requests that responded before the original request.",
+            registry=registry,
+            labelnames=["client_name"],
+        )
+
+
+def get_collector_registry(metrics: PrometheusMetrics | None = None) -> Any:
+    """
+    Get the registry that collect the metrics of every processes.
+
+    In multiprocess mode, a new registry collects the metrics written by every
+    processes, otherwise, it is the registry of the metrics of this process.
+    """
+    from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore
+        return registry
+    return getattr(metrics, "registry", None) or REGISTRY
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Remove the live gauges of a dead process, in multiprocess mode.
+
+    It has to be called by the process manager, such as the ``child_exit``
+    hook of gunicorn.
+    """
+    if is_multiprocess():
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)  # type: ignore
+
+
+def metrics_view(request: Request) -> Response:
+    """Pyramid view that expose the metrics, in the prometheus text format."""
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    metrics = getattr(request.registry, "blacksmith_metrics", None)
+    resp = Response(generate_latest(get_collector_registry(metrics)))
+    resp.headers["Content-Type"] = CONTENT_TYPE_LATEST
+    return resp
@@ -1,20 +1,103 @@
 import abc
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, replace
 from typing import Any
 
 from blacksmith import (
+    AsyncCircuitBreakerMiddleware,
+    AsyncHTTPAddHeadersMiddleware,
+    AsyncHTTPCacheMiddleware,
+    AsyncHTTPMiddleware,
+    AsyncPrometheusMiddleware,
+    HTTPError,
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
     PrometheusMetrics,
     SyncCircuitBreakerMiddleware,
     SyncHTTPAddHeadersMiddleware,
     SyncHTTPCacheMiddleware,
     SyncHTTPMiddleware,
+    SyncMiddleware,
     SyncPrometheusMiddleware,
 )
+from blacksmith.domain.exceptions import HTTPTimeoutError
+from blacksmith.domain.registry import Registry
+from blacksmith.domain.registry import registry as default_registry
+from blacksmith.typing import ClientName, Path, ServiceName, Version
+from httpx import TransportError
 from pyramid.exceptions import ConfigurationError
 
 from pyramid_blacksmith.typing import Settings
 
+from . import fork
+from .cache import AsyncTwoTierCache, LRUCache, SyncTwoTierCache
+from .middleware_factory import DeadlineExceededError
+from .parallel import ParallelExecutor
+from .serializers import resolve_serializer
 from .utils import list_to_dict, resolve_entrypoint
 
+log = logging.getLogger(__name__)
+
+_redis_clients: dict[tuple[Any, ...], Any] = {}
+_redis_lock = threading.Lock()
+
+
+def get_redis_client(url: str, asyncio: bool = False, **kwargs: Any) -> Any:
+    """
+    Get a redis client shared by every clients using the same redis url.
+
+    :param url: the redis url.
+    :param asyncio: get a client of the redis.asyncio package.
+    :param kwargs: connection pool parameters, clients with different
+        parameters are not shared.
+    """
+    key = (url, asyncio, tuple(sorted(kwargs.items())))
+    with _redis_lock:
+        if key not in _redis_clients:
+            if asyncio:
+                from redis import asyncio as redis
+            else:
+                import redis  # type: ignore[no-redef]
+
+            _redis_clients[key] = redis.from_url(url, **kwargs)
+        return _redis_clients[key]
+
+
+def clear_redis_clients() -> None:
+    """
+    Forget the shared redis clients.
+
+    The connections are not closed, it is intended to be called in a forked
+    process that must not reuse the connections of its parent.
+    """
+    with _redis_lock:
+        _redis_clients.clear()
+
+
+@fork.add_hook
+def reset_redis_clients() -> None:
+    """
+    Drop the connections of the shared redis clients, after a fork.
+
+    The connections of the parent process are not closed, the clients open
+    new connections on their next command.
+    """
+    global _redis_lock
+    _redis_lock = threading.Lock()
+    for client in _redis_clients.values():
+        client.connection_pool.reset()
+
 
 class AbstractMiddlewareBuilder(abc.ABC):
     def __init__(
@@ -32,53 +115,891 @@ class AbstractMiddlewareBuilder(abc.ABC):
         """Build the Middleware"""
 
 
+class AbstractAsyncMiddlewareBuilder(AbstractMiddlewareBuilder):
+    """Builder of middlewares for the clients of ``request.blacksmith_async``."""
+
+    @abc.abstractmethod
+    def build(self) -> AsyncHTTPMiddleware:  # type: ignore[override]
+        """Build the Middleware"""
+
+
 class PrometheusMetricsBuilder(AbstractMiddlewareBuilder):
     def build(self) -> SyncPrometheusMiddleware:
         return SyncPrometheusMiddleware(metrics=self.metrics)
 
 
 class CircuitBreakerBuilder(AbstractMiddlewareBuilder):
-    def build(self) -> SyncCircuitBreakerMiddleware:
+    default_uow = "purgatory:SyncInMemoryUnitOfWork"
+
+    def get_kwargs(self) -> dict[str, Any]:
         settings = list_to_dict(self.settings, self.prefix)
         kwargs: dict[str, Any] = {}
         for key in ("threshold", "ttl"):
             if key in settings:
                 kwargs[key] = int(settings[key])
 
-        uow = settings.get("uow", "purgatory:SyncInMemoryUnitOfWork")
+        uow = settings.get("uow", self.default_uow)
         uow_cls = resolve_entrypoint(uow)
         uow_kwargs = list_to_dict(self.settings, f"{self.prefix}.uow")
         kwargs["uow"] = uow_cls(**uow_kwargs)
         kwargs["metrics"] = self.metrics
-        return SyncCircuitBreakerMiddleware(**kwargs)  # type: ignore
+        return kwargs
+
+    def build(self) -> SyncCircuitBreakerMiddleware:
+        middleware = SyncCircuitBreakerMiddleware(**self.get_kwargs())
+        # the request has not been sent, the upstream is not failing
+        middleware.circuit_breaker.global_exclude.append(DeadlineExceededError)
+        return middleware
 
 
 class HTTPCacheBuilder(AbstractMiddlewareBuilder):
-    def build(self) -> SyncHTTPCacheMiddleware:
-        import redis
+    two_tier_cache_class: type[Any] = SyncTwoTierCache
 
+    def get_redis_pool_kwargs(self) -> dict[str, Any]:
+        settings = list_to_dict(self.settings, f"{self.prefix}.redis_pool")
+        kwargs: dict[str, Any] = {}
+        for key, cast_ in (
+            ("max_connections", int),
+            ("socket_timeout", float),
+            ("socket_connect_timeout", float),
+            ("health_check_interval", int),
+        ):
+            if key in settings:
+                kwargs[key] = cast_(settings[key])
+        return kwargs
+
+    def build_cache(self, redis_url: str) -> Any:
+        return get_redis_client(redis_url, **self.get_redis_pool_kwargs())
+
+    def build_l1_cache(self, settings: Settings) -> LRUCache | None:
+        kwargs: dict[str, Any] = {}
+        for key in ("l1_max_entries", "l1_max_bytes"):
+            if key in settings:
+                kwargs[key[3:]] = int(settings[key])
+        if not kwargs:
+            return None
+        return LRUCache(**kwargs)
+
+    def get_kwargs(self) -> dict[str, Any]:
         settings = list_to_dict(self.settings, self.prefix)
-        kwargs = {}
+        kwargs: dict[str, Any] = {}
 
         mod = "blacksmith.domain.model.middleware.http_cache"
         redis_url = settings.get("redis")
         if not redis_url:
             raise ConfigurationError(f"Missing sub-key redis in setting {self.prefix}")
-        kwargs["cache"] = redis.from_url(redis_url)
+        kwargs["cache"] = self.build_cache(redis_url)
+        l1 = self.build_l1_cache(settings)
+        if l1 is not None:
+            kwargs["cache"] = self.two_tier_cache_class(kwargs["cache"], l1)
 
         policy_key = settings.get("policy", f"{mod}:CacheControlPolicy")
         policy_params = list_to_dict(self.settings, f"{self.prefix}.policy")
         policy_cls = resolve_entrypoint(policy_key)
-        kwargs["policy"] = policy_cls(**policy_params)  # type: ignore
+        kwargs["policy"] = policy_cls(**policy_params)
 
         srlz_key = settings.get("serializer", "json")
-        kwargs["serializer"] = resolve_entrypoint(srlz_key)  # type: ignore
-        kwargs["metrics"] = self.metrics  # type: ignore
-        return SyncHTTPCacheMiddleware(**kwargs)  # type: ignore
+        kwargs["serializer"] = resolve_serializer(srlz_key)
+        kwargs["metrics"] = self.metrics
+        return kwargs
+
+    def build(self) -> SyncHTTPCacheMiddleware:
+        return SyncHTTPCacheMiddleware(**self.get_kwargs())
 
 
 class HTTPStaticHeadersBuilder(AbstractMiddlewareBuilder):
+    def get_headers(self) -> dict[str, str]:
+        settings = list_to_dict(self.settings, self.prefix)
+        return {key.rstrip(":"): val for key, val in settings.items()}
+
     def build(self) -> SyncHTTPAddHeadersMiddleware:
+        return SyncHTTPAddHeadersMiddleware(self.get_headers())
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.resp: HTTPResponse | None = None
+        self.exc: Exception | None = None
+
+
+class SyncSingleFlightMiddleware(SyncHTTPMiddleware):
+    """
+    Collapse identical concurrent requests into one upstream call.
+
+    The first request is sent, the identical requests received while it is
+    in flight wait for its response, or its exception.
+
+    Requests are identical if they have the same method, url, querystring,
+    and headers. The middleware factories are called before this middleware,
+    the headers they add are part of the key.
+
+    :param methods: the http methods of the requests to collapse.
+    :param headers: the headers that distinguish requests, every headers
+        by default. Only set it if the other headers never change the
+        response, a forwarded identity header must be part of it.
+    :param redis: a redis client, to collapse requests accross processes.
+        The request is sent by the process that holds a lock, the response
+        is shared with the other processes for ``result_ttl`` seconds.
+    :param lock_timeout: maximum number of seconds to hold or wait the lock.
+    :param result_ttl: number of seconds the response is kept in redis.
+    """
+
+    def __init__(
+        self,
+        methods: list[str] | None = None,
+        headers: list[str] | None = None,
+        redis: Any = None,
+        lock_timeout: float = 10,
+        result_ttl: float = 1,
+    ):
+        self.methods = {method.upper() for method in methods or ["GET"]}
+        self.headers = [header.lower() for header in headers] if headers else None
+        self.redis = redis
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        # the leaders of the flights are threads of the parent process
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_key(self, req: HTTPRequest, client_name: ClientName) -> str | None:
+        if req.method.upper() not in self.methods:
+            return None
+        headers = {key.lower(): val for key, val in req.headers.items()}
+        values: list[tuple[str, str | None]]
+        if self.headers is None:
+            values = sorted(headers.items())
+        else:
+            values = [(header, headers.get(header)) for header in self.headers]
+        return repr(
+            (
+                client_name,
+                req.method.upper(),
+                req.url,
+                sorted(req.querystring.items()),
+                values,
+            )
+        )
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            key = self.get_key(req, client_name)
+            if key is None:
+                return next(req, client_name, path, timeout)
+
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+
+            if not leader:
+                flight.done.wait()
+                if flight.exc is not None:
+                    raise flight.exc
+                assert flight.resp is not None
+                return self.copy(flight.resp)
+
+            try:
+                flight.resp = self.fly(key, next, req, client_name, path, timeout)
+                return flight.resp
+            except Exception as exc:
+                flight.exc = exc
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        return handle
+
+    def fly(
+        self,
+        key: str,
+        next: SyncMiddleware,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        if self.redis is None:
+            return next(req, client_name, path, timeout)
+
+        rkey = f"blacksmith:single_flight:{hashlib.sha1(key.encode()).hexdigest()}"
+        lock = self.redis.lock(
+            f"{rkey}:lock",
+            timeout=self.lock_timeout,
+            blocking_timeout=self.lock_timeout,
+        )
+        acquired = lock.acquire()
+        try:
+            result = self.redis.get(f"{rkey}:result")
+            if result:
+                return HTTPResponse(**json.loads(result))
+            resp = next(req, client_name, path, timeout)
+            self.redis.set(
+                f"{rkey}:result",
+                json.dumps(asdict(resp)),
+                px=int(self.result_ttl * 1000),
+            )
+            return resp
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except Exception:
+                    log.exception("Failed to release the lock %s", rkey)
+
+    @staticmethod
+    def copy(resp: HTTPResponse) -> HTTPResponse:
+        return HTTPResponse(resp.status_code, dict(resp.headers), resp.json)
+
+
+class SingleFlightBuilder(AbstractMiddlewareBuilder):
+    def get_kwargs(self) -> dict[str, Any]:
         settings = list_to_dict(self.settings, self.prefix)
-        headers = {key.rstrip(":"): val for key, val in settings.items()}
-        return SyncHTTPAddHeadersMiddleware(headers)
+        kwargs: dict[str, Any] = {}
+        for key in ("methods", "headers"):
+            if key in settings:
+                kwargs[key] = settings[key].split()
+        if "redis" in settings:
+            kwargs["redis"] = get_redis_client(settings["redis"])
+        for key in ("lock_timeout", "result_ttl"):
+            if key in settings:
+                kwargs[key] = float(settings[key])
+        return kwargs
+
+    def build(self) -> SyncSingleFlightMiddleware:
+        return SyncSingleFlightMiddleware(**self.get_kwargs())
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when the concurrency limit of a service has been reached."""
+
+    def __init__(self, service: ServiceName, version: Version, limit: int):
+        super().__init__(
+            f"Concurrency limit of {limit} requests reached for {service}/{version}"
+        )
+        self.service = service
+        self.version = version
+        self.limit = limit
+
+
+class ConcurrencyLimiter:
+    """
+    Limit the number of requests in flight.
+
+    In ``fixed`` mode, the limit never change. In ``aimd`` mode,
+    Additive Increase, Multiplicative Decrease, the limit grows by one after
+    ``limit`` successful requests, and is multiplied by ``backoff`` after a
+    failed request, or a request slower than ``latency_target`` seconds.
+
+    :param limit: the initial maximum number of requests in flight.
+    :param mode: ``fixed`` or ``aimd``.
+    :param min_limit: the minimum limit in ``aimd`` mode.
+    :param max_limit: the maximum limit in ``aimd`` mode.
+    :param latency_target: the latency, in seconds, considered as congestion.
+    :param backoff: the ratio of the limit kept on congestion.
+    """
+
+    modes = ("fixed", "aimd")
+
+    def __init__(
+        self,
+        limit: int = 20,
+        mode: str = "fixed",
+        min_limit: int = 1,
+        max_limit: int = 200,
+        latency_target: float | None = None,
+        backoff: float = 0.9,
+    ):
+        if mode not in self.modes:
+            raise ValueError(f"Unknown concurrency limit mode {mode}")
+        self.limit = float(limit)
+        self.mode = mode
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        # the requests in flight are the ones of the parent process
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if self.mode == "fixed":
+                return
+            if failed or (
+                self.latency_target is not None and latency > self.latency_target
+            ):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def cancel(self) -> None:
+        """Release a request that has not been sent, the limit is unchanged."""
+        with self._lock:
+            self.in_flight -= 1
+
+
+class SyncConcurrencyLimitMiddleware(SyncHTTPMiddleware):
+    """
+    Limit the number of requests in flight per service and version.
+
+    When the limit is reached, the request is not sent and a
+    :class:`ConcurrencyLimitError` is raised.
+
+    Server errors, timeouts and other exceptions are failures for
+    the ``aimd`` mode, client errors are not. A
+    :class:`pyramid_blacksmith.middleware_factory.DeadlineExceededError`
+    is ignored, the request has not been sent.
+
+    :param limiter_kwargs: the parameters of the :class:`ConcurrencyLimiter`
+        of every service.
+    :param metrics: the metrics, collected with
+        :class:`pyramid_blacksmith.metrics.BlacksmithMetrics`.
+    :param registry: the registry of the clients.
+    """
+
+    def __init__(
+        self,
+        limiter_kwargs: dict[str, Any] | None = None,
+        metrics: PrometheusMetrics | None = None,
+        registry: Registry | None = None,
+    ):
+        self.limiter_kwargs = limiter_kwargs or {}
+        self.metrics = metrics
+        self.registry = registry or default_registry
+        self.limiters: dict[tuple[ServiceName, Version], ConcurrencyLimiter] = {}
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def get_limiter(self, service: ServiceName, version: Version) -> ConcurrencyLimiter:
+        key = (service, version)
+        with self._lock:
+            if key not in self.limiters:
+                self.limiters[key] = ConcurrencyLimiter(**self.limiter_kwargs)
+            return self.limiters[key]
+
+    def observe(
+        self, service: ServiceName, version: Version, limiter: ConcurrencyLimiter
+    ) -> None:
+        metrics: Any = self.metrics
+        if hasattr(metrics, "blacksmith_concurrency_limit"):
+            labels = {"service": service, "version": version or ""}
+            metrics.blacksmith_concurrency_limit.labels(**labels).set(
+                int(limiter.limit)
+            )
+            metrics.blacksmith_concurrency_in_flight.labels(**labels).set(
+                limiter.in_flight
+            )
+
+    def reject(self, service: ServiceName, version: Version) -> None:
+        metrics: Any = self.metrics
+        if hasattr(metrics, "blacksmith_concurrency_rejected"):
+            metrics.blacksmith_concurrency_rejected.labels(
+                service=service, version=version or ""
+            ).inc()
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            service, version = self.registry.client_service[client_name]
+            limiter = self.get_limiter(service, version)
+            if not limiter.acquire():
+                self.reject(service, version)
+                raise ConcurrencyLimitError(service, version, int(limiter.limit))
+            self.observe(service, version, limiter)
+            failed: bool | None = True
+            start = time.perf_counter()
+            try:
+                resp = next(req, client_name, path, timeout)
+                failed = False
+                return resp
+            except DeadlineExceededError:
+                failed = None
+                raise
+            except HTTPError as exc:
+                failed = exc.is_server_error
+                raise
+            finally:
+                if failed is None:
+                    limiter.cancel()
+                else:
+                    limiter.release(time.perf_counter() - start, failed)
+                self.observe(service, version, limiter)
+
+        return handle
+
+
+class ConcurrencyLimitBuilder(AbstractMiddlewareBuilder):
+    def get_limiter_kwargs(self) -> dict[str, Any]:
+        settings = list_to_dict(self.settings, self.prefix)
+        kwargs: dict[str, Any] = {}
+        for key, cast_ in (
+            ("limit", int),
+            ("mode", str),
+            ("min_limit", int),
+            ("max_limit", int),
+            ("latency_target", float),
+            ("backoff", float),
+        ):
+            if key in settings:
+                kwargs[key] = cast_(settings[key])
+        if kwargs.get("mode", "fixed") not in ConcurrencyLimiter.modes:
+            raise ConfigurationError(
+                f"Invalid mode {kwargs['mode']} in setting {self.prefix}: "
+                f"not in {', '.join(ConcurrencyLimiter.modes)}"
+            )
+        return kwargs
+
+    def build(self) -> SyncConcurrencyLimitMiddleware:
+        return SyncConcurrencyLimitMiddleware(self.get_limiter_kwargs(), self.metrics)
+
+
+class RetryBudget:
+    """
+    Token bucket that caps the retries at a ratio of the requests.
+
+    Every request deposit ``ratio`` token, every retry withdraw one token,
+    up to ``capacity`` tokens. The bucket starts with ``min_tokens`` tokens,
+    to retry when the traffic is low.
+
+    :param ratio: the ratio of retries allowed, ``0.1`` is 10% of the requests.
+    :param min_tokens: the initial number of tokens.
+    :param capacity: the maximum number of tokens.
+    """
+
+    def __init__(
+        self, ratio: float = 0.1, min_tokens: float = 10, capacity: float = 100
+    ):
+        self.ratio = ratio
+        self.capacity = max(capacity, min_tokens)
+        self.tokens = float(min_tokens)
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class SyncRetryMiddleware(SyncHTTPMiddleware):
+    """
+    Send again the requests that failed with a transient error.
+
+    The retried errors are timeouts, connection errors, and responses
+    with a status code in ``statuses``. Only the requests with an idempotent
+    method, or with an ``Idempotency-Key`` header are retried.
+
+    The delay between attempts is choosen randomly between 0 and
+    ``backoff * 2 ** attempt`` seconds, up to ``max_backoff`` seconds,
+    the exponential backoff with full jitter.
+
+    :param max_attempts: maximum number of attempts, including the first one.
+    :param backoff: the base delay in seconds.
+    :param max_backoff: the maximum delay in seconds.
+    :param statuses: the status codes of the responses to retry.
+    :param methods: the idempotent http methods.
+    :param budget: the retry budget, shared by the requests of the client.
+    :param metrics: the metrics, collected with
+        :class:`pyramid_blacksmith.metrics.BlacksmithMetrics`.
+    :param sleep: the function used to wait between attempts.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 2,
+        statuses: list[int] | None = None,
+        methods: list[str] | None = None,
+        budget: RetryBudget | None = None,
+        metrics: PrometheusMetrics | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = set(statuses or [502, 503, 504])
+        self.methods = {
+            method.upper()
+            for method in methods or ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+        }
+        self.budget = budget or RetryBudget()
+        self.metrics = metrics
+        self.sleep = sleep
+
+    def is_idempotent(self, req: HTTPRequest) -> bool:
+        return req.method.upper() in self.methods or any(
+            key.lower() == "idempotency-key" for key in req.headers
+        )
+
+    def is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, DeadlineExceededError):
+            return False
+        if isinstance(exc, HTTPError):
+            return exc.status_code in self.statuses
+        return isinstance(exc, (HTTPTimeoutError, TransportError))
+
+    def get_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def inc(self, metric: str, client_name: ClientName) -> None:
+        metrics: Any = self.metrics
+        if hasattr(metrics, metric):
+            getattr(metrics, metric).labels(client_name=client_name).inc()
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            self.budget.deposit()
+            idempotent = self.is_idempotent(req)
+            attempt = 0
+            while True:
+                try:
+                    return next(req, client_name, path, timeout)
+                except Exception as exc:
+                    attempt += 1
+                    if (
+                        not idempotent
+                        or attempt >= self.max_attempts
+                        or not self.is_retryable(exc)
+                    ):
+                        raise
+                    if not self.budget.withdraw():
+                        self.inc("blacksmith_retry_budget_exhausted", client_name)
+                        raise
+                    log.info("Retry %s %s after %r", req.method, req.url, exc)
+                    self.inc("blacksmith_retry", client_name)
+                    self.sleep(self.get_delay(attempt - 1))
+
+        return handle
+
+
+class RetryBuilder(AbstractMiddlewareBuilder):
+    def get_kwargs(self) -> dict[str, Any]:
+        settings = list_to_dict(self.settings, self.prefix)
+        kwargs: dict[str, Any] = {}
+        for key, cast_ in (
+            ("max_attempts", int),
+            ("backoff", float),
+            ("max_backoff", float),
+        ):
+            if key in settings:
+                kwargs[key] = cast_(settings[key])
+        if "statuses" in settings:
+            kwargs["statuses"] = [int(code) for code in settings["statuses"].split()]
+        if "methods" in settings:
+            kwargs["methods"] = settings["methods"].split()
+
+        budget_settings = list_to_dict(self.settings, f"{self.prefix}.budget")
+        kwargs["budget"] = RetryBudget(
+            **{key: float(val) for key, val in budget_settings.items()}
+        )
+        kwargs["metrics"] = self.metrics
+        return kwargs
+
+    def build(self) -> SyncRetryMiddleware:
+        return SyncRetryMiddleware(**self.get_kwargs())
+
+
+class SyncHedgingMiddleware(SyncHTTPMiddleware):
+    """
+    Send a copy of a slow request, and use the first response.
+
+    If the request did not respond after a delay, the same request is sent
+    again, to another instance if the client use a load balancer. The first
+    successful response is returned. The slowest request can't be cancelled
+    once sent, its response is ignored.
+
+    The delay is fixed, or the ``percentile`` of the latencies observed,
+    once ``min_samples`` latencies have been observed.
+
+    The requests are sent by a pool of ``max_workers`` threads, they never
+    wait for a thread: while every thread is busy, the request is sent by
+    the calling thread, without hedging.
+
+    :param delay: the delay in seconds, or the delay while the percentile
+        is not known.
+    :param percentile: the percentile of the latencies used as delay,
+        such as ``95``.
+    :param min_delay: the minimum delay in seconds, when using a percentile.
+    :param methods: the http methods of the requests to hedge.
+    :param budget: the hedge budget, shared by the requests of the client.
+    :param max_workers: the number of threads sending the requests, and the
+        maximum number of hedged requests in flight.
+    :param window: the number of latencies kept to compute the percentile.
+    :param min_samples: the minimum number of latencies to use the percentile.
+    :param metrics: the metrics, collected with
+        :class:`pyramid_blacksmith.metrics.BlacksmithMetrics`.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0.1,
+        percentile: float | None = None,
+        min_delay: float = 0.01,
+        methods: list[str] | None = None,
+        budget: RetryBudget | None = None,
+        max_workers: int = 16,
+        window: int = 1000,
+        min_samples: int = 20,
+        metrics: PrometheusMetrics | None = None,
+    ):
+        self.delay = delay
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.methods = {method.upper() for method in methods or ["GET"]}
+        self.budget = budget or RetryBudget(ratio=0.05)
+        self.pool = ParallelExecutor(max_workers)
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.metrics = metrics
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        # the requests in flight are sent by threads of the parent process
+        self.slots = threading.BoundedSemaphore(self.pool.max_workers)
+
+    def get_delay(self) -> float:
+        if self.percentile is None or len(self.latencies) < self.min_samples:
+            return self.delay
+        latencies = sorted(self.latencies)
+        idx = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return max(self.min_delay, latencies[idx])
+
+    def inc(self, metric: str, client_name: ClientName) -> None:
+        metrics: Any = self.metrics
+        if hasattr(metrics, metric):
+            getattr(metrics, metric).labels(client_name=client_name).inc()
+
+    def submit(
+        self,
+        next: SyncMiddleware,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> "Future[HTTPResponse] | None":
+        """Send the request in the pool, None if every thread is busy."""
+        slots = self.slots
+        if not slots.acquire(blocking=False):
+            return None
+        context = contextvars.copy_context()
+        try:
+            future = self.pool.executor.submit(
+                context.run, next, req, client_name, path, timeout
+            )
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            if req.method.upper() not in self.methods:
+                return next(req, client_name, path, timeout)
+
+            self.budget.deposit()
+            hedged_req = replace(req, headers=dict(req.headers))
+            start = time.perf_counter()
+            primary = self.submit(next, req, client_name, path, timeout)
+            if primary is None:
+                resp = next(req, client_name, path, timeout)
+                self.latencies.append(time.perf_counter() - start)
+                return resp
+            try:
+                resp = primary.result(timeout=self.get_delay())
+                self.latencies.append(time.perf_counter() - start)
+                return resp
+            except FutureTimeoutError:
+                pass
+
+            hedge = None
+            if self.budget.withdraw():
+                hedge = self.submit(next, hedged_req, client_name, path, timeout)
+            if hedge is None:
+                resp = primary.result()
+                self.latencies.append(time.perf_counter() - start)
+                return resp
+
+            self.inc("blacksmith_hedge", client_name)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        self.latencies.append(time.perf_counter() - start)
+                        if future is hedge:
+                            self.inc("blacksmith_hedge_won", client_name)
+                        return future.result()
+            return primary.result()
+
+        return handle
+
+
+class HedgingBuilder(AbstractMiddlewareBuilder):
+    def get_kwargs(self) -> dict[str, Any]:
+        settings = list_to_dict(self.settings, self.prefix)
+        kwargs: dict[str, Any] = {}
+        delay = settings.get("delay", "")
+        if delay.startswith("p"):
+            kwargs["percentile"] = float(delay[1:])
+        elif delay:
+            kwargs["delay"] = float(delay)
+        for key, cast_ in (
+            ("min_delay", float),
+            ("max_workers", int),
+            ("window", int),
+            ("min_samples", int),
+        ):
+            if key in settings:
+                kwargs[key] = cast_(settings[key])
+        if "methods" in settings:
+            kwargs["methods"] = settings["methods"].split()
+
+        budget_settings = list_to_dict(self.settings, f"{self.prefix}.budget")
+        kwargs["budget"] = RetryBudget(
+            **{"ratio": 0.05, **{k: float(v) for k, v in budget_settings.items()}}
+        )
+        kwargs["metrics"] = self.metrics
+        return kwargs
+
+    def build(self) -> SyncHedgingMiddleware:
+        return SyncHedgingMiddleware(**self.get_kwargs())
+
+
+class PrecompiledMiddleware(SyncHTTPMiddleware):
+    """
+    Chain of middlewares composed once per client key.
+
+    Blacksmith wraps the middlewares of a client on every request, this
+    middleware composes the configured middlewares at configuration time.
+    The middlewares added on the client, such as the middleware factories,
+    are wrapped on every request inside that chain, in the same order as
+    without precompilation, they are passed to the chain in a context
+    variable.
+
+    :param middlewares: the middlewares, from the outermost to the innermost.
+    """
+
+    def __init__(self, middlewares: Iterable[SyncHTTPMiddleware]):
+        self.middlewares = list(middlewares)
+        self._next: contextvars.ContextVar[SyncMiddleware] = contextvars.ContextVar(
+            "blacksmith_precompiled_next"
+        )
+        handler: SyncMiddleware = self.call_next
+        for middleware in reversed(self.middlewares):
+            handler = middleware(handler)
+        self.handler = handler
+
+    def initialize(self) -> None:
+        for middleware in self.middlewares:
+            middleware.initialize()
+
+    def call_next(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        return self._next.get()(req, client_name, path, timeout)
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            token = self._next.set(next)
+            try:
+                return self.handler(req, client_name, path, timeout)
+            finally:
+                self._next.reset(token)
+
+        return handle
+
+
+class AsyncPrometheusMetricsBuilder(AbstractAsyncMiddlewareBuilder):
+    def build(self) -> AsyncPrometheusMiddleware:  # type: ignore[override]
+        return AsyncPrometheusMiddleware(metrics=self.metrics)
+
+
+class AsyncCircuitBreakerBuilder(CircuitBreakerBuilder, AbstractAsyncMiddlewareBuilder):
+    default_uow = "purgatory:AsyncInMemoryUnitOfWork"
+
+    def build(self) -> AsyncCircuitBreakerMiddleware:  # type: ignore[override]
+        middleware = AsyncCircuitBreakerMiddleware(**self.get_kwargs())
+        middleware.circuit_breaker.global_exclude.append(DeadlineExceededError)
+        return middleware
+
+
+class AsyncHTTPCacheBuilder(HTTPCacheBuilder, AbstractAsyncMiddlewareBuilder):
+    two_tier_cache_class = AsyncTwoTierCache
+
+    def build_cache(self, redis_url: str) -> Any:
+        return get_redis_client(redis_url, asyncio=True, **self.get_redis_pool_kwargs())
+
+    def build(self) -> AsyncHTTPCacheMiddleware:  # type: ignore[override]
+        return AsyncHTTPCacheMiddleware(**self.get_kwargs())
+
+
+class AsyncHTTPStaticHeadersBuilder(
+    HTTPStaticHeadersBuilder, AbstractAsyncMiddlewareBuilder
+):
+    def build(self) -> AsyncHTTPAddHeadersMiddleware:  # type: ignore[override]
+        return AsyncHTTPAddHeadersMiddleware(self.get_headers())
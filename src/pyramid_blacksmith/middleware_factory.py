@@ -8,10 +8,27 @@ This is usefull to proxify some data from parent request to sub request.
 """
 
 import abc
+import time
+from weakref import WeakKeyDictionary
 
-from blacksmith import SyncHTTPAddHeadersMiddleware, SyncHTTPMiddleware
+from blacksmith import (
+    AsyncHTTPAddHeadersMiddleware,
+    AsyncHTTPMiddleware,
+    AsyncMiddleware,
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
+    SyncHTTPAddHeadersMiddleware,
+    SyncHTTPMiddleware,
+    SyncMiddleware,
+)
+from blacksmith.domain.exceptions import HTTPTimeoutError
+from blacksmith.typing import ClientName, Path
+from pyramid.events import NewRequest
 from pyramid.request import Request
 
+START_TIME_KEY = "pyramid_blacksmith.start_time"
+
 
 class AbstractMiddlewareFactoryBuilder(abc.ABC):
     """Build the factory"""
@@ -20,8 +37,26 @@ class AbstractMiddlewareFactoryBuilder(abc.ABC):
     def __init__(self, **kwargs: dict[str, bool]): ...
 
     @abc.abstractmethod
-    def __call__(self, request: Request) -> SyncHTTPMiddleware:
-        """Called on demand per request to build a client with this middleware"""
+    def __call__(self, request: Request) -> SyncHTTPMiddleware | None:
+        """
+        Called on demand per request to build a client with this middleware.
+
+        Return None to build the client without this middleware.
+        """
+
+
+class AbstractAsyncMiddlewareFactoryBuilder(AbstractMiddlewareFactoryBuilder):
+    """Build the factory for the clients of ``request.blacksmith_async``"""
+
+    @abc.abstractmethod
+    def __call__(  # type: ignore[override]
+        self, request: Request
+    ) -> AsyncHTTPMiddleware | None:
+        """
+        Called on demand per request to build a client with this middleware.
+
+        Return None to build the client without this middleware.
+        """
 
 
 class ForwardHeaderFactoryBuilder(AbstractMiddlewareFactoryBuilder):
@@ -34,13 +69,81 @@ class ForwardHeaderFactoryBuilder(AbstractMiddlewareFactoryBuilder):
     def __init__(self, **kwargs: dict[str, bool]):
         self.headers = list(kwargs.keys())
 
-    def __call__(self, request: Request) -> SyncHTTPAddHeadersMiddleware:
+    def get_headers(self, request: Request) -> dict[str, str]:
         headers: dict[str, str] = {}
         for hdr in self.headers:
             val = request.headers.get(hdr)
             if val:
                 headers[hdr] = val
-        return SyncHTTPAddHeadersMiddleware(headers)
+        return headers
+
+    def __call__(self, request: Request) -> SyncHTTPAddHeadersMiddleware:
+        return SyncHTTPAddHeadersMiddleware(self.get_headers(request))
+
+
+class LazyHTTPAddHeadersMiddleware(SyncHTTPMiddleware):
+    """
+    Inject headers read from the pyramid request when a request is sent.
+
+    :param request: the pyramid request to read.
+    :param headers: name of the headers to forward.
+    """
+
+    def __init__(self, request: Request, headers: list[str]):
+        self.request = request
+        self.header_names = headers
+        self._headers: dict[str, str] | None = None
+
+    @property
+    def headers(self) -> dict[str, str]:
+        if self._headers is None:
+            headers: dict[str, str] = {}
+            for hdr in self.header_names:
+                val = self.request.headers.get(hdr)
+                if val:
+                    headers[hdr] = val
+            self._headers = headers
+        return self._headers
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            req.headers.update(self.headers)
+            return next(req, client_name, path, timeout)
+
+        return handle
+
+
+class LazyForwardHeaderFactoryBuilder(AbstractMiddlewareFactoryBuilder):
+    """
+    Forward headers (every keys in kwargs), read when a request is sent.
+
+    A single middleware is shared by every clients of a pyramid request,
+    and no middleware is added if the pyramid request has none of the headers.
+
+    :param kwargs: headers
+    """
+
+    def __init__(self, **kwargs: dict[str, bool]):
+        self.headers = list(kwargs.keys())
+        self._middlewares: WeakKeyDictionary[
+            Request, LazyHTTPAddHeadersMiddleware | None
+        ] = WeakKeyDictionary()
+
+    def __call__(self, request: Request) -> LazyHTTPAddHeadersMiddleware | None:
+        try:
+            return self._middlewares[request]
+        except KeyError:
+            pass
+        middleware = None
+        if any(hdr in request.headers for hdr in self.headers):
+            middleware = LazyHTTPAddHeadersMiddleware(request, self.headers)
+        self._middlewares[request] = middleware
+        return middleware
 
 
 class AcceptLanguageFactoryBuilder(AbstractMiddlewareFactoryBuilder):
@@ -52,3 +155,182 @@ class AcceptLanguageFactoryBuilder(AbstractMiddlewareFactoryBuilder):
 
     def __call__(self, request: Request) -> SyncHTTPAddHeadersMiddleware:
         return SyncHTTPAddHeadersMiddleware({"Accept-Language": request.locale_name})
+
+
+def set_start_time(event: NewRequest) -> None:
+    """Subscriber that store the time the pyramid request has been received."""
+    event.request.environ.setdefault(START_TIME_KEY, time.monotonic())
+
+
+class DeadlineExceededError(HTTPTimeoutError):
+    """Raised instead of sending a request once the deadline is exceeded."""
+
+
+class SyncDeadlineMiddleware(SyncHTTPMiddleware):
+    """
+    Fit the timeout of the requests in the time left before a deadline.
+
+    :param deadline: the deadline, in seconds of ``time.monotonic()``.
+    :param header: the header that forward the time left, in milliseconds.
+    :param min_timeout: the minimum time left, in seconds, to send a request.
+    """
+
+    def __init__(self, deadline: float, header: str, min_timeout: float = 0):
+        self.deadline = deadline
+        self.header = header
+        self.min_timeout = min_timeout
+
+    def prepare(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPTimeout:
+        remaining = self.deadline - time.monotonic()
+        if remaining <= self.min_timeout:
+            raise DeadlineExceededError(
+                f"{client_name} - {req.method} {path} - "
+                f"Deadline exceeded before calling {req.method} {req.url}"
+            )
+        req.headers[self.header] = str(int(remaining * 1000))
+        return HTTPTimeout(
+            read=min(timeout.read, remaining),
+            connect=min(timeout.connect, remaining),
+        )
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            timeout = self.prepare(req, client_name, path, timeout)
+            return next(req, client_name, path, timeout)
+
+        return handle
+
+
+class AsyncDeadlineMiddleware(AsyncHTTPMiddleware):
+    """The :class:`SyncDeadlineMiddleware` for the async clients."""
+
+    def __init__(self, deadline: float, header: str, min_timeout: float = 0):
+        self.deadline = deadline
+        self.header = header
+        self.min_timeout = min_timeout
+
+    prepare = SyncDeadlineMiddleware.prepare
+
+    def __call__(self, next: AsyncMiddleware) -> AsyncMiddleware:
+        async def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            timeout = self.prepare(req, client_name, path, timeout)  # type: ignore
+            return await next(req, client_name, path, timeout)
+
+        return handle
+
+
+class DeadlineFactoryBuilder(AbstractMiddlewareFactoryBuilder):
+    """
+    Propagate the deadline of the pyramid request to the sub requests.
+
+    The time budget of the pyramid request is read from the ``header``,
+    in milliseconds, or is ``timeout`` seconds if the header is missing.
+    It starts when the pyramid request has been received.
+
+    The sub requests fail with a :class:`DeadlineExceededError` once the
+    budget is exhausted, their timeout is reduced to the time left, and the
+    time left is forwarded in the ``header``.
+
+    :param header: the header of the time budget, in milliseconds.
+    :param timeout: the time budget, in seconds, if the header is missing.
+    :param min_timeout: the minimum time left, in seconds, to send a request.
+    """
+
+    middleware_class: type[SyncDeadlineMiddleware] | type[AsyncDeadlineMiddleware]
+    middleware_class = SyncDeadlineMiddleware
+
+    def __init__(
+        self,
+        header: str = "X-Request-Timeout-Ms",
+        timeout: float | str | None = None,
+        min_timeout: float | str = 0,
+        **kwargs: bool,
+    ):
+        self.header = header
+        self.timeout = None if timeout is None else float(timeout)
+        self.min_timeout = float(min_timeout)
+        self._deadlines: WeakKeyDictionary[Request, float | None] = WeakKeyDictionary()
+
+    def get_deadline(self, request: Request) -> float | None:
+        try:
+            return self._deadlines[request]
+        except KeyError:
+            pass
+        budget = self.timeout
+        value = request.headers.get(self.header)
+        if value:
+            try:
+                budget = int(value) / 1000
+            except ValueError:
+                pass
+        deadline = None
+        if budget is not None:
+            start = request.environ.get(START_TIME_KEY, time.monotonic())
+            deadline = start + budget
+        self._deadlines[request] = deadline
+        return deadline
+
+    def __call__(self, request: Request) -> SyncDeadlineMiddleware | None:
+        deadline = self.get_deadline(request)
+        if deadline is None:
+            return None
+        return self.middleware_class(  # type: ignore[return-value]
+            deadline, self.header, self.min_timeout
+        )
+
+
+class AsyncDeadlineFactoryBuilder(
+    DeadlineFactoryBuilder, AbstractAsyncMiddlewareFactoryBuilder
+):
+    """The :class:`DeadlineFactoryBuilder` for the async clients."""
+
+    middleware_class = AsyncDeadlineMiddleware
+
+    def __call__(  # type: ignore[override]
+        self, request: Request
+    ) -> AsyncDeadlineMiddleware | None:
+        return super().__call__(request)  # type: ignore[return-value]
+
+
+class AsyncForwardHeaderFactoryBuilder(
+    ForwardHeaderFactoryBuilder, AbstractAsyncMiddlewareFactoryBuilder
+):
+    """
+    Forward headers (every keys in kwargs) for the async clients.
+
+    :param kwargs: headers
+    """
+
+    def __call__(  # type: ignore[override]
+        self, request: Request
+    ) -> AsyncHTTPAddHeadersMiddleware:
+        return AsyncHTTPAddHeadersMiddleware(self.get_headers(request))
+
+
+class AsyncAcceptLanguageFactoryBuilder(
+    AcceptLanguageFactoryBuilder, AbstractAsyncMiddlewareFactoryBuilder
+):
+    """
+    Forward the pyramid request locale_name to the async clients.
+    """
+
+    def __call__(  # type: ignore[override]
+        self, request: Request
+    ) -> AsyncHTTPAddHeadersMiddleware:
+        return AsyncHTTPAddHeadersMiddleware({"Accept-Language": request.locale_name})
@@ -0,0 +1,180 @@
+"""
+Run a batch of blacksmith calls concurrently from a synchronous view.
+"""
+
+import asyncio
+import contextvars
+import threading
+from collections.abc import Callable, Coroutine, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, TypeVar
+
+from pyramid.request import Request
+from pyramid.threadlocal import manager
+
+from . import fork
+
+T = TypeVar("T")
+
+_worker = threading.local()
+
+
+def in_worker_thread() -> bool:
+    """Return True while a call of a :class:`ParallelExecutor` is running."""
+    return getattr(_worker, "running", False)
+
+
+def run_in_request(
+    request: Request, context: contextvars.Context, call: Callable[[], T]
+) -> T:
+    """Run the call in a worker thread, as if it was running in the view."""
+    manager.push({"request": request, "registry": request.registry})
+    running, _worker.running = in_worker_thread(), True
+    try:
+        return context.run(call)
+    finally:
+        _worker.running = running
+        manager.pop()
+
+
+class ParallelExecutor:
+    """
+    Process-wide thread pool that run the calls of ``request.blacksmith.parallel``.
+
+    The threads are started on demand.
+
+    :param max_workers: size of the thread pool.
+    :param timeout: maximum time, in seconds, to wait for a batch of calls.
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: float | None = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix="blacksmith"
+                    )
+        return self._executor
+
+    def after_fork(self) -> None:
+        """Forget the threads of the parent process, they do not exist anymore."""
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def shutdown(self) -> None:
+        """Stop the threads, a new pool is started on the next call."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def submit(self, request: Request, call: Callable[[], T]) -> "Future[T]":
+        """
+        Run a call in the thread pool, as if it was running in the view.
+
+        A call submitted by a call of the thread pool runs inline, waiting for a
+        worker while holding one would deadlock once every worker is waiting.
+        """
+        if not in_worker_thread():
+            return self.executor.submit(
+                run_in_request, request, contextvars.copy_context(), call
+            )
+        future: Future[T] = Future()
+        try:
+            future.set_result(call())
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+    def map(
+        self,
+        request: Request,
+        calls: Sequence[Callable[[], T]],
+        timeout: float | None = None,
+    ) -> list[T]:
+        """
+        Run the calls in the thread pool and return their results in order.
+
+        The first exception raised by a call is raised, a ``TimeoutError``
+        is raised if the batch does not complete in time.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        futures = [self.submit(request, call) for call in calls]
+        _, not_done = wait(futures, timeout)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            raise TimeoutError(
+                f"{len(not_done)} of {len(futures)} calls did not complete "
+                f"in {timeout} seconds"
+            )
+        return [future.result() for future in futures]
+
+
+class EventLoopThread:
+    """
+    Process-wide event loop that run the coroutines of ``request.blacksmith_async``.
+
+    The async clients, their middlewares and the connections of the
+    ``http_cache`` middleware are bound to the event loop that initialized
+    them. Synchronous views run their coroutines in this event loop, started
+    in a thread on demand, instead of a new event loop per request.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(
+                        target=loop.run_forever, name="blacksmith-async", daemon=True
+                    )
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def after_fork(self) -> None:
+        """Forget the event loop of the parent process, its thread does not exist."""
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def shutdown(self) -> None:
+        """Stop the event loop, a new one is started on the next call."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None and thread is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """
+        Run a coroutine in the event loop and return its result.
+
+        A ``TimeoutError`` is raised if it does not complete in time.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
@@ -0,0 +1,304 @@
+"""
+Service discovery strategies that wrap the blacksmith service discoveries.
+"""
+
+import abc
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from blacksmith import (
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
+    SyncAbstractServiceDiscovery,
+    SyncConsulDiscovery,
+    SyncHTTPMiddleware,
+    SyncMiddleware,
+    SyncNomadDiscovery,
+)
+from blacksmith.domain.exceptions import UnregisteredServiceException
+from blacksmith.domain.registry import Registry
+from blacksmith.domain.registry import registry as default_registry
+from blacksmith.sd._sync.adapters.consul import ConsulApiError, ServiceRequest
+from blacksmith.typing import ClientName, Path, ServiceName, Url, Version
+
+from . import fork
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SyncAbstractInstancesDiscovery(SyncAbstractServiceDiscovery):
+    """Service discovery that knows every instances of a service."""
+
+    @abc.abstractmethod
+    def get_endpoints(self, service: ServiceName, version: Version) -> list[Url]:
+        """Get the endpoints of every instances of a service."""
+
+
+class SyncConsulInstancesDiscovery(SyncConsulDiscovery, SyncAbstractInstancesDiscovery):
+    """Consul discovery that also return every instances of a service."""
+
+    def get_endpoints(self, service: ServiceName, version: Version) -> list[Url]:
+        name = self.format_service_name(service, version)
+        consul = self.blacksmith_cli("consul")
+        rresp = consul.services.collection_get(ServiceRequest(name=name))
+        if rresp.is_err():
+            raise ConsulApiError(rresp.unwrap_err())
+        services = list(rresp.unwrap())
+        if not services:
+            raise UnregisteredServiceException(service, version)
+        return [self.format_endoint(version, srv.address, srv.port) for srv in services]
+
+
+class SyncNomadInstancesDiscovery(SyncNomadDiscovery, SyncAbstractInstancesDiscovery):
+    """
+    Nomad discovery that also return every instances of a service.
+
+    The environment variable may contain many addresses, separated by a comma.
+    """
+
+    def get_endpoints(self, service: ServiceName, version: Version) -> list[Url]:
+        env_fmt = self.service_env_fmt if version else self.unversioned_service_env_fmt
+        addrs = os.getenv(env_fmt.format(service=service, version=version), "")
+        url_fmt = self.service_url_fmt if version else self.unversioned_service_url_fmt
+        endpoints = [
+            url_fmt.format(nomad_upstream_addr=addr.strip(), version=version)
+            for addr in addrs.split(",")
+            if addr.strip()
+        ]
+        if not endpoints:
+            raise UnregisteredServiceException(service, version)
+        return endpoints
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+
+
+class SyncCachedServiceDiscovery(SyncAbstractInstancesDiscovery):
+    """
+    Cache the endpoints resolved by a service discovery.
+
+    A fresh endpoint is served from the cache. An expired endpoint is still
+    served while it is refreshed in a background thread, until it is older
+    than the ``stale_ttl``. If the service discovery fails, the last known
+    endpoint is served.
+
+    :param sd: the service discovery to cache.
+    :param ttl: number of seconds an endpoint is fresh.
+    :param max_entries: maximum number of endpoints in the cache,
+        the least recently used is evicted.
+    :param stale_ttl: number of seconds an expired endpoint can be served,
+        while it is refreshed. If None, it is served until it is refreshed.
+    """
+
+    def __init__(
+        self,
+        sd: SyncAbstractServiceDiscovery,
+        ttl: float = 30,
+        max_entries: int = 256,
+        stale_ttl: float | None = None,
+    ):
+        self.sd = sd
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        # the refresh threads of the parent process do not exist anymore
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = CacheEntry(value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key: Hashable, load: Callable[[], Any]) -> None:
+        try:
+            self._store(key, load())
+        except Exception:
+            log.exception("Failed to refresh the endpoint of %r", key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_in_background(self, key: Hashable, load: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(
+            target=self._refresh,
+            args=(key, load),
+            name="blacksmith-sd-refresh",
+            daemon=True,
+        ).start()
+
+    def _get(self, key: Hashable, load: Callable[[], T]) -> T:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            value = load()
+            self._store(key, value)
+            return value
+
+        now = time.monotonic()
+        if now < entry.expires_at:
+            return entry.value
+        if self.stale_ttl is None or now < entry.expires_at + self.stale_ttl:
+            self._refresh_in_background(key, load)
+            return entry.value
+        try:
+            value = load()
+        except Exception:
+            log.exception("Serving the last known endpoint of %r", key)
+            return entry.value
+        self._store(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Remove every endpoints from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_endpoint(self, service: ServiceName, version: Version) -> Url:
+        return self._get(
+            ("endpoint", service, version),
+            lambda: self.sd.get_endpoint(service, version),
+        )
+
+    def get_endpoints(self, service: ServiceName, version: Version) -> list[Url]:
+        if not isinstance(self.sd, SyncAbstractInstancesDiscovery):
+            raise TypeError(f"{self.sd!r} does not support many instances")
+        sd = self.sd
+        return self._get(
+            ("endpoints", service, version),
+            lambda: sd.get_endpoints(service, version),
+        )
+
+
+class SyncLoadBalancedDiscovery(SyncAbstractInstancesDiscovery):
+    """
+    Spread the requests over every instances of a service.
+
+    The instance is choosen per request by the
+    :class:`SyncLoadBalancerMiddleware`, using one of the strategies:
+
+    * ``round_robin``: every instances in turn.
+    * ``least_outstanding``: the instance with the fewest requests in flight.
+    * ``p2c``: the instance with the fewest requests in flight,
+      of two randomly choosen ones, the power of two choices.
+
+    :param sd: the service discovery that knows every instances.
+    :param strategy: the strategy used to choose an instance.
+    """
+
+    strategies = ("round_robin", "least_outstanding", "p2c")
+
+    def __init__(
+        self, sd: SyncAbstractInstancesDiscovery, strategy: str = "round_robin"
+    ):
+        if strategy not in self.strategies:
+            raise ValueError(f"Unknown load balancing strategy {strategy}")
+        self.sd = sd
+        self.strategy = strategy
+        self.outstanding: Counter[Url] = Counter()
+        self._turns: dict[tuple[ServiceName, Version], Iterator[int]] = {}
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        # the requests in flight are the ones of the parent process
+        self.outstanding = Counter()
+        self._lock = threading.Lock()
+
+    def get_endpoints(self, service: ServiceName, version: Version) -> list[Url]:
+        return self.sd.get_endpoints(service, version)
+
+    def choose(self, service: ServiceName, version: Version) -> Url:
+        """Choose the endpoint of the instance to use for a request."""
+        endpoints = self.get_endpoints(service, version)
+        if len(endpoints) == 1:
+            return endpoints[0]
+        if self.strategy == "p2c":
+            endpoints = random.sample(endpoints, 2)
+        elif self.strategy == "round_robin":
+            with self._lock:
+                turn = self._turns.setdefault((service, version), itertools.count())
+                return endpoints[next(turn) % len(endpoints)]
+        least = min(self.outstanding[endpoint] for endpoint in endpoints)
+        return random.choice([ep for ep in endpoints if self.outstanding[ep] == least])
+
+    def get_endpoint(self, service: ServiceName, version: Version) -> Url:
+        """
+        Get the endpoint of the client, the first instance.
+
+        The client factory get it while building a client, the instance of a
+        request is choosen by the middleware, it does not take a turn.
+        """
+        return self.get_endpoints(service, version)[0]
+
+    def acquire(self, endpoint: Url) -> None:
+        with self._lock:
+            self.outstanding[endpoint] += 1
+
+    def release(self, endpoint: Url) -> None:
+        with self._lock:
+            self.outstanding[endpoint] -= 1
+            if self.outstanding[endpoint] <= 0:
+                del self.outstanding[endpoint]
+
+
+class SyncLoadBalancerMiddleware(SyncHTTPMiddleware):
+    """
+    Send every request to the instance choosen by the load balancer.
+
+    The middleware must be the innermost one, it replace the endpoint
+    of the client, and track the number of requests in flight per instance.
+
+    :param sd: the load balancer.
+    :param registry: the registry of the clients.
+    """
+
+    def __init__(self, sd: SyncLoadBalancedDiscovery, registry: Registry | None = None):
+        self.sd = sd
+        self.registry = registry or default_registry
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            service, version = self.registry.client_service[client_name]
+            endpoint = self.sd.choose(service, version)
+            req.url_pattern = endpoint + path
+            self.sd.acquire(endpoint)
+            try:
+                return next(req, client_name, path, timeout)
+            finally:
+                self.sd.release(endpoint)
+
+        return handle
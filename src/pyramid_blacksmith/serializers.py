@@ -0,0 +1,125 @@
+"""
+Serializers of the http cache middleware.
+
+The serializers can be choosen by a short name in the ``serializer`` sub-key
+of the ``http_cache`` middleware setting, optionally compressed by
+appending a codec, such as ``orjson+zlib``.
+"""
+
+import importlib
+import zlib
+from collections.abc import Callable
+from functools import cache
+from types import ModuleType
+from typing import Any
+
+from blacksmith.domain.model.middleware.http_cache import AbstractSerializer
+from pyramid.exceptions import ConfigurationError
+
+from .utils import resolve_entrypoint
+
+
+def optional_import(name: str) -> ModuleType | None:
+    """Import an optional library, None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:  # coverage: ignore
+        return None
+
+
+orjson = optional_import("orjson")
+msgpack = optional_import("msgpack")
+lz4 = optional_import("lz4.frame")
+
+
+class OrjsonSerializer(AbstractSerializer):
+    """Serialize using orjson, requires the orjson library."""
+
+    @staticmethod
+    def loads(s: str | bytes) -> Any:
+        return orjson.loads(s)  # type: ignore[union-attr]
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:  # type: ignore[override]
+        return orjson.dumps(obj)  # type: ignore[union-attr]
+
+
+class MsgpackSerializer(AbstractSerializer):
+    """Serialize using msgpack, requires the msgpack library."""
+
+    @staticmethod
+    def loads(s: str | bytes) -> Any:
+        return msgpack.unpackb(s, raw=False)  # type: ignore[union-attr]
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:  # type: ignore[override]
+        return msgpack.packb(obj, use_bin_type=True)  # type: ignore[union-attr]
+
+
+class CompressedSerializer(AbstractSerializer):
+    """Compress the payload of another serializer."""
+
+    serializer: type[AbstractSerializer]
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+    @classmethod
+    def loads(cls, s: bytes) -> Any:  # type: ignore[override]
+        return cls.serializer.loads(cls.decompress(s))  # type: ignore[arg-type]
+
+    @classmethod
+    def dumps(cls, obj: Any) -> bytes:  # type: ignore[override]
+        val: str | bytes = cls.serializer.dumps(obj)
+        if isinstance(val, str):
+            val = val.encode("utf-8")
+        return cls.compress(val)
+
+
+serializers = {
+    "json": "json",
+    "orjson": "pyramid_blacksmith.serializers:OrjsonSerializer",
+    "msgpack": "pyramid_blacksmith.serializers:MsgpackSerializer",
+}
+
+libraries = {"orjson": orjson, "msgpack": msgpack}
+
+codecs: dict[str, Any] = {"zlib": zlib, "lz4": lz4}
+
+
+@cache
+def compressed(
+    serializer: type[AbstractSerializer], codec: str
+) -> type[CompressedSerializer]:
+    """Get the serializer that compress the payload of a serializer."""
+    mod = codecs[codec]
+    return type(
+        f"{codec.capitalize()}{getattr(serializer, '__name__', 'Serializer')}",
+        (CompressedSerializer,),
+        {
+            "serializer": serializer,
+            "compress": staticmethod(mod.compress),
+            "decompress": staticmethod(mod.decompress),
+        },
+    )
+
+
+def resolve_serializer(value: str) -> type[AbstractSerializer]:
+    """
+    Resolve the serializer of the http cache middleware.
+
+    :param value: a short name, optionally followed by ``+`` and a codec,
+        or a path to an AbstractSerializer ``path.to.module:Serializer``.
+    """
+    name, _, codec = value.partition("+")
+    if name in libraries and libraries[name] is None:
+        raise ConfigurationError(f"Serializer {name} requires the {name} library")
+    serializer = resolve_entrypoint(serializers.get(name, name))
+    if not codec:
+        return serializer
+    if codec not in codecs:
+        raise ConfigurationError(
+            f"Invalid codec {codec} for serializer {value}: not in {', '.join(codecs)}"
+        )
+    if codecs[codec] is None:
+        raise ConfigurationError(f"Codec {codec} requires the {codec} library")
+    return compressed(serializer, codec)
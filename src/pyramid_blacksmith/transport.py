@@ -0,0 +1,156 @@
+"""
+Transports built by pyramid_blacksmith.
+
+A transport is the last middleware of the blacksmith chain, the one
+that send the HTTP request.
+"""
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, cast
+from urllib.parse import urlsplit
+
+import httpx
+from blacksmith import (
+    HTTPError,
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
+    HTTPTimeoutError,
+    SyncAbstractTransport,
+)
+from blacksmith.domain.model import HTTPRawResponse
+from blacksmith.service._sync.adapters.httpx import build_headers
+from blacksmith.service.http_body_serializer import serialize_response
+from blacksmith.typing import ClientName, Path, Proxies
+
+from . import fork
+
+
+class PooledHttpxTransport(SyncAbstractTransport):
+    """
+    Transport that keep a pool of connections, using `httpx`_.
+
+    The blacksmith httpx transport opens a new connection per request,
+    this one share a connection pool for all the requests of the process.
+
+    :param verify_certificate: Reject request if certificate are invalid for https.
+    :param proxies: configure proxies.
+    :param max_connections: maximum number of concurrent connections.
+    :param max_keepalive_connections: maximum number of idle connections kept.
+    :param keepalive_expiry: time limit on idle keep-alive connections, in seconds.
+    :param http2: enable HTTP/2, the package ``h2`` must be installed.
+    :param max_connections_per_host: maximum number of concurrent requests
+        per host, unlimited by default.
+
+    .. _`httpx`: https://www.python-httpx.org/
+    """
+
+    def __init__(
+        self,
+        verify_certificate: bool = True,
+        proxies: Proxies | None = None,
+        max_connections: int | None = 100,
+        max_keepalive_connections: int | None = 20,
+        keepalive_expiry: float | None = 5.0,
+        http2: bool = False,
+        max_connections_per_host: int | None = None,
+    ):
+        super().__init__(verify_certificate, proxies)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.max_connections_per_host = max_connections_per_host
+        self._hosts: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.client = self.build_client()
+        fork.register(self)
+
+    def build_client(self) -> httpx.Client:
+        return httpx.Client(
+            verify=self.verify_certificate,
+            mounts=self.proxies,  # type: ignore
+            limits=self.limits,
+            http2=self.http2,
+        )
+
+    def close(self) -> None:
+        """Close the connections of the pool."""
+        self.client.close()
+
+    def after_fork(self) -> None:
+        """
+        Open a new pool of connections, in the child process of a fork.
+
+        The pool of the parent process is not closed, its sockets are still
+        used by the parent process.
+        """
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.client = self.build_client()
+
+    @contextmanager
+    def acquire_host(
+        self, req: HTTPRequest, client_name: ClientName, path: Path, timeout: float
+    ) -> Iterator[None]:
+        if self.max_connections_per_host is None:
+            yield
+            return
+        host = urlsplit(req.url).netloc
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._hosts.setdefault(
+                    host, threading.BoundedSemaphore(self.max_connections_per_host)
+                )
+        if not semaphore.acquire(timeout=timeout):
+            raise HTTPTimeoutError(
+                f"{client_name} - {req.method} {path} - Too many connections to {host}"
+            )
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        headers = build_headers(req)
+        kwargs: dict[str, Any] = (
+            {"data": req.body, "files": req.attachments}
+            if req.attachments
+            else {"content": req.body}
+        )
+        with self.acquire_host(req, client_name, path, timeout.connect):
+            try:
+                r = self.client.request(
+                    req.method,
+                    req.url,
+                    params=req.querystring,  # type: ignore
+                    headers=headers,
+                    timeout=httpx.Timeout(timeout.read, connect=timeout.connect),
+                    **kwargs,
+                )
+            except httpx.TimeoutException as exc:
+                raise HTTPTimeoutError(
+                    f"{client_name} - {req.method} {path} - "
+                    f"{exc.__class__.__name__} while calling {req.method} {req.url}"
+                ) from exc
+
+        resp = serialize_response(cast(HTTPRawResponse, r))
+        if not r.is_success:
+            raise HTTPError(
+                f"{client_name} - {req.method} {path} - "
+                f"{r.status_code} {r.reason_phrase}",
+                req,
+                resp,
+            )
+        return resp
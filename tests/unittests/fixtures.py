@@ -10,6 +10,7 @@ from blacksmith.domain.model.middleware.http_cache import (
 from blacksmith.domain.model.params import CollectionParser
 from blacksmith.domain.typing import SyncMiddleware
 from blacksmith.middleware._sync.base import SyncHTTPMiddleware
+from blacksmith.service._async.base import AsyncAbstractTransport
 from blacksmith.service._sync.base import SyncAbstractTransport
 from blacksmith.typing import ClientName, Path
 from prometheus_client import CollectorRegistry
@@ -29,6 +30,17 @@ class DummyTransport(SyncAbstractTransport):
         return HTTPResponse(200, headers=req.headers, json=req.body)
 
 
+class DummyAsyncTransport(AsyncAbstractTransport):
+    async def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        return HTTPResponse(200, headers=req.headers, json={"headers": req.headers})
+
+
 class DummyCollectionParser(CollectionParser):
     pass
 
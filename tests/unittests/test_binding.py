@@ -1,35 +1,67 @@
+import asyncio
+import os
+import signal
+import threading
+import time
 from typing import Any
 
 import pytest
-from blacksmith import HTTPTimeout, PrometheusMetrics
+from blacksmith import HTTPRequest, HTTPResponse, HTTPTimeout, PrometheusMetrics
 from blacksmith.domain.error import default_error_parser
 from blacksmith.domain.model.params import CollectionParser
 from blacksmith.domain.registry import registry as blacksmith_registry
+from blacksmith.middleware._async.base import AsyncHTTPAddHeadersMiddleware
+from blacksmith.middleware._async.circuit_breaker import AsyncCircuitBreakerMiddleware
+from blacksmith.middleware._async.prometheus import AsyncPrometheusMiddleware
 from blacksmith.middleware._sync.auth import SyncHTTPBearerMiddleware
 from blacksmith.middleware._sync.base import SyncHTTPAddHeadersMiddleware
 from blacksmith.middleware._sync.circuit_breaker import SyncCircuitBreakerMiddleware
 from blacksmith.middleware._sync.prometheus import SyncPrometheusMiddleware
+from blacksmith.sd._async.adapters.consul import AsyncConsulDiscovery
+from blacksmith.sd._async.adapters.static import AsyncStaticDiscovery
 from blacksmith.sd._sync.adapters.consul import SyncConsulDiscovery
 from blacksmith.sd._sync.adapters.nomad import SyncNomadDiscovery
 from blacksmith.sd._sync.adapters.router import SyncRouterDiscovery
 from blacksmith.sd._sync.adapters.static import SyncStaticDiscovery
 from blacksmith.service._sync.adapters.httpx import SyncHttpxTransport
-from blacksmith.service._sync.client import SyncClientFactory
-from httpx import HTTPTransport
+from blacksmith.service._sync.client import SyncClient, SyncClientFactory
+from blacksmith.typing import ClientName, Path
+from httpx import HTTPTransport, Limits
 from prometheus_client import CollectorRegistry
+from pyramid import testing
+from pyramid.config import Configurator
 from pyramid.exceptions import ConfigurationError
 from pyramid.interfaces import IRequestExtensions
+from pyramid.request import apply_request_extensions
 
+from pyramid_blacksmith import includeme
 from pyramid_blacksmith.binding import (
+    AsyncBlacksmithClientSettingsBuilder,
+    AsyncBlacksmithMiddlewareFactoryBuilder,
+    AsyncPyramidBlacksmith,
     BlacksmithClientSettingsBuilder,
     BlacksmithMiddlewareFactoryBuilder,
     BlacksmithPrometheusMetricsBuilder,
+    InitializedClients,
+    LazyBuilds,
     PyramidBlacksmith,
+    reload,
+    warmup,
 )
+from pyramid_blacksmith.metrics import BlacksmithMetrics
+from pyramid_blacksmith.middleware import PrecompiledMiddleware
 from pyramid_blacksmith.middleware_factory import (
     ForwardHeaderFactoryBuilder,
+    set_start_time,
 )
+from pyramid_blacksmith.sd import (
+    SyncCachedServiceDiscovery,
+    SyncLoadBalancedDiscovery,
+    SyncLoadBalancerMiddleware,
+)
+from pyramid_blacksmith.transport import PooledHttpxTransport
 from tests.unittests.fixtures import (
+    DummyAsyncTransport,
     DummyCollectionParser,
     DummyErrorParser,
     DummyMiddleware,
@@ -64,6 +96,57 @@ def test_includeme(config: dict[str, Any], registry: CollectorRegistry):
     )
 
 
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {"settings": {"blacksmith.lazy": "true"}},
+            id="no deadline",
+        ),
+        pytest.param(
+            {
+                "settings": {
+                    "blacksmith.lazy": "true",
+                    "blacksmith.client.middleware_factories": ["forward_header"],
+                },
+            },
+            id="other factory",
+        ),
+        pytest.param(
+            {
+                "settings": {
+                    "blacksmith.lazy": "true",
+                    "blacksmith.clients": ["client", "other"],
+                    "blacksmith.other.middleware_factories": ["deadline"],
+                },
+                "expected": True,
+            },
+            id="deadline",
+        ),
+        pytest.param(
+            {
+                "settings": {
+                    "blacksmith.lazy": "true",
+                    "blacksmith.async_clients": ["client"],
+                    "blacksmith.client.middleware_factories": [
+                        "deadline pyramid_blacksmith.middleware_factory:"
+                        "AsyncDeadlineFactoryBuilder"
+                    ],
+                },
+                "expected": True,
+            },
+            id="async deadline",
+        ),
+    ],
+)
+def test_includeme_deadline(config: Configurator, params: dict[str, Any]):
+    handlers = [
+        getattr(h.handler, "__wrapped__", h.handler)
+        for h in config.registry.registeredHandlers()
+    ]
+    assert (set_start_time in handlers) is params.get("expected", False)
+
+
 @pytest.mark.parametrize(
     "params",
     [  # type: ignore
@@ -537,6 +620,47 @@ def test_build_transport(params: dict[str, Any], metrics: PrometheusMetrics):
     assert isinstance(transport, params["expected"])
 
 
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {"blacksmith.client.transport_pool": ""},
+            "expected_limits": Limits(
+                max_connections=100, max_keepalive_connections=20, keepalive_expiry=5
+            ),
+            "expected_per_host": None,
+            "expected_verify": True,
+        },
+        {
+            "settings": {
+                "blacksmith.client.verify_certificate": "false",
+                "blacksmith.client.transport_pool": """
+                    max_connections             50
+                    max_keepalive_connections   10
+                    keepalive_expiry            30
+                    http2                       false
+                    max_connections_per_host    5
+                """,
+            },
+            "expected_limits": Limits(
+                max_connections=50, max_keepalive_connections=10, keepalive_expiry=30
+            ),
+            "expected_per_host": 5,
+            "expected_verify": False,
+        },
+    ],
+)
+def test_build_transport_pool(params: dict[str, Any], metrics: PrometheusMetrics):
+    builder = BlacksmithClientSettingsBuilder(params["settings"], metrics)
+
+    transport = builder.build_transport()
+    assert isinstance(transport, PooledHttpxTransport)
+    assert transport.limits == params["expected_limits"]
+    assert transport.max_connections_per_host == params["expected_per_host"]
+    assert transport.verify_certificate is params["expected_verify"]
+    assert transport.http2 is False
+
+
 @pytest.mark.parametrize(
     "params",
     [
@@ -654,6 +778,7 @@ def test_build_error_parser(params: dict[str, Any], metrics: PrometheusMetrics):
 def test_metrics_builder(params: dict[str, Any], registry: CollectorRegistry):
     builder = BlacksmithPrometheusMetricsBuilder(params["settings"])
     metric = builder.build()
+    assert isinstance(metric, BlacksmithMetrics)
     assert (
         metric.blacksmith_request_latency_seconds._kwargs["buckets"]
         == params["expected_request_latency_seconds"]
@@ -748,3 +873,829 @@ def test_build_middleware_factory_builder(
     builder = BlacksmithMiddlewareFactoryBuilder(params["settings"], metrics)
     factories = [type(f) for f in builder.build()]
     assert factories == params["expected"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+            "expected": False,
+        },
+        {
+            "settings": {
+                "blacksmith.reify": "true",
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+            "expected": True,
+        },
+    ],
+)
+def test_reified_binding(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    assert (dummy_request.blacksmith is dummy_request.blacksmith) is params["expected"]
+    assert (
+        dummy_request.blacksmith.client is dummy_request.blacksmith.client
+    ) is params["expected"]
+
+    blacksmith = dummy_request.blacksmith
+    assert blacksmith.client is blacksmith.client
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.clients": ["client", "nocache"],
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.client.middleware_factories": ["accept_language"],
+                "blacksmith.nocache.service_discovery": "router",
+                "blacksmith.nocache.client_cache": "false",
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_client_cache(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    cli = dummy_request.blacksmith.client("api")
+    assert dummy_request.blacksmith.client("api") is cli
+    assert len(cli.middlewares) == 1
+    assert dummy_request.blacksmith_client_cache.hits == 1
+    assert dummy_request.blacksmith_client_cache.misses == 1
+
+    assert dummy_request.blacksmith.client("api", cache=False) is not cli
+    assert dummy_request.blacksmith.client("api") is cli
+    assert dummy_request.blacksmith_client_cache.hits == 2
+
+    cli = dummy_request.blacksmith.nocache("api")
+    assert dummy_request.blacksmith.nocache("api") is not cli
+    assert dummy_request.blacksmith_client_cache.hits == 2
+    assert dummy_request.blacksmith_client_cache.misses == 1
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.client.precompile_middlewares": "true",
+                "blacksmith.client.middlewares": ["prometheus", "circuitbreaker"],
+                "blacksmith.client.middleware_factories": ["accept_language"],
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_precompile_middlewares(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    factory = dummy_request.blacksmith.clients["client"]
+    assert isinstance(factory.transport, SyncHttpxTransport)
+    assert [type(m) for m in factory.middlewares] == [PrecompiledMiddleware]
+    assert [type(m) for m in factory.middlewares[0].middlewares] == [
+        SyncPrometheusMiddleware,
+        SyncCircuitBreakerMiddleware,
+    ]
+    assert [type(m) for m in dummy_request.blacksmith.client("api").middlewares] == [
+        SyncHTTPAddHeadersMiddleware,
+        PrecompiledMiddleware,
+    ]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {
+                "settings": {
+                    "blacksmith.client.service_discovery": "static",
+                    "blacksmith.client.static_sd_config": ["srv http://srv.localhost"],
+                    "blacksmith.client.transport": DummyTransport(),
+                    "blacksmith.client.middlewares": ["static_headers"],
+                    "blacksmith.client.middleware.static_headers": [
+                        "X-Tenant: default"
+                    ],
+                    "blacksmith.client.middleware_factories": ["forward_header"],
+                    "blacksmith.client.middleware_factory.forward_header": ["X-Tenant"],
+                    "blacksmith.client.precompile_middlewares": precompile,
+                    "blacksmith.scan": "tests.unittests.resources",
+                },
+            },
+            id=f"precompile {precompile}",
+        )
+        for precompile in ("false", "true")
+    ],
+)
+def test_precompile_middlewares_order(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    # the middleware factories are the innermost middlewares in both modes
+    dummy_request.headers["X-Tenant"] = "acme"
+    api = dummy_request.blacksmith.client("api")
+    resp = api.dummy.get({"name": "x"}).raw_result.unwrap()
+    assert resp.headers["X-Tenant"] == "acme"
+
+
+class SlowTransport(DummyTransport):
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.lock = threading.Lock()
+
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        with self.lock:
+            self.calls.append(req.headers["Authorization"])
+        time.sleep(0.1)
+        return super().__call__(req, client_name, path, timeout)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {
+                "settings": {
+                    "blacksmith.client.service_discovery": "static",
+                    "blacksmith.client.static_sd_config": ["srv http://srv.localhost"],
+                    "blacksmith.client.transport": SlowTransport(),
+                    "blacksmith.client.middlewares": ["single_flight"],
+                    "blacksmith.client.middleware_factories": ["forward_header"],
+                    "blacksmith.client.middleware_factory.forward_header": [
+                        "Authorization"
+                    ],
+                    "blacksmith.client.precompile_middlewares": precompile,
+                    "blacksmith.scan": "tests.unittests.resources",
+                },
+            },
+            id=f"precompile {precompile}",
+        )
+        for precompile in ("false", "true")
+    ],
+)
+def test_single_flight_forward_header(
+    params: dict[str, Any], config: Configurator, registry: CollectorRegistry
+):
+    transport = params["settings"]["blacksmith.client.transport"]
+    exts = config.registry.queryUtility(IRequestExtensions)
+    barrier = threading.Barrier(2)
+    responses: dict[str, Any] = {}
+
+    def call(user: str) -> None:
+        request = testing.DummyRequest(config=config)
+        apply_request_extensions(request, exts)
+        request.headers["Authorization"] = user
+        api = request.blacksmith.client("api")
+        barrier.wait()
+        responses[user] = api.dummy.get({"name": "x"}).raw_result.unwrap()
+
+    threads = [threading.Thread(target=call, args=(user,)) for user in ("alice", "bob")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # the forwarded header is part of the key, bob does not get alice's response
+    assert sorted(transport.calls) == ["alice", "bob"]
+    assert responses["alice"].headers["Authorization"] == "alice"
+    assert responses["bob"].headers["Authorization"] == "bob"
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.async_clients": ["client"],
+                "blacksmith.client.service_discovery": "static",
+                "blacksmith.client.static_sd_config": ["srv http://srv.localhost"],
+                "blacksmith.client.async_transport": DummyAsyncTransport(),
+                "blacksmith.client.middlewares": ["prometheus", "circuitbreaker"],
+                "blacksmith.client.middleware_factories": ["forward_header"],
+                "blacksmith.client.middleware_factory.forward_header": [
+                    "Authorization"
+                ],
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_async_req_attr(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    blacksmith = dummy_request.blacksmith_async
+    assert isinstance(blacksmith, AsyncPyramidBlacksmith)
+    factory = blacksmith.clients["client"]
+    assert isinstance(factory.sd, AsyncStaticDiscovery)
+    assert isinstance(factory.transport, DummyAsyncTransport)
+    assert [type(m) for m in factory.middlewares] == [
+        AsyncCircuitBreakerMiddleware,
+        AsyncPrometheusMiddleware,
+    ]
+
+    dummy_request.headers["Authorization"] = "Bearer abc"
+
+    async def fetch():
+        return await asyncio.gather(
+            blacksmith.client("api"),
+            blacksmith.client("api"),
+        )
+
+    clients = blacksmith.run(fetch())
+    assert set(blacksmith.initialized) == {"client"}
+    for cli in clients:
+        assert [type(m) for m in cli.middlewares] == [
+            AsyncHTTPAddHeadersMiddleware,
+            AsyncCircuitBreakerMiddleware,
+            AsyncPrometheusMiddleware,
+        ]
+
+    async def get_dummy():
+        cli = await blacksmith.client("api")
+        return await cli.dummy.get({"name": "foo"})
+
+    resp = blacksmith.run(get_dummy())
+    assert resp.json == {"headers": {"Authorization": "Bearer abc"}}
+
+    with pytest.raises(AttributeError) as ctx:
+        blacksmith.run(blacksmith.client2("api"))
+    assert str(ctx.value) == "Client 'client2' is not registered"
+
+    # the client key is bound to the event loop of request.blacksmith_async.run
+    with pytest.raises(RuntimeError) as err:
+        asyncio.run(blacksmith.client("api"))
+    assert str(err.value) == (
+        "Client 'client' is bound to another event loop, "
+        "use request.blacksmith_async.run()"
+    )
+    blacksmith.initialized.after_fork()
+    assert asyncio.run(get_dummy()).json == {"headers": {"Authorization": "Bearer abc"}}
+    blacksmith.event_loop.shutdown()
+
+
+class SlowClientFactory:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.initialized = False
+
+    async def initialize(self) -> None:
+        await asyncio.sleep(0.01)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("redis is down")
+        self.initialized = True
+
+    async def __call__(self, client_name: str) -> bool:
+        return self.initialized
+
+
+def test_async_initialize():
+    factory: Any = SlowClientFactory(failures=1)
+    blacksmith = AsyncPyramidBlacksmith(
+        testing.DummyRequest(), {"client": factory}, {}, InitializedClients()
+    )
+
+    async def fetch():
+        return await asyncio.gather(
+            blacksmith.client("api"),
+            blacksmith.client("api"),
+            return_exceptions=True,
+        )
+
+    # the failure of the initialization is not recorded
+    resp = blacksmith.run(fetch())
+    assert [type(r) for r in resp] == [ConnectionError, bool]
+    assert resp[1] is True
+    assert set(blacksmith.initialized) == {"client"}
+    blacksmith.event_loop.shutdown()
+
+    # concurrent coroutines wait for the initialization
+    factory = SlowClientFactory(failures=0)
+    blacksmith = AsyncPyramidBlacksmith(
+        testing.DummyRequest(), {"client": factory}, {}, InitializedClients()
+    )
+    assert blacksmith.run(fetch()) == [True, True]
+    blacksmith.event_loop.shutdown()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_async_binding_disabled(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    assert not hasattr(dummy_request, "blacksmith_async")
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {"blacksmith.client.middlewares": ["retry"]},
+            "expected": (
+                "Middleware retry of blacksmith.client is not available "
+                "for the async clients"
+            ),
+        },
+        {
+            "settings": {
+                "blacksmith.client.middlewares": [
+                    "dummy tests.unittests.fixtures:DummyMiddlewareBuilder"
+                ],
+            },
+            "expected": (
+                "Middleware blacksmith.client.middleware.dummy of the async "
+                "clients must be built by an AbstractAsyncMiddlewareBuilder"
+            ),
+        },
+        {
+            "settings": {
+                "blacksmith.client.middleware_factories": ["lazy_forward_header"],
+            },
+            "expected": (
+                "Middleware factory lazy_forward_header of blacksmith.client is "
+                "not available for the async clients"
+            ),
+        },
+        {
+            "settings": {
+                "blacksmith.client.middleware_factories": [
+                    "fwd pyramid_blacksmith.middleware_factory:"
+                    "ForwardHeaderFactoryBuilder"
+                ],
+            },
+            "expected": (
+                "Middleware factory blacksmith.client.middleware_factory.fwd of "
+                "the async clients must be an AbstractAsyncMiddlewareFactoryBuilder"
+            ),
+        },
+    ],
+)
+def test_async_sync_only_middlewares(
+    params: dict[str, Any], metrics: PrometheusMetrics
+):
+    with pytest.raises(ConfigurationError) as ctx:
+        list(
+            AsyncBlacksmithClientSettingsBuilder(
+                params["settings"], metrics
+            ).build_middlewares(metrics)
+        )
+        list(
+            AsyncBlacksmithMiddlewareFactoryBuilder(params["settings"], metrics).build()
+        )
+    assert str(ctx.value) == params["expected"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "static",
+                "blacksmith.client.static_sd_config": [],
+            },
+            "expected": AsyncStaticDiscovery,
+        },
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "consul",
+                "blacksmith.client.consul_sd_config": [],
+            },
+            "expected": AsyncConsulDiscovery,
+        },
+    ],
+)
+def test_get_async_sd_strategy(params: dict[str, Any], metrics: PrometheusMetrics):
+    builder = AsyncBlacksmithClientSettingsBuilder(params["settings"], metrics)
+    assert isinstance(builder.build_sd_strategy(), params["expected"])
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "static",
+                "blacksmith.client.static_sd_config": ["srv http://srv.localhost"],
+                "blacksmith.client.transport": DummyTransport(),
+                "blacksmith.client.middleware_factories": ["forward_header"],
+                "blacksmith.client.middleware_factory.forward_header": [
+                    "Authorization"
+                ],
+                "blacksmith.client.parallel": ["max_workers 3", "timeout 2"],
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_parallel(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    blacksmith = dummy_request.blacksmith
+    executor = blacksmith.executors["client"]
+    assert executor.max_workers == 3
+    assert executor.timeout == 2
+
+    dummy_request.headers["Authorization"] = "Bearer abc"
+    results = blacksmith.parallel(
+        "client",
+        lambda client: client("api").dummy.get({"name": "foo"}),
+        lambda client: client("api").dummy.get({"name": "bar"}),
+    )
+    assert [r.raw_result.unwrap().headers for r in results] == [
+        {"Authorization": "Bearer abc"},
+        {"Authorization": "Bearer abc"},
+    ]
+
+    with pytest.raises(AttributeError) as ctx:
+        blacksmith.parallel("client2", lambda client: None)
+    assert str(ctx.value) == "Client 'client2' is not registered"
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {"blacksmith.client.service_discovery": "nomad"},
+            "expected": None,
+        },
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "nomad",
+                "blacksmith.client.sd_cache": "",
+            },
+            "expected": {"ttl": 30, "max_entries": 256, "stale_ttl": None},
+        },
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "nomad",
+                "blacksmith.client.sd_cache": """
+                    ttl           5
+                    max_entries   10
+                    stale_ttl     60
+                """,
+            },
+            "expected": {"ttl": 5, "max_entries": 10, "stale_ttl": 60},
+        },
+    ],
+)
+def test_build_sd_cache(params: dict[str, Any], metrics: PrometheusMetrics):
+    builder = BlacksmithClientSettingsBuilder(params["settings"], metrics)
+    sd = builder.build().sd
+    if params["expected"] is None:
+        assert isinstance(sd, SyncNomadDiscovery)
+        return
+    assert isinstance(sd, SyncCachedServiceDiscovery)
+    assert isinstance(sd.sd, SyncNomadDiscovery)
+    assert {
+        "ttl": sd.ttl,
+        "max_entries": sd.max_entries,
+        "stale_ttl": sd.stale_ttl,
+    } == params["expected"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "nomad",
+                "blacksmith.client.load_balancer": "p2c",
+            },
+            "expected": SyncNomadDiscovery,
+        },
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "consul",
+                "blacksmith.client.sd_cache": ["ttl 5"],
+                "blacksmith.client.load_balancer": "round_robin",
+            },
+            "expected": SyncConsulDiscovery,
+        },
+    ],
+)
+def test_build_sd_load_balancer(params: dict[str, Any], metrics: PrometheusMetrics):
+    builder = BlacksmithClientSettingsBuilder(params["settings"], metrics)
+    factory = builder.build()
+    sd = factory.sd
+    assert isinstance(sd, SyncLoadBalancedDiscovery)
+    assert sd.strategy == params["settings"]["blacksmith.client.load_balancer"]
+    # the instances are always cached
+    assert isinstance(sd.sd, SyncCachedServiceDiscovery)
+    assert isinstance(sd.sd.sd, params["expected"])
+    assert isinstance(factory.middlewares[0], SyncLoadBalancerMiddleware)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "nomad",
+                "blacksmith.client.load_balancer": "random",
+            },
+            "expected": "Invalid value random for blacksmith.client.load_balancer: "
+            "not in round_robin, least_outstanding, p2c",
+        },
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "static",
+                "blacksmith.client.static_sd_config": [],
+                "blacksmith.client.load_balancer": "p2c",
+            },
+            "expected": "blacksmith.client.load_balancer requires a service "
+            "discovery that list instances: consul or nomad",
+        },
+    ],
+)
+def test_build_sd_load_balancer_error(
+    params: dict[str, Any], metrics: PrometheusMetrics
+):
+    builder = BlacksmithClientSettingsBuilder(params["settings"], metrics)
+    with pytest.raises(ConfigurationError) as ctx:
+        builder.build()
+    assert str(ctx.value) == params["expected"]
+
+
+def test_lazy_builds():
+    calls: list[str] = []
+
+    def build(key: str) -> str:
+        calls.append(key)
+        time.sleep(0.01)
+        return key.upper()
+
+    builds = LazyBuilds("thing", ["a", "b"], build)
+    assert calls == []
+    assert list(builds) == ["a", "b"]
+
+    threads = [threading.Thread(target=lambda: builds["a"]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert builds["a"] == "A"
+    assert calls == ["a"]
+    assert builds.get("c") is None
+
+    builds.warmup()
+    assert calls == ["a", "b"]
+    assert set(builds.timings) == {"a", "b"}
+
+    assert dict(LazyBuilds("thing", ["c"], build, lazy=False)) == {"c": "C"}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.lazy": "true",
+                "blacksmith.clients": ["client", "other"],
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.other.service_discovery": "invalid",
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_lazy_binding(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    clients = dummy_request.blacksmith.clients
+    assert clients.timings == {}
+    assert isinstance(dummy_request.blacksmith.client("api"), SyncClient)
+    assert set(clients.timings) == {"client"}
+
+    # the invalid configuration of the other key is only raised on use
+    with pytest.raises(ConfigurationError):
+        dummy_request.blacksmith.other("api")
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.lazy": "true",
+                "blacksmith.async_clients": ["client"],
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.scan": "tests.unittests.resources",
+            },
+        },
+    ],
+)
+def test_warmup(params: dict[str, Any], config: Any, registry: CollectorRegistry):
+    timings = warmup(config.registry)
+    assert set(timings["client"]) == {
+        "client factory",
+        "middleware factories",
+        "parallel executor",
+        "collection streamer",
+        "data loaders",
+        "async client factory",
+        "async middleware factories",
+    }
+
+
+def wait_until(predicate: Any, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+reload_settings: dict[str, Any] = {
+    "blacksmith.clients": ["client", "other"],
+    "blacksmith.reload_drain_timeout": "0",
+    "blacksmith.scan": "tests.unittests.resources",
+    "blacksmith.client.service_discovery": "static",
+    "blacksmith.client.static_sd_config": ["srv http://srv.localhost"],
+    "blacksmith.client.transport_pool": "",
+    "blacksmith.other.service_discovery": "static",
+    "blacksmith.other.static_sd_config": ["srv http://srv.localhost"],
+    "blacksmith.other.transport_pool": "",
+    "blacksmith.other.middlewares": ["hedging"],
+}
+
+
+@pytest.mark.parametrize("params", [{"settings": reload_settings}])
+def test_reload(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    blacksmith = dummy_request.blacksmith
+    client = blacksmith.clients["client"]
+    other = blacksmith.clients["other"]
+    (hedging,) = other.middlewares
+    assert hedging.pool.executor is not None
+
+    settings: dict[str, Any] = {
+        **params["settings"],
+        "blacksmith.clients": ["client", "other", "new"],
+        "blacksmith.other.static_sd_config": ["srv http://srv2.localhost"],
+        "blacksmith.new.service_discovery": "router",
+    }
+    changed = reload(dummy_request.registry, settings)
+    assert changed == ["other", "new"]
+
+    # the request being processed keeps its client factories
+    assert blacksmith.clients["other"] is other
+
+    blacksmith = dummy_request.registry.blacksmith_binding(dummy_request)
+    assert blacksmith.clients["client"] is client
+    assert blacksmith.clients["other"] is not other
+    assert blacksmith.clients["other"].sd.endpoints == {
+        ("srv", None): "http://srv2.localhost"
+    }
+    assert blacksmith.clients.built("new") is not None
+
+    # the pools of the previous client factory are drained
+    assert wait_until(lambda: other.transport.client.is_closed)
+    assert wait_until(lambda: hedging.pool._executor is None)
+    assert not client.transport.client.is_closed
+
+    changed = reload(dummy_request.registry, params["settings"])
+    assert changed == ["other"]
+    blacksmith = dummy_request.registry.blacksmith_binding(dummy_request)
+    assert list(blacksmith.clients) == ["client", "other"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                **{
+                    key: val
+                    for key, val in reload_settings.items()
+                    if key != "blacksmith.other.transport_pool"
+                },
+                "blacksmith.other.transport": PooledHttpxTransport(),
+            },
+        },
+    ],
+)
+def test_reload_shared_transport(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    other = dummy_request.blacksmith.clients["other"]
+    (hedging,) = other.middlewares
+    assert hedging.pool.executor is not None
+    settings: dict[str, Any] = {
+        **params["settings"],
+        "blacksmith.other.static_sd_config": ["srv http://srv2.localhost"],
+    }
+    reload(dummy_request.registry, settings)
+    new = dummy_request.registry.blacksmith_binding(dummy_request).clients["other"]
+    assert new.transport is other.transport
+
+    # the transport of the settings is not closed by the drain
+    assert wait_until(lambda: hedging.pool._executor is None)
+    assert not other.transport.client.is_closed
+
+
+@pytest.mark.parametrize("params", [{"settings": reload_settings}])
+def test_reload_error(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    binding = dummy_request.registry.blacksmith_binding
+    state = binding.state
+    with pytest.raises(ConfigurationError):
+        reload(
+            dummy_request.registry,
+            {**params["settings"], "blacksmith.other.service_discovery": "invalid"},
+        )
+    assert binding.state is state
+
+
+@pytest.fixture
+def config_uri(tmp_path: Any) -> str:
+    path = tmp_path / "app.ini"
+    path.write_text(
+        "[app:main]\n"
+        "use = call:pyramid_blacksmith:includeme\n"
+        "blacksmith.clients = client\n"
+        "blacksmith.client.service_discovery = static\n"
+        "blacksmith.client.static_sd_config = srv http://srv2.localhost\n"
+    )
+    return str(path)
+
+
+@pytest.fixture
+def params(config_uri: str) -> dict[str, Any]:
+    return {
+        "settings": {
+            **reload_settings,
+            "blacksmith.reload_signal": "SIGUSR1",
+            "blacksmith.reload_config_uri": config_uri,
+        }
+    }
+
+
+def test_reload_signal(
+    params: dict[str, Any], dummy_request: Any, registry: CollectorRegistry
+):
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        binding = dummy_request.registry.blacksmith_binding
+        assert wait_until(lambda: list(binding.state.clients) == ["client"])
+        assert binding.state.clients["client"].sd.endpoints == {
+            ("srv", None): "http://srv2.localhost"
+        }
+    finally:
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.reload_signal": "SIGUSR1",
+            },
+            "expected": "blacksmith.reload_signal requires "
+            "blacksmith.reload_config_uri",
+        },
+        {
+            "settings": {
+                "blacksmith.client.service_discovery": "router",
+                "blacksmith.reload_signal": "SIGNOPE",
+                "blacksmith.reload_config_uri": "app.ini",
+            },
+            "expected": "Invalid signal SIGNOPE for blacksmith.reload_signal",
+        },
+    ],
+)
+def test_reload_signal_error(params: dict[str, Any], registry: CollectorRegistry):
+    config = testing.setUp(settings=params["settings"])
+    try:
+        with pytest.raises(ConfigurationError) as ctx:
+            config.include(includeme)
+        assert str(ctx.value) == params["expected"]
+    finally:
+        testing.tearDown()
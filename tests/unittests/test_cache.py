@@ -0,0 +1,155 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from pyramid_blacksmith import cache as cache_module
+from pyramid_blacksmith.cache import AsyncTwoTierCache, LRUCache, SyncTwoTierCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(
+        cache_module, "time", SimpleNamespace(monotonic=clock.monotonic)
+    )
+    return clock
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands: list[Any] = []
+
+    def __enter__(self) -> "FakePipeline":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def get(self, key: str) -> None:
+        self.commands.append(lambda: self.redis.data.get(key, (None, -2))[0])
+
+    def pttl(self, key: str) -> None:
+        self.commands.append(lambda: self.redis.data.get(key, (None, -2))[1])
+
+    def execute(self) -> list[Any]:
+        self.redis.calls += 1
+        return [cmd() for cmd in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, tuple[str, int]] = {}
+        self.calls = 0
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def set(self, key: str, val: str, ex: timedelta) -> None:
+        self.data[key] = (val, int(ex.total_seconds() * 1000))
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def __aenter__(self) -> "FakeAsyncPipeline":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+    async def execute(self) -> list[Any]:  # type: ignore[override]
+        return super().execute()
+
+
+class FakeAsyncRedis(FakeRedis):
+    def pipeline(self, transaction: bool = True) -> FakeAsyncPipeline:
+        return FakeAsyncPipeline(self)
+
+    async def set(self, key: str, val: str, ex: timedelta) -> None:  # type: ignore
+        super().set(key, val, ex)
+
+
+def test_lru_cache_max_entries(clock: Clock):
+    lru = LRUCache(max_entries=2)
+    lru.set("a", "1", 10)
+    lru.set("b", "2", 10)
+    assert lru.get("a") == "1"
+    lru.set("c", "3", 10)
+    assert lru.get("b") is None
+    assert lru.get("a") == "1"
+    assert lru.get("c") == "3"
+
+    clock.now = 10
+    assert lru.get("a") is None
+    assert len(lru) == 1
+
+
+def test_lru_cache_max_bytes(clock: Clock):
+    lru = LRUCache(max_bytes=10)
+    lru.set("a", "1234", 10)
+    lru.set("b", "5678", 10)
+    lru.set("c", "9012", 10)
+    assert lru.get("a") is None
+    assert lru.size == 8
+    lru.set("d", "too large value", 10)
+    assert lru.get("d") is None
+    lru.set("b", "1", 10)
+    assert lru.size == 5
+
+    lru.clear()
+    assert lru.size == 0
+    assert lru.get("c") is None
+
+
+def test_lru_cache_max_bytes_encoded(clock: Clock):
+    lru = LRUCache(max_bytes=10)
+    lru.set("a", "éééé", 10)
+    assert lru.size == 8
+    lru.set("b", b"\x00\x01", 10)
+    assert lru.size == 10
+    lru.set("c", "€", 10)
+    assert lru.get("a") is None
+    assert lru.size == 5
+
+
+def test_two_tier_cache(clock: Clock):
+    redis = FakeRedis()
+    cache = SyncTwoTierCache(redis, LRUCache(max_entries=10))
+    cache.set("a", "1", timedelta(seconds=10))
+    assert cache.get("a") == "1"
+    assert redis.calls == 0
+
+    # filled by another process
+    redis.data["b"] = ("2", 5000)
+    assert cache.get("b") == "2"
+    assert cache.get("b") == "2"
+    assert redis.calls == 1
+
+    clock.now = 6
+    assert cache.get("b") == "2"
+    assert redis.calls == 2
+
+    assert cache.get("c") is None
+
+
+def test_async_two_tier_cache(clock: Clock):
+    redis = FakeAsyncRedis()
+    cache = AsyncTwoTierCache(redis, LRUCache(max_entries=10))
+
+    async def run():
+        await cache.set("a", "1", timedelta(seconds=10))
+        redis.data["b"] = ("2", 5000)
+        return [await cache.get("a"), await cache.get("b"), await cache.get("b")]
+
+    assert asyncio.run(run()) == ["1", "2", "2"]
+    assert redis.calls == 1
@@ -0,0 +1,148 @@
+import asyncio
+import multiprocessing
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+from blacksmith import PrometheusMetrics
+from purgatory import AsyncCircuitBreakerFactory, SyncCircuitBreakerFactory
+from purgatory.domain.model import Context, OpenedState
+
+from pyramid_blacksmith.circuit_breaker import (
+    AsyncMmapUnitOfWork,
+    MmapStore,
+    SyncMmapRepository,
+    SyncMmapUnitOfWork,
+)
+from pyramid_blacksmith.middleware import CircuitBreakerBuilder
+
+
+def fail(factory: SyncCircuitBreakerFactory) -> None:
+    with pytest.raises(ConnectionError):
+        with factory.get_breaker("api"):
+            raise ConnectionError("upstream is down")
+
+
+def test_mmap_uow_shared(tmp_path: Path):
+    path = str(tmp_path / "cb")
+    worker1 = SyncCircuitBreakerFactory(
+        default_threshold=3, default_ttl=30, uow=SyncMmapUnitOfWork(path, "16")
+    )
+    worker2 = SyncCircuitBreakerFactory(
+        default_threshold=3, default_ttl=30, uow=SyncMmapUnitOfWork(path, "16")
+    )
+    fail(worker1)
+    fail(worker2)
+    brk = worker1.get_breaker("api")
+    assert (brk.context.state, brk.context.failure_count) == ("closed", 2)
+
+    fail(worker1)
+    with pytest.raises(OpenedState):
+        with worker2.get_breaker("api"):
+            pass
+
+
+def fail_in_process(path: str, count: int) -> None:
+    worker = SyncCircuitBreakerFactory(
+        default_threshold=100, uow=SyncMmapUnitOfWork(path)
+    )
+    for _ in range(count):
+        fail(worker)
+
+
+def test_mmap_uow_processes(tmp_path: Path):
+    path = str(tmp_path / "cb")
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=fail_in_process, args=(path, 20)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+    context = MmapStore(path).get("api")
+    assert context is not None
+    assert context.failure_count == 80
+
+
+def test_mmap_uow_recover(tmp_path: Path):
+    path = str(tmp_path / "cb")
+    worker1 = SyncCircuitBreakerFactory(uow=SyncMmapUnitOfWork(path))
+    worker2 = SyncCircuitBreakerFactory(uow=SyncMmapUnitOfWork(path))
+    fail(worker1)
+    with worker2.get_breaker("api"):
+        pass
+    assert worker1.get_breaker("api").context.failure_count == 0
+
+
+def test_mmap_store(tmp_path: Path):
+    store = MmapStore(str(tmp_path / "cb"), slots=2)
+    worker = SyncCircuitBreakerFactory(uow=SyncMmapUnitOfWork(store.path, 2))
+    worker.get_breaker("api1")
+    worker.get_breaker("api2")
+    with pytest.raises(RuntimeError):
+        worker.get_breaker("api3")
+
+    ctx = store.get("api1")
+    assert ctx is not None
+    assert (ctx.state, ctx.opened_at, ctx.threshold) == ("closed", None, 5)
+
+    store.clear()
+    assert store.get("api1") is None
+    store.close()
+
+
+def test_mmap_store_slots(tmp_path: Path):
+    path = str(tmp_path / "cb")
+    MmapStore(path, slots=16).close()
+    with pytest.raises(ValueError) as ctx:
+        MmapStore(path, slots=32)
+    assert str(ctx.value) == f"{path} has been created with 16 slots, not 32"
+    assert MmapStore(path, slots="16").slots == 16
+
+
+def test_mmap_store_register(tmp_path: Path):
+    path = str(tmp_path / "cb")
+    store1, store2 = MmapStore(path), MmapStore(path)
+    store1.register(Context("api", 5, 30))
+    store1.update("api", inc_failures=True)
+    # a process that did not see the circuit registers it too
+    store2.register(Context("api", 5, 30))
+    ctx = store2.get("api")
+    assert ctx is not None
+    assert ctx.failure_count == 1
+
+
+def test_async_mmap_uow(tmp_path: Path):
+    path = str(tmp_path / "cb")
+    worker1 = AsyncCircuitBreakerFactory(
+        default_threshold=1, uow=AsyncMmapUnitOfWork(path)
+    )
+    worker2 = AsyncCircuitBreakerFactory(
+        default_threshold=1, uow=AsyncMmapUnitOfWork(path)
+    )
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            async with await worker1.get_breaker("api"):
+                raise ConnectionError("upstream is down")
+        with pytest.raises(OpenedState):
+            async with await worker2.get_breaker("api"):
+                pass
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("params", [{"slots": "16"}])
+def test_circuit_breaker_builder(
+    params: dict[str, Any], tmp_path: Path, metrics: PrometheusMetrics
+):
+    settings = {
+        "key": "uow  pyramid_blacksmith.circuit_breaker:SyncMmapUnitOfWork",
+        "key.uow": f"""
+            path   {tmp_path / "cb"}
+            slots  {params["slots"]}
+        """,
+    }
+    circuit = CircuitBreakerBuilder(settings, "key", metrics).build()
+    uow = circuit.circuit_breaker.uow
+    assert isinstance(uow, SyncMmapUnitOfWork)
+    assert cast(SyncMmapRepository, uow.contexts).store.slots == 16
@@ -0,0 +1,174 @@
+import threading
+from typing import Any
+
+import pytest
+from blacksmith import CollectionParser, HTTPResponse, Response
+from blacksmith.domain.model.params import CollectionIterator
+from pyramid.testing import DummyRequest
+from result import Ok
+
+from pyramid_blacksmith.binding import (
+    BlacksmithCollectionStreamBuilder,
+    PyramidBlacksmith,
+)
+from pyramid_blacksmith.collection import CollectionStreamer
+from pyramid_blacksmith.parallel import ParallelExecutor
+
+
+class Item(Response):
+    id: int
+
+
+class Collection:
+    def __init__(self, size: int, total_count: bool = True):
+        self.size = size
+        self.total_count = total_count
+        self.calls: list[Any] = []
+        self.lock = threading.Lock()
+
+    def fetch(self, params: dict[str, Any]) -> CollectionIterator[Any]:
+        with self.lock:
+            self.calls.append(params)
+        if "offset" in params:
+            start = params["offset"]
+        else:
+            start = (params["page"] - 1) * params["per_page"]
+        end = min(self.size, start + params["per_page"])
+        headers = {"Total-Count": str(self.size)} if self.total_count else {}
+        resp = HTTPResponse(
+            200, headers=headers, json=[{"id": idx} for idx in range(start, end)]
+        )
+        return CollectionIterator(resp, Item, CollectionParser)
+
+
+@pytest.fixture
+def executor():
+    executor = ParallelExecutor(max_workers=4)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {"size": 25, "total_count": True, "prefetch": 1, "expected_pages": 3},
+            id="total count",
+        ),
+        pytest.param(
+            {"size": 25, "total_count": False, "prefetch": 2, "expected_pages": 3},
+            id="short page",
+        ),
+        pytest.param(
+            {"size": 20, "total_count": True, "prefetch": 3, "expected_pages": 2},
+            id="full last page",
+        ),
+        pytest.param(
+            {"size": 20, "total_count": False, "prefetch": 0, "expected_pages": 3},
+            id="empty last page",
+        ),
+        pytest.param(
+            {"size": 0, "total_count": True, "prefetch": 1, "expected_pages": 1},
+            id="empty",
+        ),
+    ],
+)
+def test_collection_streamer(params: dict[str, Any], executor: ParallelExecutor):
+    collection = Collection(params["size"], params["total_count"])
+    streamer = CollectionStreamer(page_size=10, prefetch=params["prefetch"])
+    items = streamer.stream(DummyRequest(), executor, collection.fetch, {"q": "x"})
+    assert [item.id for item in items] == list(range(params["size"]))
+    assert len(collection.calls) == params["expected_pages"]
+    assert collection.calls[0] == {"q": "x", "page": 1, "per_page": 10}
+
+
+def test_collection_streamer_in_worker_thread():
+    executor = ParallelExecutor(max_workers=1, timeout=1)
+    collection = Collection(25)
+    streamer = CollectionStreamer(page_size=10, prefetch=2)
+    request = DummyRequest()
+
+    def consume() -> list[int]:
+        items = streamer.stream(request, executor, collection.fetch, {})
+        return [item.id for item in items]
+
+    assert executor.map(request, [consume]) == [list(range(25))]
+    executor.shutdown()
+
+
+def test_collection_streamer_offset(executor: ParallelExecutor):
+    collection = Collection(15)
+    streamer = CollectionStreamer(page_size=10, offset_param="offset")
+    items = streamer.stream(DummyRequest(), executor, collection.fetch, {})
+    assert [item.id for item in items] == list(range(15))
+    assert collection.calls == [
+        {"offset": 0, "per_page": 10},
+        {"offset": 10, "per_page": 10},
+    ]
+
+
+def test_collection_streamer_bounded(executor: ParallelExecutor):
+    collection = Collection(1000, total_count=False)
+    streamer = CollectionStreamer(page_size=10, prefetch=2)
+    items = streamer.stream(DummyRequest(), executor, collection.fetch, {})
+    assert next(items).id == 0
+    # the first page and the prefetched ones
+    assert len(collection.calls) <= 3
+    items.close()
+    assert len(collection.calls) <= 3
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"settings": {}, "expected": {"page_size": 100, "prefetch": 1}},
+        {
+            "settings": {
+                "blacksmith.client.collection_stream": [
+                    "page_size 50",
+                    "prefetch 3",
+                    "page_param p",
+                    "size_param limit",
+                    "first_page 0",
+                ]
+            },
+            "expected": {
+                "page_size": 50,
+                "prefetch": 3,
+                "page_param": "p",
+                "size_param": "limit",
+                "first_page": 0,
+            },
+        },
+    ],
+)
+def test_build_collection_streamer(params: dict[str, Any], metrics: Any):
+    streamer = BlacksmithCollectionStreamBuilder(params["settings"], metrics).build()
+    for key, val in params["expected"].items():
+        assert getattr(streamer, key) == val
+
+
+class FakeClient:
+    def __init__(self, collection: Collection):
+        self.items = self
+        self.collection = collection
+
+    def collection_get(self, params: dict[str, Any]) -> Any:
+        return Ok(self.collection.fetch(params))
+
+
+def test_blacksmith_stream(executor: ParallelExecutor):
+    collection = Collection(12)
+    blacksmith = PyramidBlacksmith(
+        DummyRequest(),
+        {"client": lambda client_name: FakeClient(collection)},  # type: ignore
+        {},
+        executors={"client": executor},
+        streamers={"client": CollectionStreamer(page_size=5)},
+    )
+    items = blacksmith.stream("client", "api", "items")
+    assert [item.id for item in items] == list(range(12))
+
+    with pytest.raises(AttributeError) as ctx:
+        blacksmith.stream("other", "api", "items")
+    assert str(ctx.value) == "Client 'other' is not registered"
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from typing import Any
+
+import pytest
+
+from pyramid_blacksmith import fork
+from pyramid_blacksmith.middleware import (
+    ConcurrencyLimiter,
+    clear_redis_clients,
+    get_redis_client,
+)
+from pyramid_blacksmith.parallel import ParallelExecutor
+from pyramid_blacksmith.sd import SyncCachedServiceDiscovery
+from pyramid_blacksmith.transport import PooledHttpxTransport
+
+
+class Resource:
+    def __init__(self):
+        self.forked = 0
+        fork.register(self)
+
+    def after_fork(self) -> None:
+        self.forked += 1
+
+
+def test_register():
+    resource = Resource()
+    fork.reset_after_fork()
+    assert resource.forked == 1
+
+    ident = id(resource)
+    del resource
+    assert ident not in fork._resources
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_reset_after_fork():
+    transport = PooledHttpxTransport()
+    executor = ParallelExecutor(max_workers=1)
+    executor.executor.submit(lambda: None).result()
+    limiter = ConcurrencyLimiter(limit=1)
+    assert limiter.acquire()
+    sd: Any = SyncCachedServiceDiscovery(sd=None)  # type: ignore[arg-type]
+    # a lock held by a thread of the parent process, while forking
+    sd._lock.acquire()
+    redis = get_redis_client("redis://localhost/0")
+    redis.connection_pool._created_connections = 3
+
+    client = transport.client
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # coverage: ignore
+        acquired = sd._lock.acquire(timeout=1)
+        result = {
+            "client": transport.client is not client,
+            "executor": executor._executor is None,
+            "limiter": limiter.acquire(),
+            "sd": acquired,
+            "redis": redis.connection_pool._created_connections,
+        }
+        os.write(write, json.dumps(result).encode())
+        os._exit(0)
+
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read) as f:
+        result = json.loads(f.read())
+    sd._lock.release()
+    assert result == {
+        "client": True,
+        "executor": True,
+        "limiter": True,
+        "sd": True,
+        "redis": 0,
+    }
+    # the parent process keep its resources
+    assert transport.client is client
+    assert executor._executor is not None
+    assert not limiter.acquire()
+    executor.shutdown()
+    clear_redis_clients()
+
+
+def test_after_fork_executor_restart():
+    executor = ParallelExecutor(max_workers=1)
+    executor.executor.submit(lambda: None).result()
+    pool = executor._executor
+    executor.after_fork()
+    assert executor._executor is None
+    assert isinstance(executor._lock, type(threading.Lock()))
+    assert executor.executor is not pool
+    executor.shutdown()
+    assert pool is not None
+    pool.shutdown()
@@ -0,0 +1,261 @@
+import threading
+from typing import Any
+
+import pytest
+from blacksmith import HTTPError, HTTPRequest, HTTPResponse, Response
+from pyramid.testing import DummyRequest
+from result import Err, Ok, UnwrapError
+
+from pyramid_blacksmith.binding import (
+    BlacksmithDataLoaderBuilder,
+    ClientCache,
+    PyramidBlacksmith,
+)
+from pyramid_blacksmith.loader import BatchLoader, DataLoader
+from pyramid_blacksmith.parallel import ParallelExecutor
+
+
+class User(Response):
+    id: int
+    name: str
+
+
+class Users:
+    def __init__(self, missing: frozenset[int] = frozenset()):
+        self.missing = missing
+        self.calls: list[Any] = []
+        self.lock = threading.Lock()
+
+    def fetch_one(self, key: int) -> User:
+        with self.lock:
+            self.calls.append(key)
+        if key in self.missing:
+            raise KeyError(key)
+        return User(id=key, name=f"user {key}")
+
+    def fetch_batch(self, keys: list[int]) -> list[User]:
+        with self.lock:
+            self.calls.append(keys)
+        return [
+            User(id=key, name=f"user {key}") for key in keys if key not in self.missing
+        ]
+
+
+@pytest.fixture
+def executor():
+    executor = ParallelExecutor(max_workers=4)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {"batch": True, "expected_calls": [[1, 2, 3], [4]]},
+            id="batch route",
+        ),
+        pytest.param(
+            {"batch": False, "expected_calls": [1, 2, 3, 4]},
+            id="single calls",
+        ),
+    ],
+)
+def test_data_loader(params: dict[str, Any], executor: ParallelExecutor):
+    users = Users()
+    loader = DataLoader(
+        DummyRequest(),
+        executor,
+        BatchLoader(max_batch_size=3),
+        users.fetch_one,
+        users.fetch_batch if params["batch"] else None,
+    )
+    results = [loader.load(key) for key in (1, 2, 1, 3, 4, 2)]
+    assert not any(result.done() for result in results)
+    assert [result.result().name for result in results] == [
+        "user 1",
+        "user 2",
+        "user 1",
+        "user 3",
+        "user 4",
+        "user 2",
+    ]
+    assert sorted(users.calls) == params["expected_calls"]
+
+    # the results are cached for the request
+    assert loader.load_many([4, 1]) == [
+        User(id=4, name="user 4"),
+        User(id=1, name="user 1"),
+    ]
+    assert len(users.calls) == len(params["expected_calls"])
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param({"batch": True}, id="batch route"),
+        pytest.param({"batch": False}, id="single calls"),
+    ],
+)
+def test_data_loader_missing(params: dict[str, Any], executor: ParallelExecutor):
+    users = Users(missing=frozenset({2}))
+    loader = DataLoader(
+        DummyRequest(),
+        executor,
+        BatchLoader(),
+        users.fetch_one,
+        users.fetch_batch if params["batch"] else None,
+    )
+    found, missing = loader.load(1), loader.load(2)
+    assert found.result().id == 1
+    with pytest.raises(KeyError):
+        missing.result()
+    # the error is cached too
+    with pytest.raises(KeyError):
+        loader.load(2).result()
+    assert len(users.calls) == (1 if params["batch"] else 2)
+
+
+def test_data_loader_prime_clear(executor: ParallelExecutor):
+    users = Users()
+    loader = DataLoader(DummyRequest(), executor, BatchLoader(), users.fetch_one)
+    loader.prime(1, User(id=1, name="primed"))
+    assert loader.load(1).result().name == "primed"
+    loader.clear(1)
+    assert loader.load(1).result().name == "user 1"
+    assert users.calls == [1]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param({"batch": True}, id="batch route"),
+        pytest.param({"batch": False}, id="single calls"),
+    ],
+)
+def test_data_loader_in_worker_thread(params: dict[str, Any]):
+    executor = ParallelExecutor(max_workers=2, timeout=1)
+    users = Users()
+    request = DummyRequest()
+    loader = DataLoader(
+        request,
+        executor,
+        BatchLoader(),
+        users.fetch_one,
+        users.fetch_batch if params["batch"] else None,
+    )
+    results = executor.map(
+        request,
+        [lambda: loader.load(1).result().name, lambda: loader.load(2).result().name],
+    )
+    assert results == ["user 1", "user 2"]
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"settings": {}, "expected": {}},
+        {
+            "settings": {
+                "blacksmith.client.dataloader.api_user.users": [
+                    "key_param username",
+                    "batch_param usernames",
+                    "max_batch_size 50",
+                ],
+                "blacksmith.other.dataloader.api_user.users": ["key_param x"],
+            },
+            "expected": {
+                "api_user.users": {
+                    "key_param": "username",
+                    "key_field": "username",
+                    "batch_resource": None,
+                    "batch_param": "usernames",
+                    "max_batch_size": 50,
+                }
+            },
+        },
+    ],
+)
+def test_build_data_loaders(params: dict[str, Any], metrics: Any):
+    loaders = BlacksmithDataLoaderBuilder(params["settings"], metrics).build()
+    assert {key: vars(val) for key, val in loaders.items()} == params["expected"]
+
+
+class FakeResource:
+    def __init__(self, users: Users):
+        self.users = users
+
+    def get(self, params: dict[str, Any]) -> Any:
+        try:
+            return Ok(self.users.fetch_one(params["id"]))
+        except KeyError:
+            req = HTTPRequest("GET", "/users/{id}", path=params)
+            return Err(HTTPError("404", req, HTTPResponse(404, {}, {})))
+
+    def collection_get(self, params: dict[str, Any]) -> Any:
+        return Ok(self.users.fetch_batch(params["ids"]))
+
+
+class FakeClient:
+    def __init__(self, users: Users):
+        self.users = FakeResource(users)
+        self.batch = self.users
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param({"loaders": {}, "expected_calls": [1, 2]}, id="single calls"),
+        pytest.param(
+            {
+                "loaders": {
+                    "api.users": BatchLoader(batch_resource="batch", batch_param="ids")
+                },
+                "expected_calls": [[1, 2]],
+            },
+            id="batch route",
+        ),
+    ],
+)
+def test_blacksmith_loader(params: dict[str, Any], executor: ParallelExecutor):
+    users = Users()
+    cache = ClientCache()
+    request = DummyRequest()
+
+    def build() -> PyramidBlacksmith:
+        return PyramidBlacksmith(
+            request,
+            {"client": lambda client_name: FakeClient(users)},  # type: ignore
+            {},
+            client_cache=cache,
+            executors={"client": executor},
+            loaders={"client": params["loaders"]},
+        )
+
+    loader = build().loader("client", "api", "users")
+    assert [user.id for user in loader.load_many([1, 2, 1])] == [1, 2, 1]
+    assert sorted(users.calls) == params["expected_calls"]
+
+    # the loader is kept for the request, even if the binding is not reified
+    assert build().loader("client", "api", "users") is loader
+
+    with pytest.raises(AttributeError) as ctx:
+        build().loader("other", "api", "users")
+    assert str(ctx.value) == "Client 'other' is not registered"
+
+
+def test_blacksmith_loader_http_error(executor: ParallelExecutor):
+    users = Users(missing=frozenset({2}))
+    blacksmith = PyramidBlacksmith(
+        DummyRequest(),
+        {"client": lambda client_name: FakeClient(users)},  # type: ignore
+        {},
+        executors={"client": executor},
+        loaders={"client": {}},
+    )
+    loader = blacksmith.loader("client", "api", "users")
+    assert blacksmith.loader("client", "api", "users") is loader
+    with pytest.raises(UnwrapError) as ctx:
+        loader.load(2).result()
+    assert isinstance(ctx.value.__cause__, HTTPError)
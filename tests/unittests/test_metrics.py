@@ -0,0 +1,97 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from prometheus_client import CollectorRegistry, Counter, Gauge, values
+from pyramid.config import Configurator
+from pyramid.exceptions import ConfigurationError
+from webob import Request
+
+from pyramid_blacksmith.binding import BlacksmithPrometheusMetricsBuilder
+from pyramid_blacksmith.metrics import (
+    BlacksmithMetrics,
+    get_collector_registry,
+    is_multiprocess,
+    mark_process_dead,
+)
+
+
+@pytest.fixture
+def multiproc_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.delenv("prometheus_multiproc_dir", raising=False)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def no_multiproc(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("prometheus_multiproc_dir", raising=False)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+
+
+def test_get_collector_registry(no_multiproc: None):
+    assert is_multiprocess() is False
+    metrics = BlacksmithMetrics(registry=CollectorRegistry())
+    assert get_collector_registry(metrics) is metrics.registry
+    mark_process_dead(42)
+
+
+def test_get_collector_registry_multiprocess(
+    multiproc_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    assert is_multiprocess() is True
+    for pid in (1, 2):
+        # the value class is choosen while prometheus_client is imported
+        monkeypatch.setattr(
+            values, "ValueClass", values.MultiProcessValue(lambda pid=pid: pid)
+        )
+        registry = CollectorRegistry()
+        Counter("dummy", "Dummy", registry=registry).inc(pid)
+        Gauge(
+            "dummy_in_flight", "Dummy", registry=registry, multiprocess_mode="livesum"
+        ).set(pid)
+
+    registry = get_collector_registry()
+    assert registry.get_sample_value("dummy_total") == 3
+    assert registry.get_sample_value("dummy_in_flight") == 3
+
+    mark_process_dead(2)
+    registry = get_collector_registry()
+    assert registry.get_sample_value("dummy_total") == 3
+    assert registry.get_sample_value("dummy_in_flight") == 1
+
+
+@pytest.mark.parametrize(
+    "params", [{"settings": {"blacksmith.prometheus_multiprocess": "true"}}]
+)
+def test_metrics_builder_multiprocess_error(params: dict[str, Any], no_multiproc: None):
+    with pytest.raises(ConfigurationError) as ctx:
+        BlacksmithPrometheusMetricsBuilder(params["settings"]).build()
+    assert str(ctx.value) == (
+        "blacksmith.prometheus_multiprocess requires the environment "
+        "variable PROMETHEUS_MULTIPROC_DIR"
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "blacksmith.prometheus_metrics_path": "/metrics",
+                "blacksmith.client.service_discovery": "router",
+            }
+        }
+    ],
+)
+def test_metrics_view(
+    params: dict[str, Any],
+    config: Configurator,
+    registry: CollectorRegistry,
+    no_multiproc: None,
+):
+    app = config.make_wsgi_app()
+    resp = Request.blank("/metrics").get_response(app)
+    assert resp.status_code == 200
+    assert resp.headers["Content-Type"].startswith("text/plain; version=")
+    assert b"blacksmith_info" in resp.body
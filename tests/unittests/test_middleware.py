@@ -1,26 +1,62 @@
 import json
+import threading
+import time
 from typing import Any, cast
 
 import pytest
-from blacksmith import SyncPrometheusMiddleware
+from blacksmith import (
+    AsyncCircuitBreakerMiddleware,
+    AsyncHTTPAddHeadersMiddleware,
+    AsyncHTTPCacheMiddleware,
+    AsyncPrometheusMiddleware,
+    HTTPError,
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
+    SyncPrometheusMiddleware,
+)
+from blacksmith.domain.exceptions import HTTPTimeoutError
 from blacksmith.domain.model.middleware.circuit_breaker import PrometheusHook
 from blacksmith.domain.model.middleware.http_cache import CacheControlPolicy
 from blacksmith.domain.model.middleware.prometheus import PrometheusMetrics
-from purgatory import SyncInMemoryUnitOfWork
+from blacksmith.typing import ClientName, Path
+from prometheus_client import CollectorRegistry
+from purgatory import AsyncInMemoryUnitOfWork, SyncInMemoryUnitOfWork
 from pyramid.config import ConfigurationError
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 
+from pyramid_blacksmith.cache import AsyncTwoTierCache, SyncTwoTierCache
+from pyramid_blacksmith.metrics import BlacksmithMetrics
 from pyramid_blacksmith.middleware import (
+    AsyncCircuitBreakerBuilder,
+    AsyncHTTPCacheBuilder,
+    AsyncHTTPStaticHeadersBuilder,
+    AsyncPrometheusMetricsBuilder,
     CircuitBreakerBuilder,
+    ConcurrencyLimitBuilder,
+    ConcurrencyLimiter,
+    ConcurrencyLimitError,
+    HedgingBuilder,
     HTTPCacheBuilder,
     HTTPStaticHeadersBuilder,
     PrometheusMetricsBuilder,
+    RetryBudget,
+    RetryBuilder,
+    SingleFlightBuilder,
+    SyncConcurrencyLimitMiddleware,
+    SyncHedgingMiddleware,
+    SyncRetryMiddleware,
+    SyncSingleFlightMiddleware,
+    clear_redis_clients,
 )
+from pyramid_blacksmith.middleware_factory import DeadlineExceededError
 from tests.unittests.fixtures import (
     DummyCachePolicy,
     DummyPurgatoryUow,
     DummySerializer,
 )
+from tests.unittests.resources import dummies  # noqa: F401
 
 
 @pytest.mark.parametrize(
@@ -35,6 +71,84 @@ def test_prometheus_metrics_builder(
     assert isinstance(prom, SyncPrometheusMiddleware)
 
 
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key1": """
+                    redis   redis://foo.localhost/0
+                """,
+                "key2": """
+                    redis   redis://foo.localhost/0
+                """,
+                "key2.redis_pool": """
+                    max_connections         10
+                    socket_timeout          0.5
+                    socket_connect_timeout  0.2
+                    health_check_interval   30
+                """,
+                "key3": """
+                    redis   redis://foo.localhost/0
+                """,
+            },
+        },
+    ],
+)
+def test_http_caching_builder_shared_redis(
+    params: dict[str, Any], metrics: PrometheusMetrics
+):
+    cache1 = HTTPCacheBuilder(params["settings"], "key1", metrics).build()._cache
+    cache2 = HTTPCacheBuilder(params["settings"], "key2", metrics).build()._cache
+    cache3 = HTTPCacheBuilder(params["settings"], "key3", metrics).build()._cache
+    assert cache1 is cache3
+    assert cache1 is not cache2
+
+    pool = cast(Redis, cache2).connection_pool
+    assert pool.max_connections == 10
+    assert pool.connection_kwargs == {
+        "db": 0,
+        "host": "foo.localhost",
+        "socket_timeout": 0.5,
+        "socket_connect_timeout": 0.2,
+        "health_check_interval": 30,
+    }
+
+    async_cache = AsyncHTTPCacheBuilder(params["settings"], "key1", metrics).build()
+    assert isinstance(async_cache._cache, AsyncRedis)
+
+    clear_redis_clients()
+    cache4 = HTTPCacheBuilder(params["settings"], "key1", metrics).build()._cache
+    assert cache4 is not cache1
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key": """
+                    redis           redis://foo.localhost/0
+                    l1_max_entries  100
+                    l1_max_bytes    1000000
+                """,
+            },
+        },
+    ],
+)
+def test_http_caching_builder_l1(params: dict[str, Any], metrics: PrometheusMetrics):
+    cache = HTTPCacheBuilder(params["settings"], "key", metrics).build()._cache
+    assert isinstance(cache, SyncTwoTierCache)
+    assert isinstance(cache.backend, Redis)
+    assert (cache.l1.max_entries, cache.l1.max_bytes) == (100, 1000000)
+
+    async_cache = (
+        AsyncHTTPCacheBuilder(params["settings"], "key", metrics).build()._cache
+    )
+    assert isinstance(async_cache, AsyncTwoTierCache)
+    assert isinstance(async_cache.backend, AsyncRedis)
+
+
 @pytest.mark.parametrize(
     "params",
     [
@@ -183,3 +297,640 @@ def test_http_add_headers(params: dict[str, Any], metrics: PrometheusMetrics):
     headersb = HTTPStaticHeadersBuilder(params["settings"], "key", metrics)
     headers = headersb.build()
     assert headers.headers == params["headers"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key": """
+                    redis   redis://foo.localhost/0
+                    threshold 3
+                """,
+                "key.static": """
+                    User-Agent: blacksmith
+                """,
+            },
+        },
+    ],
+)
+def test_async_builders(params: dict[str, Any], metrics: PrometheusMetrics):
+    prom = AsyncPrometheusMetricsBuilder(params["settings"], "key", metrics).build()
+    assert isinstance(prom, AsyncPrometheusMiddleware)
+
+    circuit = AsyncCircuitBreakerBuilder(params["settings"], "key", metrics).build()
+    assert isinstance(circuit, AsyncCircuitBreakerMiddleware)
+    assert isinstance(circuit.circuit_breaker.uow, AsyncInMemoryUnitOfWork)
+    assert circuit.circuit_breaker.default_threshold == 3
+
+    caching = AsyncHTTPCacheBuilder(params["settings"], "key", metrics).build()
+    assert isinstance(caching, AsyncHTTPCacheMiddleware)
+    assert isinstance(caching._cache, AsyncRedis)
+
+    headers = AsyncHTTPStaticHeadersBuilder(
+        params["settings"], "key.static", metrics
+    ).build()
+    assert isinstance(headers, AsyncHTTPAddHeadersMiddleware)
+    assert headers.headers == {"User-Agent": "blacksmith"}
+
+
+class SlowUpstream:
+    def __init__(self):
+        self.calls = 0
+        self.barrier = threading.Barrier(2)
+        self.release = threading.Event()
+
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        self.calls += 1
+        if not self.release.is_set():
+            self.barrier.wait(1)
+            assert self.release.wait(1)
+        if req.path.get("fail"):
+            raise ConnectionError("upstream is down")
+        return HTTPResponse(200, {"x-call": str(self.calls)}, {"id": 1})
+
+
+class FakeLock:
+    def acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, Any] = {}
+
+    def lock(self, name: str, timeout: float, blocking_timeout: float) -> FakeLock:
+        return FakeLock()
+
+    def get(self, key: str) -> Any:
+        return self.data.get(key)
+
+    def set(self, key: str, val: Any, px: int) -> None:
+        self.data[key] = val
+
+
+def fly(
+    middleware: SyncSingleFlightMiddleware,
+    upstream: SlowUpstream,
+    requests: list[HTTPRequest],
+) -> list[Any]:
+    handle = middleware(upstream)
+    results: list[Any] = [None] * len(requests)
+
+    def call(idx: int) -> None:
+        try:
+            results[idx] = handle(requests[idx], "api", "/", HTTPTimeout())
+        except Exception as exc:
+            results[idx] = exc
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(requests))]
+    threads[0].start()
+    upstream.barrier.wait(1)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)  # let the followers join the flight
+    upstream.release.set()
+    for thread in threads:
+        thread.join(2)
+    return results
+
+
+def test_single_flight():
+    middleware = SyncSingleFlightMiddleware(headers=["Authorization"])
+    upstream = SlowUpstream()
+    req = HTTPRequest("GET", "http://api/{id}", path={"id": 1})
+    results = fly(middleware, upstream, [req, req])
+    assert upstream.calls == 1
+    assert [r.headers for r in results] == [{"x-call": "1"}, {"x-call": "1"}]
+    assert results[0] is not results[1]
+    assert middleware._flights == {}
+
+
+def test_single_flight_key():
+    middleware = SyncSingleFlightMiddleware()
+    req = HTTPRequest("GET", "http://api/{id}", path={"id": 1})
+    assert middleware.get_key(req, "api") == middleware.get_key(
+        HTTPRequest("GET", "http://api/1"), "api"
+    )
+    for headers in ({"authorization": "Bearer x"}, {"Cookie": "s=x"}):
+        assert middleware.get_key(req, "api") != middleware.get_key(
+            HTTPRequest("GET", "http://api/1", headers=headers), "api"
+        )
+    assert middleware.get_key(
+        HTTPRequest("GET", "http://api/1", headers={"A": "1", "B": "2"}), "api"
+    ) == middleware.get_key(
+        HTTPRequest("GET", "http://api/1", headers={"b": "2", "a": "1"}), "api"
+    )
+    assert middleware.get_key(req, "api") != middleware.get_key(
+        HTTPRequest("GET", "http://api/1", querystring={"q": "x"}), "api"
+    )
+    assert middleware.get_key(HTTPRequest("POST", "http://api/1"), "api") is None
+
+
+def test_single_flight_key_headers():
+    middleware = SyncSingleFlightMiddleware(headers=["Authorization"])
+    req = HTTPRequest("GET", "http://api/1", headers={"Authorization": "Bearer x"})
+    assert middleware.get_key(req, "api") == middleware.get_key(
+        HTTPRequest(
+            "GET",
+            "http://api/1",
+            headers={"Authorization": "Bearer x", "X-Request-Id": "1"},
+        ),
+        "api",
+    )
+    assert middleware.get_key(req, "api") != middleware.get_key(
+        HTTPRequest("GET", "http://api/1", headers={"Authorization": "Bearer y"}),
+        "api",
+    )
+
+
+def test_single_flight_error():
+    middleware = SyncSingleFlightMiddleware()
+    upstream = SlowUpstream()
+    req = HTTPRequest("GET", "http://api/{fail}", path={"fail": 1})
+    results = fly(middleware, upstream, [req, req])
+    assert upstream.calls == 1
+    assert isinstance(results[0], ConnectionError)
+    assert results[1] is results[0]
+
+
+def test_single_flight_redis():
+    redis = FakeRedis()
+    req = HTTPRequest("GET", "http://api/1")
+    upstream = SlowUpstream()
+    upstream.release.set()
+    handle = SyncSingleFlightMiddleware(redis=redis)(upstream)
+    resp = handle(req, "api", "/", HTTPTimeout())
+    assert len(redis.data) == 1
+
+    # another process receives the shared response
+    handle = SyncSingleFlightMiddleware(redis=redis)(upstream)
+    assert handle(req, "api", "/", HTTPTimeout()) == resp
+    assert upstream.calls == 1
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key": """
+                    methods       GET HEAD
+                    headers       Authorization Accept-Language
+                    redis         redis://foo.localhost/0
+                    lock_timeout  5
+                    result_ttl    0.5
+                """,
+            },
+        },
+    ],
+)
+def test_single_flight_builder(params: dict[str, Any], metrics: PrometheusMetrics):
+    middleware = SingleFlightBuilder(params["settings"], "key", metrics).build()
+    assert middleware.methods == {"GET", "HEAD"}
+    assert middleware.headers == ["authorization", "accept-language"]
+    assert isinstance(middleware.redis, Redis)
+    assert (middleware.lock_timeout, middleware.result_ttl) == (5, 0.5)
+
+    middleware = SingleFlightBuilder({}, "key", metrics).build()
+    assert middleware.methods == {"GET"}
+    assert middleware.headers is None
+    assert middleware.redis is None
+
+
+def test_concurrency_limiter_fixed():
+    limiter = ConcurrencyLimiter(limit=2)
+    assert limiter.acquire()
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release(10, failed=True)
+    assert limiter.limit == 2
+    assert limiter.acquire()
+
+
+def test_concurrency_limiter_aimd():
+    limiter = ConcurrencyLimiter(
+        limit=4, mode="aimd", min_limit=2, max_limit=5, latency_target=1
+    )
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(0.1, failed=False)
+    assert limiter.limit == pytest.approx(5, abs=0.1)
+    limiter.acquire()
+    limiter.release(0.1, failed=False)
+    assert limiter.limit == 5
+
+    limiter.acquire()
+    limiter.release(2, failed=False)
+    assert limiter.limit == 4.5
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(0.1, failed=True)
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_concurrency_limit_middleware():
+    metrics = BlacksmithMetrics(registry=CollectorRegistry())
+    middleware = SyncConcurrencyLimitMiddleware({"limit": 1}, metrics)
+    calls: list[Any] = []
+
+    def upstream(
+        req: HTTPRequest, client_name: ClientName, path: Path, timeout: HTTPTimeout
+    ) -> HTTPResponse:
+        calls.append(req)
+        # a second request while this one is in flight
+        with pytest.raises(ConcurrencyLimitError) as ctx:
+            handle(req, client_name, path, timeout)
+        assert str(ctx.value) == "Concurrency limit of 1 requests reached for srv/None"
+        if req.method == "POST":
+            raise HTTPTimeoutError("timeout", req, HTTPResponse(500, {}, None))
+        return HTTPResponse(200, {}, {})
+
+    handle = middleware(upstream)
+    resp = handle(HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout())
+    assert resp.status_code == 200
+    with pytest.raises(HTTPTimeoutError):
+        handle(HTTPRequest("POST", "http://srv/"), "api", "/", HTTPTimeout())
+    assert len(calls) == 2
+
+    labels = {"service": "srv", "version": ""}
+    registry = metrics.registry
+    assert registry.get_sample_value("blacksmith_concurrency_limit", labels) == 1
+    assert registry.get_sample_value("blacksmith_concurrency_in_flight", labels) == 0
+    assert (
+        registry.get_sample_value("blacksmith_concurrency_rejected_total", labels) == 2
+    )
+
+
+@pytest.mark.parametrize("params", [{}])
+def test_deadline_exceeded_not_a_failure(metrics: PrometheusMetrics):
+    circuit = CircuitBreakerBuilder({"key": "threshold 1"}, "key", metrics).build()
+    limit = SyncConcurrencyLimitMiddleware({"limit": 4, "mode": "aimd"})
+    calls: list[Any] = []
+
+    def upstream(
+        req: HTTPRequest, client_name: ClientName, path: Path, timeout: HTTPTimeout
+    ) -> HTTPResponse:
+        calls.append(req)
+        raise DeadlineExceededError("Deadline exceeded")
+
+    handle = circuit(limit(upstream))
+    for _ in range(3):
+        with pytest.raises(DeadlineExceededError):
+            handle(HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout())
+    # the circuit is not opened, the limit is unchanged
+    assert len(calls) == 3
+    limiter = limit.get_limiter("srv", None)
+    assert (limiter.limit, limiter.in_flight) == (4, 0)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key": """
+                    limit           10
+                    mode            aimd
+                    min_limit       2
+                    max_limit       50
+                    latency_target  0.5
+                    backoff         0.8
+                """,
+            },
+            "expected": {
+                "limit": 10,
+                "mode": "aimd",
+                "min_limit": 2,
+                "max_limit": 50,
+                "latency_target": 0.5,
+                "backoff": 0.8,
+            },
+        },
+        {"settings": {}, "expected": {}},
+    ],
+)
+def test_concurrency_limit_builder(params: dict[str, Any], metrics: PrometheusMetrics):
+    middleware = ConcurrencyLimitBuilder(params["settings"], "key", metrics).build()
+    assert middleware.limiter_kwargs == params["expected"]
+    assert middleware.metrics is metrics
+
+
+@pytest.mark.parametrize("params", [{"settings": {"key": "mode gradient"}}])
+def test_concurrency_limit_builder_error(
+    params: dict[str, Any], metrics: PrometheusMetrics
+):
+    with pytest.raises(ConfigurationError) as ctx:
+        ConcurrencyLimitBuilder(params["settings"], "key", metrics).build()
+    assert str(ctx.value) == "Invalid mode gradient in setting key: not in fixed, aimd"
+
+
+class FlakyUpstream:
+    def __init__(self, *errors: Exception | None):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        self.calls += 1
+        error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise error
+        return HTTPResponse(200, {}, {})
+
+
+def http_error(status_code: int) -> HTTPError:
+    return HTTPError(
+        f"{status_code}", HTTPRequest("GET", "/"), HTTPResponse(status_code, {}, {})
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "errors": [http_error(503), HTTPTimeoutError("timeout")],
+            "request": HTTPRequest("GET", "http://srv/"),
+            "expected_calls": 3,
+            "expected_error": None,
+        },
+        {
+            "errors": [http_error(503)] * 3,
+            "request": HTTPRequest("GET", "http://srv/"),
+            "expected_calls": 3,
+            "expected_error": HTTPError,
+        },
+        {
+            "errors": [http_error(500)],
+            "request": HTTPRequest("GET", "http://srv/"),
+            "expected_calls": 1,
+            "expected_error": HTTPError,
+        },
+        {
+            "errors": [http_error(503)],
+            "request": HTTPRequest("POST", "http://srv/"),
+            "expected_calls": 1,
+            "expected_error": HTTPError,
+        },
+        {
+            "errors": [http_error(503)],
+            "request": HTTPRequest(
+                "POST", "http://srv/", headers={"Idempotency-Key": "abc"}
+            ),
+            "expected_calls": 2,
+            "expected_error": None,
+        },
+        {
+            "errors": [ValueError("bug")],
+            "request": HTTPRequest("GET", "http://srv/"),
+            "expected_calls": 1,
+            "expected_error": ValueError,
+        },
+    ],
+)
+def test_retry_middleware(params: dict[str, Any]):
+    delays: list[float] = []
+    upstream = FlakyUpstream(*params["errors"])
+    handle = SyncRetryMiddleware(max_attempts=3, backoff=1, sleep=delays.append)(
+        upstream
+    )
+    if params["expected_error"]:
+        with pytest.raises(params["expected_error"]):
+            handle(params["request"], "api", "/", HTTPTimeout())
+    else:
+        assert handle(params["request"], "api", "/", HTTPTimeout()).status_code == 200
+    assert upstream.calls == params["expected_calls"]
+    assert len(delays) == params["expected_calls"] - 1
+    assert all(0 <= delay <= 2**idx for idx, delay in enumerate(delays))
+
+
+def test_retry_budget():
+    metrics = BlacksmithMetrics(registry=CollectorRegistry())
+    budget = RetryBudget(ratio=0.5, min_tokens=1, capacity=2)
+    upstream = FlakyUpstream(*[http_error(503)] * 10)
+    handle = SyncRetryMiddleware(
+        max_attempts=2, budget=budget, metrics=metrics, sleep=lambda delay: None
+    )(upstream)
+    req = HTTPRequest("GET", "http://srv/")
+    for _ in range(3):
+        with pytest.raises(HTTPError):
+            handle(req, "api", "/", HTTPTimeout())
+    # 1 + 0.5, retry, 0.5 + 0.5, retry, 0 + 0.5, exhausted
+    assert upstream.calls == 5
+    labels = {"client_name": "api"}
+    registry = metrics.registry
+    assert registry.get_sample_value("blacksmith_retry_total", labels) == 2
+    assert (
+        registry.get_sample_value("blacksmith_retry_budget_exhausted_total", labels)
+        == 1
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key": """
+                    max_attempts  4
+                    backoff       0.2
+                    max_backoff   5
+                    statuses      429 503
+                    methods       GET
+                """,
+                "key.budget": """
+                    ratio       0.2
+                    min_tokens  5
+                    capacity    50
+                """,
+            },
+        },
+    ],
+)
+def test_retry_builder(params: dict[str, Any], metrics: PrometheusMetrics):
+    middleware = RetryBuilder(params["settings"], "key", metrics).build()
+    assert (middleware.max_attempts, middleware.backoff, middleware.max_backoff) == (
+        4,
+        0.2,
+        5,
+    )
+    assert middleware.statuses == {429, 503}
+    assert middleware.methods == {"GET"}
+    budget = middleware.budget
+    assert (budget.ratio, budget.tokens, budget.capacity) == (0.2, 5, 50)
+    assert middleware.metrics is metrics
+
+
+class SlowInstances:
+    def __init__(self, *delays: float):
+        self.delays = list(delays)
+        self.urls: list[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        with self._lock:
+            idx = len(self.urls)
+            delay = self.delays[idx]
+            self.urls.append(req.url_pattern)
+            # a load balancer would choose another instance
+            req.url_pattern = f"http://instance{idx}/"
+        time.sleep(abs(delay))
+        if delay < 0:
+            raise ConnectionError("upstream is down")
+        return HTTPResponse(200, {"x-instance": str(idx)}, {})
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"delays": [0], "expected_instance": "0", "expected_hedges": 0},
+        {"delays": [0.5, 0], "expected_instance": "1", "expected_hedges": 1},
+        {"delays": [0.05, 0.5], "expected_instance": "0", "expected_hedges": 1},
+    ],
+)
+def test_hedging_middleware(params: dict[str, Any]):
+    metrics = BlacksmithMetrics(registry=CollectorRegistry())
+    middleware = SyncHedgingMiddleware(delay=0.02, metrics=metrics)
+    upstream = SlowInstances(*params["delays"])
+    resp = middleware(upstream)(
+        HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout()
+    )
+    assert resp.headers == {"x-instance": params["expected_instance"]}
+    assert upstream.urls == ["http://srv/"] * len(params["delays"])
+
+    labels = {"client_name": "api"}
+    registry = metrics.registry
+    hedges = registry.get_sample_value("blacksmith_hedge_total", labels) or 0
+    won = registry.get_sample_value("blacksmith_hedge_won_total", labels) or 0
+    assert hedges == params["expected_hedges"]
+    assert won == (params["expected_instance"] == "1")
+    middleware.pool.shutdown()
+
+
+def test_hedging_middleware_errors():
+    middleware = SyncHedgingMiddleware(delay=0.01)
+    handle = middleware(SlowInstances(-0.05, 0.05))
+    assert handle(
+        HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout()
+    ).headers == {"x-instance": "1"}
+
+    handle = middleware(SlowInstances(-0.02, -0.05))
+    with pytest.raises(ConnectionError):
+        handle(HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout())
+
+    handle = middleware(SlowInstances(0.05))
+    resp = handle(HTTPRequest("POST", "http://srv/"), "api", "/", HTTPTimeout())
+    assert resp.status_code == 200
+    middleware.pool.shutdown()
+
+
+def test_hedging_middleware_budget():
+    middleware = SyncHedgingMiddleware(
+        delay=0.01, budget=RetryBudget(ratio=0, min_tokens=0)
+    )
+    upstream = SlowInstances(0.03)
+    handle = middleware(upstream)
+    handle(HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout())
+    assert len(upstream.urls) == 1
+    middleware.pool.shutdown()
+
+
+def test_hedging_middleware_busy():
+    metrics = BlacksmithMetrics(registry=CollectorRegistry())
+    middleware = SyncHedgingMiddleware(delay=0.01, max_workers=1, metrics=metrics)
+    upstream = SlowInstances(0.2, 0.05)
+    handle = middleware(upstream)
+    thread = threading.Thread(
+        target=handle,
+        args=(HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout()),
+    )
+    thread.start()
+    while not upstream.urls:
+        time.sleep(0.001)
+
+    # the only thread is busy, the request is sent without waiting for it
+    resp = handle(HTTPRequest("GET", "http://srv/"), "api", "/", HTTPTimeout())
+    assert resp.headers == {"x-instance": "1"}
+    thread.join()
+    assert len(upstream.urls) == 2
+    hedges = metrics.registry.get_sample_value(
+        "blacksmith_hedge_total", {"client_name": "api"}
+    )
+    assert not hedges
+    fast, slow = middleware.latencies
+    assert 0.05 <= fast < 0.2 <= slow
+    middleware.pool.shutdown()
+
+
+def test_hedging_delay():
+    middleware = SyncHedgingMiddleware(
+        delay=1, percentile=95, min_delay=0.05, min_samples=10
+    )
+    middleware.latencies.extend([0.01] * 9)
+    assert middleware.get_delay() == 1
+    middleware.latencies.extend([0.01] * 90 + [0.2] * 10)
+    assert middleware.get_delay() == 0.2
+    middleware.latencies.clear()
+    middleware.latencies.extend([0.01] * 100)
+    assert middleware.get_delay() == 0.05
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {
+            "settings": {
+                "key": """
+                    delay        p99
+                    min_delay    0.02
+                    max_workers  4
+                    window       100
+                    min_samples  10
+                    methods      GET HEAD
+                """,
+                "key.budget": """
+                    min_tokens  2
+                """,
+            },
+            "expected": (None, 99, 0.02, 4, 100, 10, {"GET", "HEAD"}, 0.05),
+        },
+        {
+            "settings": {"key": "delay 0.3"},
+            "expected": (0.3, None, 0.01, 16, 1000, 20, {"GET"}, 0.05),
+        },
+    ],
+)
+def test_hedging_builder(params: dict[str, Any], metrics: PrometheusMetrics):
+    middleware = HedgingBuilder(params["settings"], "key", metrics).build()
+    assert (
+        middleware.delay if middleware.percentile is None else None,
+        middleware.percentile,
+        middleware.min_delay,
+        middleware.pool.max_workers,
+        middleware.latencies.maxlen,
+        middleware.min_samples,
+        middleware.methods,
+        middleware.budget.ratio,
+    ) == params["expected"]
@@ -1,3 +1,5 @@
+import asyncio
+import time
 from typing import Any
 
 import pytest
@@ -7,8 +9,14 @@ from blacksmith.typing import ClientName, Path
 from pyramid.testing import DummyRequest
 
 from pyramid_blacksmith.middleware_factory import (
+    START_TIME_KEY,
+    AbstractAsyncMiddlewareFactoryBuilder,
     AcceptLanguageFactoryBuilder,
+    AsyncDeadlineFactoryBuilder,
+    DeadlineExceededError,
+    DeadlineFactoryBuilder,
     ForwardHeaderFactoryBuilder,
+    LazyForwardHeaderFactoryBuilder,
 )
 
 
@@ -82,6 +90,53 @@ def test_forward_header_factory_builder(
     assert resp.headers == params["expected"]
 
 
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {
+                "pyramid_request": DummyRequest(headers={"Accept-Encoding": "br"}),
+                "blacksmith_request": HTTPRequest("GET", "/", headers={}),
+                "expected": None,
+            },
+            id="no header to forward",
+        ),
+        pytest.param(
+            {
+                "pyramid_request": DummyRequest(
+                    headers={"Accept-Language": "fr", "Authorization": "Bearer abc"}
+                ),
+                "blacksmith_request": HTTPRequest(
+                    "GET", "/", headers={"Accept-Language": "en"}
+                ),
+                "expected": {"Accept-Language": "fr", "Authorization": "Bearer abc"},
+            },
+            id="forward headers",
+        ),
+    ],
+)
+def test_lazy_forward_header_factory_builder(params: dict[str, Any]):
+    headers: dict[str, Any] = {"Authorization": True, "Accept-Language": True}
+    facto = LazyForwardHeaderFactoryBuilder(**headers)
+    pyramid_request = params["pyramid_request"]
+    middleware = facto(pyramid_request)
+    assert facto(pyramid_request) is middleware
+    if params["expected"] is None:
+        assert middleware is None
+        return
+
+    assert middleware is not None
+    pyramid_request.headers["Authorization"] = "Bearer xyz"
+    query = middleware(echo_middleware)
+    resp = query(params["blacksmith_request"], "cli", "/", HTTPTimeout())
+    assert resp.headers == {**params["expected"], "Authorization": "Bearer xyz"}
+
+    # the headers are extracted once per pyramid request
+    pyramid_request.headers["Authorization"] = "Bearer abc"
+    resp = query(HTTPRequest("GET", "/", headers={}), "cli", "/", HTTPTimeout())
+    assert resp.headers == {**params["expected"], "Authorization": "Bearer xyz"}
+
+
 @pytest.mark.parametrize(
     "params",
     [
@@ -115,3 +170,116 @@ def test_accept_language_factory_builder(params: dict[str, Any]):
     query = middleware(echo_middleware)
     resp = query(params["blacksmith_request"], "cli", "/", HTTPTimeout())
     assert resp.headers == params["expected"]
+
+
+def timeout_middleware(
+    req: HTTPRequest,
+    client_name: ClientName,
+    path: Path,
+    timeout: HTTPTimeout,
+) -> HTTPResponse:
+    return HTTPResponse(200, req.headers, json=timeout)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param(
+            {
+                "builder": {},
+                "headers": {},
+                "elapsed": 0,
+                "expected": None,
+            },
+            id="no deadline",
+        ),
+        pytest.param(
+            {
+                "builder": {"timeout": "2"},
+                "headers": {},
+                "elapsed": 0.5,
+                "expected": (1.5, 1.5),
+            },
+            id="default budget",
+        ),
+        pytest.param(
+            {
+                "builder": {"timeout": "2"},
+                "headers": {"X-Request-Timeout-Ms": "800"},
+                "elapsed": 0.5,
+                "expected": (0.3, 0.3),
+            },
+            id="inbound header",
+        ),
+        pytest.param(
+            {
+                "builder": {"header": "X-Deadline", "timeout": "20"},
+                "headers": {"X-Deadline": "invalid"},
+                "elapsed": 0,
+                "expected": (20, 15),
+            },
+            id="invalid header",
+        ),
+    ],
+)
+def test_deadline_factory_builder(params: dict[str, Any]):
+    facto = DeadlineFactoryBuilder(**params["builder"])
+    pyramid_request = DummyRequest(headers=params["headers"])
+    pyramid_request.environ[START_TIME_KEY] = time.monotonic() - params["elapsed"]
+    middleware = facto(pyramid_request)
+    if params["expected"] is None:
+        assert middleware is None
+        return
+
+    assert middleware is not None
+    query = middleware(timeout_middleware)
+    req = HTTPRequest("GET", "/", headers={})
+    resp = query(req, "cli", "/", HTTPTimeout(read=30, connect=15))
+    read, connect = params["expected"]
+    assert resp.json.read == pytest.approx(read, abs=0.05)
+    assert resp.json.connect == pytest.approx(connect, abs=0.05)
+    header = int(req.headers[facto.header])
+    assert header == pytest.approx(read * 1000, abs=50)
+
+
+def test_deadline_exceeded():
+    facto = DeadlineFactoryBuilder(timeout="1", min_timeout="0.1")
+    pyramid_request = DummyRequest()
+    pyramid_request.environ[START_TIME_KEY] = time.monotonic() - 0.95
+    calls = []
+
+    def upstream(*args: Any) -> HTTPResponse:
+        calls.append(args)
+        return HTTPResponse(200, {}, json={})
+
+    query = facto(pyramid_request)(upstream)  # type: ignore
+    with pytest.raises(DeadlineExceededError) as ctx:
+        query(HTTPRequest("GET", "/", headers={}), "cli", "/", HTTPTimeout())
+    assert str(ctx.value) == "cli - GET / - Deadline exceeded before calling GET /"
+    assert calls == []
+
+
+def test_deadline_shared_by_clients():
+    facto = DeadlineFactoryBuilder(timeout="1")
+    pyramid_request = DummyRequest()
+    middleware = facto(pyramid_request)
+    time.sleep(0.01)
+    assert facto(pyramid_request).deadline == middleware.deadline  # type: ignore
+
+
+def test_async_deadline_factory_builder():
+    facto = AsyncDeadlineFactoryBuilder(timeout="2")
+    assert isinstance(facto, AbstractAsyncMiddlewareFactoryBuilder)
+    pyramid_request = DummyRequest()
+
+    async def upstream(
+        req: HTTPRequest, client_name: ClientName, path: Path, timeout: HTTPTimeout
+    ) -> HTTPResponse:
+        return HTTPResponse(200, req.headers, json=timeout)
+
+    query = facto(pyramid_request)(upstream)  # type: ignore
+    req = HTTPRequest("GET", "/", headers={})
+    resp = asyncio.run(query(req, "cli", "/", HTTPTimeout(read=30, connect=1)))
+    assert resp.json.read == pytest.approx(2, abs=0.05)
+    assert resp.json.connect == 1
+    assert int(req.headers["X-Request-Timeout-Ms"]) > 1900
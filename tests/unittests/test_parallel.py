@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from typing import Any
+
+import pytest
+from pyramid.testing import DummyRequest
+from pyramid.threadlocal import get_current_request
+
+from pyramid_blacksmith.parallel import EventLoopThread, ParallelExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = ParallelExecutor(max_workers=2, timeout=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_parallel_executor_map(executor: ParallelExecutor):
+    request = DummyRequest()
+
+    def call(val: int) -> Any:
+        return (
+            val,
+            threading.current_thread().name.startswith("blacksmith"),
+            get_current_request() is request,
+        )
+
+    results = executor.map(request, [lambda: call(1), lambda: call(2)])
+    assert results == [(1, True, True), (2, True, True)]
+    assert get_current_request() is None
+
+
+def test_parallel_executor_error(executor: ParallelExecutor):
+    def fail() -> int:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError) as ctx:
+        executor.map(DummyRequest(), [lambda: 1, fail])
+    assert str(ctx.value) == "boom"
+
+
+def test_parallel_executor_timeout(executor: ParallelExecutor):
+    with pytest.raises(TimeoutError) as ctx:
+        executor.map(DummyRequest(), [lambda: time.sleep(0.2), lambda: 1], 0.05)
+    assert str(ctx.value) == "1 of 2 calls did not complete in 0.05 seconds"
+
+
+def test_parallel_executor_nested(executor: ParallelExecutor):
+    request = DummyRequest()
+
+    def call(val: int) -> list[int]:
+        # every worker waits for the nested calls, they run inline
+        return executor.map(request, [lambda: val, lambda: val * 10])
+
+    results = executor.map(request, [lambda: call(1), lambda: call(2)])
+    assert results == [[1, 10], [2, 20]]
+
+
+def test_parallel_executor_shutdown(executor: ParallelExecutor):
+    pool = executor.executor
+    executor.shutdown()
+    assert executor.executor is not pool
+
+
+def test_event_loop_thread():
+    event_loop = EventLoopThread()
+
+    async def get_loop() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    loop = event_loop.run(get_loop())
+    assert event_loop.run(get_loop()) is loop
+    assert event_loop._thread is not None
+    assert event_loop._thread.name == "blacksmith-async"
+
+    with pytest.raises(TimeoutError):
+        event_loop.run(asyncio.sleep(1), timeout=0.01)
+
+    event_loop.shutdown()
+    assert loop.is_closed()
+    loop = event_loop.run(get_loop())
+    assert not loop.is_closed()
+
+    event_loop.after_fork()
+    assert event_loop._loop is None
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,212 @@
+import threading
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from blacksmith import (
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
+    SyncAbstractServiceDiscovery,
+    SyncAbstractTransport,
+    SyncClientFactory,
+)
+from blacksmith.domain.exceptions import UnregisteredServiceException
+from blacksmith.typing import ClientName, Path, ServiceName, Url, Version
+
+from pyramid_blacksmith import sd as sd_module
+from pyramid_blacksmith.sd import (
+    SyncAbstractInstancesDiscovery,
+    SyncCachedServiceDiscovery,
+    SyncLoadBalancedDiscovery,
+    SyncLoadBalancerMiddleware,
+    SyncNomadInstancesDiscovery,
+)
+from tests.unittests.resources import dummies  # noqa: F401
+
+
+class FakeSD(SyncAbstractServiceDiscovery):
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.called = threading.Event()
+
+    def get_endpoint(self, service: ServiceName, version: Version) -> Url:
+        self.calls += 1
+        try:
+            if self.fail:
+                raise ConnectionError("consul is down")
+            return f"http://{service}-{version}.{self.calls}"
+        finally:
+            self.called.set()
+
+
+class FakeInstancesSD(SyncAbstractInstancesDiscovery):
+    def __init__(self, *endpoints: Url):
+        self.endpoints = list(endpoints)
+
+    def get_endpoint(self, service: ServiceName, version: Version) -> Url:
+        return self.endpoints[0]
+
+    def get_endpoints(self, service: ServiceName, version: Version) -> list[Url]:
+        return self.endpoints
+
+
+class UrlTransport(SyncAbstractTransport):
+    def __init__(self, lb: SyncLoadBalancedDiscovery):
+        self.lb = lb
+        self.outstanding: list[dict[Url, int]] = []
+
+    def __call__(
+        self,
+        req: HTTPRequest,
+        client_name: ClientName,
+        path: Path,
+        timeout: HTTPTimeout,
+    ) -> HTTPResponse:
+        self.outstanding.append(dict(self.lb.outstanding))
+        return HTTPResponse(200, headers={}, json={"url": req.url_pattern})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(sd_module, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def wait_refresh(fake: FakeSD) -> None:
+    assert fake.called.wait(1)
+    for thread in threading.enumerate():
+        if thread.name == "blacksmith-sd-refresh":
+            thread.join(1)
+
+
+def test_cached_sd_ttl(clock: Clock):
+    fake = FakeSD()
+    sd = SyncCachedServiceDiscovery(fake, ttl=10, stale_ttl=20)
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.1"
+    clock.now = 9
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.1"
+    assert fake.calls == 1
+
+    # stale while revalidate
+    fake.called.clear()
+    clock.now = 15
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.1"
+    wait_refresh(fake)
+    assert fake.calls == 2
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.2"
+
+    # too stale, fetched synchronously
+    clock.now = 50
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.3"
+
+
+def test_cached_sd_serve_last_known(clock: Clock):
+    fake = FakeSD()
+    sd = SyncCachedServiceDiscovery(fake, ttl=10, stale_ttl=20)
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.1"
+    fake.fail = True
+
+    fake.called.clear()
+    clock.now = 15
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.1"
+    wait_refresh(fake)
+
+    clock.now = 50
+    assert sd.get_endpoint("api", "v1") == "http://api-v1.1"
+    assert fake.calls == 3
+
+    with pytest.raises(ConnectionError):
+        sd.get_endpoint("api", "v2")
+
+
+@pytest.mark.parametrize("params", [{"max_entries": 2}])
+def test_cached_sd_max_entries(params: dict[str, Any], clock: Clock):
+    fake = FakeSD()
+    sd = SyncCachedServiceDiscovery(fake, max_entries=params["max_entries"])
+    sd.get_endpoint("api", "v1")
+    sd.get_endpoint("api", "v2")
+    sd.get_endpoint("api", "v1")
+    sd.get_endpoint("api", "v3")
+    assert fake.calls == 3
+    sd.get_endpoint("api", "v1")
+    assert fake.calls == 3
+    sd.get_endpoint("api", "v2")
+    assert fake.calls == 4
+
+    sd.clear()
+    sd.get_endpoint("api", "v1")
+    assert fake.calls == 5
+
+
+def test_nomad_instances(monkeypatch: pytest.MonkeyPatch):
+    sd = SyncNomadInstancesDiscovery()
+    monkeypatch.setenv("NOMAD_UPSTREAM_ADDR_api_v1", "10.0.0.1:80, 10.0.0.2:80")
+    assert sd.get_endpoints("api", "v1") == [
+        "http://10.0.0.1:80/v1",
+        "http://10.0.0.2:80/v1",
+    ]
+    with pytest.raises(UnregisteredServiceException):
+        sd.get_endpoints("api", None)
+
+
+def test_cached_sd_endpoints(clock: Clock):
+    fake = FakeInstancesSD("http://a", "http://b")
+    sd = SyncCachedServiceDiscovery(fake, ttl=10, stale_ttl=0)
+    assert sd.get_endpoints("api", "v1") == ["http://a", "http://b"]
+    fake.endpoints = ["http://c"]
+    assert sd.get_endpoints("api", "v1") == ["http://a", "http://b"]
+    clock.now = 11
+    assert sd.get_endpoints("api", "v1") == ["http://c"]
+
+    with pytest.raises(TypeError):
+        SyncCachedServiceDiscovery(FakeSD()).get_endpoints("api", "v1")
+
+
+def test_load_balancer_round_robin():
+    sd = SyncLoadBalancedDiscovery(FakeInstancesSD("http://a", "http://b"))
+    assert [sd.choose("api", "v1") for _ in range(3)] == [
+        "http://a",
+        "http://b",
+        "http://a",
+    ]
+    assert sd.choose("api", "v2") == "http://a"
+
+
+@pytest.mark.parametrize("strategy", ["least_outstanding", "p2c"])
+def test_load_balancer_least_outstanding(strategy: str):
+    sd = SyncLoadBalancedDiscovery(FakeInstancesSD("http://a", "http://b"), strategy)
+    sd.acquire("http://a")
+    assert {sd.choose("api", "v1") for _ in range(10)} == {"http://b"}
+    sd.release("http://a")
+    assert sd.outstanding == {}
+
+
+def test_load_balancer_unknown_strategy():
+    with pytest.raises(ValueError):
+        SyncLoadBalancedDiscovery(FakeInstancesSD("http://a"), "random")
+
+
+def test_load_balancer_middleware():
+    sd = SyncLoadBalancedDiscovery(FakeInstancesSD("http://a", "http://b"))
+    transport = UrlTransport(sd)
+    factory: SyncClientFactory[Any] = SyncClientFactory(sd, transport=transport)
+    factory.add_middleware(SyncLoadBalancerMiddleware(sd))
+    api = factory("api")
+    urls = [
+        api.dummy.get({"name": "x"}).raw_result.unwrap().json["url"] for _ in range(2)
+    ]
+    # building the client does not take a turn
+    assert urls == ["http://a/dummies/{name}", "http://b/dummies/{name}"]
+    assert transport.outstanding == [{"http://a": 1}, {"http://b": 1}]
+    assert sd.outstanding == {}
@@ -0,0 +1,57 @@
+import json
+from typing import Any
+
+import pytest
+from pyramid.exceptions import ConfigurationError
+
+from pyramid_blacksmith.serializers import (
+    MsgpackSerializer,
+    OrjsonSerializer,
+    compressed,
+    resolve_serializer,
+)
+from tests.unittests.fixtures import DummySerializer
+
+payload = {
+    "status_code": 200,
+    "headers": {"cache-control": "max-age=60"},
+    "json": [{"id": 1, "name": "été", "tags": ["a", "b"], "price": 1.5}],
+}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"name": "json", "expected": json},
+        {"name": "orjson", "expected": OrjsonSerializer},
+        {"name": "msgpack", "expected": MsgpackSerializer},
+        {"name": "json+zlib", "expected": compressed(json, "zlib")},  # type: ignore
+        {"name": "orjson+lz4", "expected": compressed(OrjsonSerializer, "lz4")},
+        {
+            "name": "tests.unittests.fixtures:DummySerializer",
+            "expected": DummySerializer,
+        },
+    ],
+)
+def test_resolve_serializer(params: dict[str, Any]):
+    assert resolve_serializer(params["name"]) is params["expected"]
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["json", "orjson", "msgpack", "json+zlib", "msgpack+zlib", "orjson+lz4"],
+)
+def test_serializer_roundtrip(name: str):
+    serializer = resolve_serializer(name)
+    data: str | bytes = serializer.dumps(payload)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    assert serializer.loads(data) == payload  # type: ignore[arg-type]
+
+
+def test_resolve_serializer_error():
+    with pytest.raises(ConfigurationError) as ctx:
+        resolve_serializer("json+gzip")
+    assert str(ctx.value) == (
+        "Invalid codec gzip for serializer json+gzip: not in zlib, lz4"
+    )
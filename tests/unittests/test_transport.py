@@ -0,0 +1,115 @@
+from typing import Any
+
+import httpx
+import pytest
+from blacksmith import (
+    HTTPError,
+    HTTPRequest,
+    HTTPResponse,
+    HTTPTimeout,
+    HTTPTimeoutError,
+    SyncHTTPMiddleware,
+)
+from blacksmith.domain.typing import SyncMiddleware
+from blacksmith.typing import ClientName, Path
+
+from pyramid_blacksmith.middleware import PrecompiledMiddleware
+from pyramid_blacksmith.transport import PooledHttpxTransport
+from tests.unittests.fixtures import DummyTransport
+
+
+class TrackingMiddleware(SyncHTTPMiddleware):
+    def __init__(self, name: str, tracker: list[str]):
+        self.name = name
+        self.tracker = tracker
+        self.wrapped = 0
+        self.initialized = False
+
+    def initialize(self) -> None:
+        self.initialized = True
+
+    def __call__(self, next: SyncMiddleware) -> SyncMiddleware:
+        self.wrapped += 1
+
+        def handle(
+            req: HTTPRequest,
+            client_name: ClientName,
+            path: Path,
+            timeout: HTTPTimeout,
+        ) -> HTTPResponse:
+            self.tracker.append(self.name)
+            return next(req, client_name, path, timeout)
+
+        return handle
+
+
+@pytest.mark.parametrize("params", [{"names": ["outer", "inner"]}])
+def test_precompiled_middleware(params: dict[str, Any]):
+    tracker: list[str] = []
+    middlewares = [TrackingMiddleware(name, tracker) for name in params["names"]]
+    precompiled = PrecompiledMiddleware(middlewares)
+    precompiled.initialize()
+    for idx in range(3):
+        # the middlewares of the request are wrapped inside the chain
+        per_request = TrackingMiddleware(f"request {idx}", tracker)
+        handler = precompiled(per_request(DummyTransport()))
+        resp = handler(HTTPRequest("GET", "/"), "cli", "/", HTTPTimeout())
+        assert resp.status_code == 200
+
+    assert tracker == [
+        name for idx in range(3) for name in [*params["names"], f"request {idx}"]
+    ]
+    assert [mw.wrapped for mw in middlewares] == [1, 1]
+    assert [mw.initialized for mw in middlewares] == [True, True]
+
+
+def echo_handler(request: httpx.Request) -> httpx.Response:
+    status_code = int(request.url.params.get("status_code", "200"))
+    return httpx.Response(
+        status_code, json={"path": request.url.path, "host": request.url.host}
+    )
+
+
+@pytest.fixture
+def pooled_transport() -> PooledHttpxTransport:
+    transport = PooledHttpxTransport(max_connections_per_host=1)
+    transport.client = httpx.Client(transport=httpx.MockTransport(echo_handler))
+    return transport
+
+
+def test_pooled_transport(pooled_transport: PooledHttpxTransport):
+    client = pooled_transport.client
+    for _ in range(2):
+        resp = pooled_transport(
+            HTTPRequest("GET", "http://api.localhost/dummies"),
+            "cli",
+            "/dummies",
+            HTTPTimeout(),
+        )
+        assert resp.status_code == 200
+        assert resp.json == {"path": "/dummies", "host": "api.localhost"}
+    assert pooled_transport.client is client
+
+    with pytest.raises(HTTPError) as ctx:
+        pooled_transport(
+            HTTPRequest(
+                "GET", "http://api.localhost/", querystring={"status_code": 502}
+            ),
+            "cli",
+            "/",
+            HTTPTimeout(),
+        )
+    assert str(ctx.value) == "cli - GET / - 502 Bad Gateway"
+
+    pooled_transport.close()
+    assert client.is_closed
+
+
+def test_pooled_transport_per_host_limit(pooled_transport: PooledHttpxTransport):
+    req = HTTPRequest("GET", "http://api.localhost/")
+    with pooled_transport.acquire_host(req, "cli", "/", 1):
+        with pytest.raises(HTTPTimeoutError) as ctx:
+            pooled_transport(req, "cli", "/", HTTPTimeout(1, 0.01))
+    assert str(ctx.value) == "cli - GET / - Too many connections to api.localhost"
+    resp = pooled_transport(req, "cli", "/", HTTPTimeout())
+    assert resp.status_code == 200